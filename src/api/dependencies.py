@@ -1,29 +1,226 @@
+import functools
 import logging
+import math
+from collections.abc import Awaitable, Callable
+from typing import Annotated, Any
 
-from fastapi import HTTPException
-from redis.asyncio import Redis
+from fastapi import BackgroundTasks, Depends, HTTPException, Request, Response
+from redis.asyncio import BlockingConnectionPool, Redis, UnixDomainSocketConnection
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.asyncio.sentinel import Sentinel
+from redis.exceptions import RedisClusterException, RedisError
 
 from config.settings import settings
+from services.address_cache import AddressCache
+from services.cache_invalidation import CacheInvalidationListener
+from services.durability import (
+    DURABILITY_HEADER,
+    DURABILITY_PARAMETER,
+    Durability,
+    DurabilityLevel,
+    parse_durability,
+)
+from services.hedged_reads import HedgedReader
+from services.key_layout import KEY_LAYOUTS, StringKeyLayout
+from services.negative_lookup_filter import NegativeLookupFilter
+from services.phonebook_service import PhoneBookService
+from services.read_batcher import ReadBatcher
+from services.redis_pool import open_connections, pool_stats
+from services.replica_routing import READ_YOUR_WRITES_COOKIE, ReplicaRouter
+from services.sharding import ShardedRedis, parse_endpoints
+from services.single_flight import SingleFlight
+from services.snapshot_backend import SnapshotBackend
+from services.sqlite_backend import SQLiteBackend
+from services.storage_backend import MemoryBackend, RedisBackend, StorageBackend
+from services.storage_codec import ENCODING_ERRORS, StorageCodec, load_dictionary
+from services.write_behind import WriteBehindBuffer
+from utils.etags import if_match_versions
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Redis connection pool
+# Redis client and its connection pools, opened at startup or on first use
 redis_pool = None
 
+# Per-worker address cache, created on first use when enabled
+address_cache = None
+
+# Per-worker filter of stored phone numbers, created on first use when enabled
+key_filter = None
+
+# Per-worker coalescing of concurrent lookups, created on first use when enabled
+single_flight = None
+
+# Per-worker batcher of single-key reads, created on first use when enabled
+read_batcher = None
+
+# Codec for stored values, created on first use from settings
+storage_codec = None
+
+# Per-worker listener evicting cache entries written by other workers
+cache_invalidation_listener = None
+
+# Sentinel client discovering the primary and replicas, created on first use when configured
+redis_sentinel = None
+
+# Per-worker routing of reads to replicas, created on first use when replicas are configured
+replica_router = None
+
+# Per-worker hedging of slow replica lookups, created on first use when enabled
+hedged_reader = None
+
+# Per-worker in-process store of records, created on first use when it is the configured backend
+memory_backend = None
+
+# Per-worker connections to the SQLite database, opened on first use when it is the configured backend
+sqlite_backend = None
+
+# Per-worker mapping of the read-only snapshot, opened on first use when it is the configured backend
+snapshot_backend = None
+
+# Per-worker buffer of acknowledged updates, created on first use when enabled
+write_behind = None
+
+# Set at startup if the Redis primary reports appendonly disabled, which persisted writes wait for
+append_only_disabled = False
+
+
+def cluster_startup_nodes() -> list[ClusterNode]:
+    """Return the configured cluster startup nodes, defaulting to redis_host:redis_port."""
+    nodes = [ClusterNode(host, port) for host, port in parse_endpoints(settings.redis_cluster_nodes)]
+    return nodes or [ClusterNode(settings.redis_host, settings.redis_port)]
+
+
+def _connection_kwargs() -> dict[str, Any]:
+    return {
+        'decode_responses': True,
+        # Lets binary stored values round-trip through the decoding client
+        'encoding_errors': ENCODING_ERRORS,
+        'socket_timeout': settings.redis_socket_timeout,
+        'socket_connect_timeout': settings.redis_socket_connect_timeout,
+        'health_check_interval': settings.redis_health_check_interval,
+    }
+
+
+def _redis_client(host: str, port: int, unix_socket: str = '') -> Redis:
+    if unix_socket:
+        address = {'connection_class': UnixDomainSocketConnection, 'path': unix_socket}
+    else:
+        address = {'host': host, 'port': port}
+    # Waits for a free connection once the limit is reached, rather than failing the command
+    pool = BlockingConnectionPool(
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        db=settings.redis_db,
+        **address,
+        **_connection_kwargs(),
+    )
+    return Redis.from_pool(pool)
+
+
+def get_redis_sentinel() -> Sentinel:
+    """Return the Sentinel client for the configured Sentinels."""
+    global redis_sentinel
+    if redis_sentinel is None:
+        redis_sentinel = Sentinel(
+            parse_endpoints(settings.redis_sentinels),
+            db=settings.redis_db,
+            **_connection_kwargs(),
+        )
+    return redis_sentinel
+
+
+def create_redis_client() -> Any:
+    """Return a client for the configured topology: cluster, shards, Sentinel primary or single server."""
+    if settings.redis_cluster_enabled:
+        return RedisCluster(
+            startup_nodes=cluster_startup_nodes(),
+            max_connections=settings.redis_max_connections,
+            **_connection_kwargs(),
+        )
+    if settings.redis_shards:
+        return ShardedRedis(
+            {f'{host}:{port}': _redis_client(host, port) for host, port in parse_endpoints(settings.redis_shards)},
+            virtual_nodes=settings.redis_shard_virtual_nodes,
+        )
+    if settings.redis_sentinels:
+        # Follows failovers: connections are made to whichever server Sentinel reports as primary
+        return get_redis_sentinel().master_for(
+            settings.redis_sentinel_service, max_connections=settings.redis_max_connections
+        )
+    return _redis_client(settings.redis_host, settings.redis_port, settings.redis_unix_socket)
+
 
 async def get_redis_pool():
+    """Return this worker's Redis client, creating it if the app's startup has not."""
     global redis_pool
+    # No await between the check and the assignment, so concurrent first callers share one client
     if redis_pool is None:
-        redis_pool = Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db,
-            decode_responses=True,
-        )
+        redis_pool = create_redis_client()
     return redis_pool
 
 
+async def open_redis_pool() -> None:
+    """Create the Redis clients and open their first connections, so early requests skip connection setup.
+
+    Also loads the storage layout's scripts. Failures are only logged: the service still
+    starts while Redis is unreachable, and requests connect once it is back.
+    """
+    if settings.storage_backend != 'redis':
+        return
+    client = await get_redis_pool()
+    router = await get_replica_router()
+    try:
+        await open_connections(client, settings.redis_warm_connections)
+        for replica in router.replicas if router is not None else []:
+            await open_connections(replica, settings.redis_warm_connections)
+        for script in get_key_layout().pipeline_scripts:
+            await client.script_load(script)
+    except (RedisError, RedisClusterException, OSError) as e:
+        logger.warning(f'Could not open Redis connections at startup: {e!s}')
+        return
+    await check_append_only(client)
+
+
+async def check_append_only(client: Redis) -> None:
+    """Record whether the Redis primary has appendonly disabled, so persisted writes are refused up front."""
+    global append_only_disabled
+    if settings.redis_cluster_enabled or settings.redis_shards:
+        # Writes there cannot wait for any durability
+        return
+    try:
+        reply = await client.config_get('appendonly')
+    except RedisError as e:
+        # CONFIG may be disabled or renamed; persisted writes then report WAITAOF's refusal
+        logger.info(f'Could not read appendonly from Redis: {e!s}')
+        return
+    append_only_disabled = reply.get('appendonly') == 'no'
+    if append_only_disabled:
+        logger.warning(f'Redis has appendonly disabled; {DurabilityLevel.PERSISTED} writes will be refused')
+
+
+async def close_redis_pool() -> None:
+    """Close the Redis clients and all their connections."""
+    global redis_pool, replica_router, redis_sentinel
+    if replica_router is not None:
+        await replica_router.aclose()
+        replica_router = None
+    if redis_pool is not None:
+        await redis_pool.aclose()
+        redis_pool = None
+    redis_sentinel = None
+
+
+def redis_pool_stats() -> dict[str, dict[str, Any]] | None:
+    """Return connection usage per Redis connection pool, or None before the client exists."""
+    if redis_pool is None:
+        return None
+    stats = pool_stats(redis_pool)
+    for replica in replica_router.replicas if replica_router is not None else []:
+        stats.update(pool_stats(replica))
+    return stats
+
+
 async def get_redis_client() -> Redis:
     """Return a shared Redis client instance."""
     return await get_redis_pool()
@@ -39,6 +236,323 @@ async def redis_client_provider() -> Redis:
     return await redis_client_dependency()
 
 
+def get_address_cache() -> AddressCache | None:
+    """Return this worker's address cache, or None if caching is disabled."""
+    global address_cache
+    if address_cache is None and settings.address_cache_size > 0:
+        address_cache = AddressCache(
+            max_size=settings.address_cache_size,
+            ttl=settings.address_cache_ttl,
+        )
+    return address_cache
+
+
+def get_key_filter() -> NegativeLookupFilter | None:
+    """Return this worker's negative-lookup filter, or None if it is disabled."""
+    global key_filter
+    if key_filter is None and settings.negative_filter_capacity > 0:
+        key_filter = NegativeLookupFilter(
+            capacity=settings.negative_filter_capacity,
+            error_rate=settings.negative_filter_error_rate,
+        )
+    return key_filter
+
+
+def get_single_flight() -> SingleFlight | None:
+    """Return this worker's lookup coalescer, or None if coalescing is disabled."""
+    global single_flight
+    if single_flight is None and settings.single_flight_enabled:
+        single_flight = SingleFlight()
+    return single_flight
+
+
+def get_read_batcher() -> ReadBatcher | None:
+    """Return this worker's read batcher, or None if read batching is disabled."""
+    global read_batcher
+    if read_batcher is None and settings.read_batching_enabled:
+        read_batcher = ReadBatcher(
+            window=settings.read_batch_window_us / 1_000_000,
+            max_batch_size=settings.batch_chunk_size,
+            layout=get_key_layout(),
+        )
+    return read_batcher
+
+
+async def get_replica_router() -> ReplicaRouter | None:
+    """Return this worker's replica read routing, or None if no replicas are configured."""
+    global replica_router
+    if not (settings.redis_replicas or settings.redis_sentinels):
+        return None
+    primary = await get_redis_pool()
+    # No await between the check and the assignment, so concurrent first callers share one router
+    if replica_router is None:
+        if settings.redis_sentinels:
+            # Sentinel's replica client picks a replica per connection and falls back to the primary
+            replicas = [
+                get_redis_sentinel().slave_for(
+                    settings.redis_sentinel_service, max_connections=settings.redis_max_connections
+                )
+            ]
+        else:
+            replicas = [_redis_client(host, port) for host, port in parse_endpoints(settings.redis_replicas)]
+        replica_router = ReplicaRouter(
+            primary,
+            replicas,
+            read_your_writes_window=settings.read_your_writes_window,
+        )
+    return replica_router
+
+
+def get_hedged_reader() -> HedgedReader | None:
+    """Return this worker's lookup hedging, or None if hedged reads are disabled."""
+    global hedged_reader
+    if hedged_reader is None and settings.hedged_reads_enabled:
+        hedged_reader = HedgedReader(
+            percentile=settings.hedge_delay_percentile,
+            min_delay=settings.hedge_min_delay_ms / 1000,
+            max_ratio=settings.hedge_max_ratio,
+        )
+    return hedged_reader
+
+
+def get_memory_backend() -> MemoryBackend | None:
+    """Return this worker's in-process store, or None if records are kept in Redis."""
+    global memory_backend
+    if memory_backend is None and settings.storage_backend == 'memory':
+        memory_backend = MemoryBackend()
+    return memory_backend
+
+
+def get_sqlite_backend() -> SQLiteBackend | None:
+    """Return this worker's SQLite store, or None if records are not kept in SQLite."""
+    global sqlite_backend
+    if sqlite_backend is None and settings.storage_backend == 'sqlite':
+        sqlite_backend = SQLiteBackend(
+            settings.sqlite_path,
+            read_threads=settings.sqlite_read_threads,
+            synchronous=settings.sqlite_synchronous,
+        )
+    return sqlite_backend
+
+
+async def close_storage_backend() -> None:
+    """Close the SQLite store, if open."""
+    global sqlite_backend
+    if sqlite_backend is not None:
+        await sqlite_backend.aclose()
+        sqlite_backend = None
+
+
+def get_snapshot_backend() -> SnapshotBackend | None:
+    """Return this worker's mapping of the snapshot file, or None if records are not served from one."""
+    global snapshot_backend
+    if snapshot_backend is None and settings.storage_backend == 'snapshot':
+        cache = get_address_cache()
+        snapshot_backend = SnapshotBackend(
+            settings.snapshot_path,
+            check_interval=settings.snapshot_check_interval,
+            # Cached records may be gone from or changed in the new snapshot
+            on_swap=cache.clear if cache is not None else None,
+        )
+    return snapshot_backend
+
+
+def get_local_storage() -> StorageBackend | None:
+    """Return the configured backend if records are not kept in Redis, else None."""
+    return get_memory_backend() or get_sqlite_backend() or get_snapshot_backend()
+
+
+async def get_write_behind() -> WriteBehindBuffer | None:
+    """Return this worker's write-behind buffer, or None if updates are stored before they are acknowledged."""
+    global write_behind
+    if not settings.write_behind_enabled:
+        return None
+    storage = get_local_storage() or RedisBackend(await get_redis_pool(), get_key_layout())
+    # No await between the check and the assignment, so concurrent first callers share one buffer
+    if write_behind is None:
+        write_behind = WriteBehindBuffer(
+            storage,
+            flush_size=settings.write_behind_flush_size,
+            flush_interval=settings.write_behind_flush_interval_ms / 1000,
+            max_pending=settings.write_behind_max_pending,
+        )
+    return write_behind
+
+
+async def stop_write_behind() -> None:
+    """Store the updates still buffered and stop the periodic flushes."""
+    global write_behind
+    if write_behind is not None:
+        try:
+            await write_behind.aclose()
+        except Exception as e:
+            logger.error(f'Could not store {write_behind.stats()["pending"]} buffered updates at shutdown: {e!s}')
+        write_behind = None
+
+
+def get_key_layout() -> StringKeyLayout:
+    """Return the configured layout of records in Redis."""
+    return KEY_LAYOUTS[settings.storage_layout]
+
+
+def get_storage_codec() -> StorageCodec:
+    """Return the codec stored values are written and read with."""
+    global storage_codec
+    if storage_codec is None:
+        storage_codec = StorageCodec(
+            storage_format=settings.storage_format,
+            compression=settings.storage_compression,
+            level=settings.storage_zstd_level,
+            dictionary=load_dictionary(settings.storage_zstd_dictionary),
+        )
+    return storage_codec
+
+
+async def start_cache_invalidation() -> None:
+    """Start tracking writes from any worker, if the cache or the negative-lookup filter is enabled.
+
+    The filter is built by the listener and only answers definite misses while it is
+    connected, so with ``cache_invalidation`` set to ``none`` it stays inactive.
+    """
+    global cache_invalidation_listener
+    cache = get_address_cache()
+    lookup_filter = get_key_filter()
+    if (cache is None and lookup_filter is None) or cache_invalidation_listener is not None:
+        return
+    if settings.storage_backend == 'sqlite' and cache is not None:
+        # Workers sharing the database file do not hear of each other's writes
+        logger.warning('Cache invalidation needs Redis; cached addresses expire by TTL only')
+    if settings.storage_backend != 'redis':
+        # Otherwise every write, if any, goes through this process, which keeps its own cache up to date
+        return
+    if settings.cache_invalidation == 'none':
+        if lookup_filter is not None:
+            logger.warning('Negative lookup filter needs cache invalidation enabled; it will not be used')
+        return
+    if settings.redis_cluster_enabled or settings.redis_shards:
+        # Tracking and keyspace events are per node; cached entries then only expire by TTL
+        logger.warning('Cache invalidation needs a single Redis server; cached addresses expire by TTL only')
+        return
+
+    cache_invalidation_listener = CacheInvalidationListener(
+        await get_redis_pool(),
+        cache,
+        mode=settings.cache_invalidation,
+        health_check_interval=settings.cache_invalidation_health_interval,
+        key_filter=lookup_filter,
+        filter_rebuild_interval=settings.negative_filter_rebuild_interval,
+        layout=get_key_layout(),
+    )
+    await cache_invalidation_listener.start()
+
+
+async def stop_cache_invalidation() -> None:
+    """Stop the cache invalidation listener, if running."""
+    global cache_invalidation_listener
+    if cache_invalidation_listener is not None:
+        await cache_invalidation_listener.stop()
+        cache_invalidation_listener = None
+
+
+def request_durability(request: Request | None) -> Durability | None:
+    """Return the durability a write request asks for, or None for the default.
+
+    Raises:
+        HTTPException: 422 if the durability is invalid
+
+    """
+    if request is None:
+        return None
+    value = request.query_params.get(DURABILITY_PARAMETER) or request.headers.get(DURABILITY_HEADER)
+    if not value:
+        return None
+    try:
+        return parse_durability(value, settings.durability_replicas, settings.durability_timeout_ms)
+    except ValueError as e:
+        raise handle_error(422, str(e)) from None
+
+
+async def phonebook_service_provider(
+    redis_client: Annotated[Redis, Depends(redis_client_provider)],
+    request: Request = None,
+    response: Response = None,
+) -> PhoneBookService:
+    """Build the phone book service for a request, sharing this worker's in-process read helpers.
+
+    With replicas configured, the request's reads go to a replica unless the client
+    wrote within the read-your-writes window, in which case they go to the primary.
+    Writes renew the window through a cookie on the response. With hedged reads
+    enabled, slow lookups are also sent to the next replica. With write-behind
+    enabled, plain updates are buffered in this worker and stored in batches.
+    """
+    read_client = redis_client
+    hedge_client = None
+    pinned = False
+    on_write = None
+    on_read = None
+    storage = get_local_storage()
+    router = await get_replica_router() if storage is None else None
+    if router is not None:
+        pinned = request is not None and router.is_pinned(request.cookies.get(READ_YOUR_WRITES_COOKIE))
+        read_client = router.read_client(pinned)
+        on_read = functools.partial(router.record_read, read_client)
+        if not pinned and get_hedged_reader() is not None:
+            hedge_client = router.hedge_client(read_client)
+        if response is not None and router.read_your_writes_window > 0:
+
+            def on_write() -> None:
+                response.set_cookie(
+                    READ_YOUR_WRITES_COOKIE,
+                    str(router.pin_deadline()),
+                    max_age=max(1, math.ceil(router.read_your_writes_window)),
+                    httponly=True,
+                    samesite='lax',
+                )
+
+    try:
+        return PhoneBookService(
+            redis_client,
+            cache=get_address_cache(),
+            key_filter=get_key_filter(),
+            single_flight=get_single_flight(),
+            read_batcher=get_read_batcher(),
+            codec=get_storage_codec(),
+            layout=get_key_layout(),
+            read_client=read_client,
+            fresh_reads=pinned,
+            on_write=on_write,
+            on_read=on_read,
+            hedged_reader=get_hedged_reader(),
+            hedge_client=hedge_client,
+            storage=storage,
+            write_behind=await get_write_behind(),
+        )
+    except NotImplementedError as e:
+        raise handle_error(501, str(e)) from None
+
+
+async def writer_service_provider(
+    service: Annotated[PhoneBookService, Depends(phonebook_service_provider)],
+    request: Request = None,
+) -> PhoneBookService:
+    """Build the phone book service for a write route, with the durability the request asks for.
+
+    Writes may ask for a durability through the ``durability`` query parameter or the
+    ``Durability`` header; asking for replicas the storage cannot wait for, or for
+    persisted writes while Redis has appendonly disabled, is a 501.
+    Read routes never parse it, so a client may send the header with every request.
+    """
+    durability = request_durability(request)
+    if durability is not None and durability.level is DurabilityLevel.PERSISTED and append_only_disabled:
+        raise handle_error(501, f'{DurabilityLevel.PERSISTED} durability needs appendonly enabled on Redis')
+    if durability is not None:
+        try:
+            service.use_durability(durability)
+        except NotImplementedError as e:
+            raise handle_error(501, str(e)) from None
+    return service
+
+
 # Error handling infrastructure
 def handle_error(error_code: int, message: str):
     return HTTPException(
@@ -47,6 +561,52 @@ def handle_error(error_code: int, message: str):
     )
 
 
+async def required_version(service: PhoneBookService, phone_number: str, if_match: str | None) -> str | None:
+    """Return the version a write's If-Match header requires of the record, or None if any version will do.
+
+    With several entity tags, the stored version is read from the primary and the tag
+    naming it is returned; the write then checks that version atomically as usual.
+
+    Raises:
+        HTTPException: 412 if none of several tags names the stored version, 422 if the
+            header names no entity tag
+
+    """
+    if if_match is None:
+        return None
+    try:
+        versions = if_match_versions(if_match)
+    except ValueError as e:
+        raise handle_error(422, str(e)) from None
+    if versions is None:
+        return None
+    if len(versions) == 1:
+        return versions[0]
+    found = await service.get_versioned_address(phone_number)
+    if found is None or found[1] not in versions:
+        raise handle_error(412, 'Record does not match If-Match')
+    return found[1]
+
+
+def write_after_response(
+    background_tasks: BackgroundTasks, service: PhoneBookService, write: Callable[..., Awaitable[Any]], *args: Any
+) -> None:
+    """Run a fire-and-forget write of ``service`` after the response, logging its failure instead of raising it.
+
+    The write is recorded as accepted first, so the response pins the client's reads to
+    the primary like the response to any other write.
+    """
+    service.accept_write()
+
+    async def run() -> None:
+        try:
+            await write(*args)
+        except Exception as e:
+            logger.warning(f'Fire-and-forget {write.__name__} failed: {e!s}')
+
+    background_tasks.add_task(run)
+
+
 # Request/Response validation and logging middleware components
 def log_request_response(
     endpoint_name: str,
@@ -4,13 +4,23 @@ from fastapi import APIRouter
 api_v1 = APIRouter(prefix='/v1')
 
 # Import and include individual route routers
+from .routes.bulk_write import router as bulk_write_router
 from .routes.create_address import router as create_address_router
 from .routes.delete_address import router as delete_address_router
+from .routes.export_addresses import router as export_addresses_router
 from .routes.get_address import router as get_address_router
+from .routes.get_addresses import router as get_addresses_router
+from .routes.get_shared_address import router as get_shared_address_router
+from .routes.import_addresses import router as import_addresses_router
 from .routes.update_address import router as update_address_router
 
 # Include routes in the v1 router
 api_v1.include_router(get_address_router)
+api_v1.include_router(get_shared_address_router)
 api_v1.include_router(create_address_router)
 api_v1.include_router(update_address_router)
 api_v1.include_router(delete_address_router)
+api_v1.include_router(get_addresses_router)
+api_v1.include_router(bulk_write_router)
+api_v1.include_router(import_addresses_router)
+api_v1.include_router(export_addresses_router)
@@ -0,0 +1,102 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
+from pydantic import ValidationError
+
+from api.dependencies import write_after_response, writer_service_provider
+from config.settings import settings
+from models.api_models import BulkOperation, BulkWriteRequest
+from services.durability import DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+from utils.validators import normalize_phone_number
+
+router = APIRouter()
+
+
+@router.post('/addresses/bulk')
+async def bulk_write(
+    request_data: BulkWriteRequest,
+    service: Annotated[PhoneBookService, Depends(writer_service_provider)],
+    background_tasks: BackgroundTasks = None,
+    response: Response = None,
+) -> dict[str, Any]:
+    """Apply a batch of create, update and delete operations.
+
+    Args:
+        request_data: The operations to apply, in order
+        service: Phone book service dependency
+        background_tasks: Runs fire-and-forget writes after the response
+        response: The response, whose status is set for accepted writes
+
+    Returns:
+        A dictionary with one result per operation, in request order. Each result has a
+        status of created, conflict, updated, not_found, deleted or invalid. With
+        fire-and-forget durability the response is 202 Accepted and valid operations
+        have the status accepted, as they are applied after it.
+
+    Raises:
+        HTTPException: 422 if the batch exceeds the configured maximum size
+
+    """
+    if len(request_data.operations) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f'Batch contains {len(request_data.operations)} operations, maximum is {settings.batch_max_size}',
+        )
+
+    results: list[dict[str, Any]] = []
+    operations: list[WriteOperation] = []
+    # Index into results for each operation that is sent to Redis
+    positions: list[int] = []
+
+    for item in request_data.operations:
+        try:
+            operation = BulkOperation.model_validate(item)
+        except ValidationError as e:
+            results.append(
+                {'phone': item.get('phone'), 'status': WriteStatus.INVALID, 'detail': f'Invalid operation: {e!s}'}
+            )
+            continue
+
+        phone_number = normalize_phone_number(operation.phone)
+        if not phone_number:
+            results.append(
+                {
+                    'phone': operation.phone,
+                    'op': operation.op,
+                    'status': WriteStatus.INVALID,
+                    'detail': f'Invalid phone number format: {operation.phone}',
+                }
+            )
+            continue
+
+        address = operation.address.model_dump() if operation.address else None
+        positions.append(len(results))
+        operations.append(WriteOperation(WriteOp(operation.op), phone_number, address))
+        results.append({'phone': phone_number, 'op': operation.op})
+
+    if operations and service.durability.level is DurabilityLevel.FIRE_AND_FORGET:
+        write_after_response(
+            background_tasks,
+            service,
+            service.bulk_write,
+            operations,
+            settings.batch_chunk_size,
+            settings.batch_concurrency,
+        )
+        for position in positions:
+            results[position]['status'] = 'accepted'
+        # Set on the injected response, which carries the cookies dependencies set
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {'results': results}
+
+    if operations:
+        statuses = await service.bulk_write(
+            operations,
+            chunk_size=settings.batch_chunk_size,
+            concurrency=settings.batch_concurrency,
+        )
+        for position, write_status in zip(positions, statuses, strict=True):
+            results[position]['status'] = write_status
+
+    return {'results': results}
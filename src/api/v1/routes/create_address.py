@@ -1,11 +1,11 @@
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from redis.asyncio import Redis
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
 
-from api.dependencies import redis_client_provider
+from api.dependencies import write_after_response, writer_service_provider
 from models.api_models import CreateAddressRequest
-from services.phonebook_service import PhoneBookService
+from services.durability import DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteStatus
 from utils.validators import normalize_phone_number, validate_phone_format
 
 router = APIRouter()
@@ -15,17 +15,22 @@ router = APIRouter()
 async def create_address(
     phone_number: str,
     request_data: CreateAddressRequest,
-    redis_client: Annotated[Redis, Depends(redis_client_provider)],
+    service: Annotated[PhoneBookService, Depends(writer_service_provider)],
+    background_tasks: BackgroundTasks = None,
+    response: Response = None,
 ) -> dict[str, Any]:
     """Create a new phone-address record.
 
     Args:
         phone_number: The phone number in international format
         address_data: The address information to store
-        redis_client: Redis client dependency
+        service: Phone book service dependency
+        background_tasks: Runs fire-and-forget writes after the response
+        response: The response, whose status is set for accepted writes
 
     Returns:
-        A dictionary containing the phone number and address information
+        A dictionary containing the phone number and address information, with
+        202 Accepted and without a conflict check for fire-and-forget durability
 
     Raises:
         HTTPException: 409 if phone already exists, 422 if invalid format or data
@@ -52,13 +57,16 @@ async def create_address(
             detail=f'Invalid address data: {e!s}',
         ) from e
 
-    # Create service instance
-    service = PhoneBookService(redis_client)
+    if service.durability.level is DurabilityLevel.FIRE_AND_FORGET:
+        write_after_response(background_tasks, service, service.create_address, phone_number, validated_address_data)
+        # Set on the injected response, which carries the cookies dependencies set
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {'phone': phone_number, 'address': validated_address_data}
 
     # Try to create the address
-    success = await service.create_address(phone_number, validated_address_data)
+    result = await service.create_address(phone_number, validated_address_data)
 
-    if not success:
+    if result is WriteStatus.CONFLICT:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail='Phone number already exists',
@@ -1,10 +1,10 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from redis.asyncio import Redis
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
 
-from api.dependencies import redis_client_provider
-from services.phonebook_service import PhoneBookService
+from api.dependencies import required_version, write_after_response, writer_service_provider
+from services.durability import DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteStatus
 from utils.validators import normalize_phone_number, validate_phone_format
 
 router = APIRouter()
@@ -13,16 +13,26 @@ router = APIRouter()
 @router.delete('/address/{phone_number}')
 async def delete_address(
     phone_number: str,
-    redis_client: Annotated[Redis, Depends(redis_client_provider)],
+    service: Annotated[PhoneBookService, Depends(writer_service_provider)],
+    background_tasks: BackgroundTasks = None,
+    if_match: Annotated[str | None, Header()] = None,
+    response: Response = None,
 ):
     """Delete a phone-address record.
 
+    With fire-and-forget durability, responds 202 Accepted before deleting it.
+
     Args:
         phone_number: The phone number in international format
-        redis_client: Redis client dependency
+        service: Phone book service dependency
+        background_tasks: Runs fire-and-forget writes after the response
+        if_match: ETags of the versions the record may have; the write is only applied
+            to a record that still has one of them
+        response: The response, whose status is set for accepted writes
 
     Raises:
-        HTTPException: 404 if phone doesn't exist, 422 if invalid format
+        HTTPException: 404 if phone doesn't exist, 412 instead with If-Match or if its
+            version does not match If-Match, 422 if invalid format
 
     """
     # Validate phone number format
@@ -37,16 +47,27 @@ async def delete_address(
             )
         phone_number = normalized
 
-    # Create service instance
-    service = PhoneBookService(redis_client)
+    expected_version = await required_version(service, phone_number, if_match)
+
+    if service.durability.level is DurabilityLevel.FIRE_AND_FORGET:
+        write_after_response(background_tasks, service, service.delete_address, phone_number, expected_version)
+        # Set on the injected response, which carries the cookies dependencies set
+        response.status_code = status.HTTP_202_ACCEPTED
+        return None
 
     # Try to delete the address
-    success = await service.delete_address(phone_number)
+    result = await service.delete_address(phone_number, expected_version=expected_version)
 
-    if not success:
+    # With If-Match, a missing record fails the precondition like a changed one
+    if result is WriteStatus.NOT_FOUND and if_match is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Phone number not found',
         )
+    if result in (WriteStatus.NOT_FOUND, WriteStatus.VERSION_MISMATCH):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail='Record does not match If-Match',
+        )
 
     # Return 204 No Content for successful deletion
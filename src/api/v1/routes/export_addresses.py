@@ -0,0 +1,94 @@
+import base64
+import binascii
+import zlib
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from api.dependencies import phonebook_service_provider
+from config.settings import settings
+from services.phonebook_service import PhoneBookService
+from utils.ndjson import ndjson_line
+
+router = APIRouter()
+
+
+def encode_cursor(cursor: int) -> str:
+    """Encode a SCAN cursor as an opaque resume token."""
+    return base64.urlsafe_b64encode(str(cursor).encode()).decode()
+
+
+def decode_cursor(token: str) -> int | None:
+    """Decode a resume token, returning None if it is not valid."""
+    try:
+        cursor = int(base64.urlsafe_b64decode(token.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return cursor if cursor >= 0 else None
+
+
+@router.get('/addresses/export')
+async def export_addresses(
+    service: Annotated[PhoneBookService, Depends(phonebook_service_provider)],
+    cursor: str | None = None,
+    batch_size: Annotated[int | None, Query(ge=1, le=10000)] = None,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Export all phone-address records as an NDJSON stream.
+
+    Records are written as ``{"phone": ..., "address": ...}`` lines, the same shape the
+    import endpoint accepts. After each batch a ``{"type": "cursor", "cursor": ...}``
+    line carries a token that resumes the export after that batch; the stream ends with
+    a ``{"type": "end"}`` line. Records may repeat if data changes during the export.
+
+    Args:
+        service: Phone book service dependency
+        cursor: Resume token from a previous, interrupted export
+        batch_size: Keys fetched per SCAN/MGET batch (default: EXPORT_BATCH_SIZE)
+        gzip: Compress the stream with gzip content encoding
+
+    Returns:
+        A streaming NDJSON response
+
+    Raises:
+        HTTPException: 422 if the cursor token is not valid
+
+    """
+    start_cursor = 0
+    if cursor is not None:
+        start_cursor = decode_cursor(cursor)
+        if start_cursor is None or start_cursor == 0:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=f'Invalid export cursor: {cursor}',
+            )
+
+    batches = _run_export(service, start_cursor, batch_size or settings.export_batch_size)
+    if not gzip:
+        return StreamingResponse(batches, media_type='application/x-ndjson')
+
+    return StreamingResponse(
+        _gzip_stream(batches),
+        media_type='application/x-ndjson',
+        headers={'Content-Encoding': 'gzip'},
+    )
+
+
+async def _run_export(service: PhoneBookService, cursor: int, batch_size: int) -> AsyncIterator[bytes]:
+    async for next_cursor, records in service.scan_addresses(cursor, batch_size):
+        lines = [ndjson_line({'phone': phone_number, 'address': address}) for phone_number, address in records]
+        if next_cursor:
+            lines.append(ndjson_line({'type': 'cursor', 'cursor': encode_cursor(next_cursor)}))
+        yield b''.join(lines)
+
+    yield ndjson_line({'type': 'end'})
+
+
+async def _gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    # Sync-flush after every batch so clients can decode everything received so far
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
@@ -1,10 +1,10 @@
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from redis.asyncio import Redis
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 
-from api.dependencies import redis_client_provider
+from api.dependencies import phonebook_service_provider
 from services.phonebook_service import PhoneBookService
+from utils.etags import format_etag, none_match
 from utils.validators import normalize_phone_number, validate_phone_format
 
 router = APIRouter()
@@ -13,13 +13,20 @@ router = APIRouter()
 @router.get('/address/{phone_number}')
 async def get_address(
     phone_number: str,
-    redis_client: Annotated[Redis, Depends(redis_client_provider)],
+    service: Annotated[PhoneBookService, Depends(phonebook_service_provider)],
+    response: Response = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> dict[str, Any]:
     """Retrieve an address by phone number.
 
+    The response carries the record's version as its ETag. A request whose
+    If-None-Match names that ETag gets 304 Not Modified without a body.
+
     Args:
         phone_number: The phone number in international format
-        redis_client: Redis client dependency
+        service: Phone book service dependency
+        response: The response, given the ETag header
+        if_none_match: ETags of versions the client already has
 
     Returns:
         A dictionary containing the phone number and address information
@@ -40,18 +47,21 @@ async def get_address(
             )
         phone_number = normalized
 
-    # Create service instance
-    service = PhoneBookService(redis_client)
-
-    # Get the address
-    address_data = await service.get_address(phone_number)
+    # Get the address and its version
+    found = await service.get_tagged_address(phone_number)
 
-    if address_data is None:
+    if found is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Phone number not found',
         )
 
+    address_data, version = found
+    etag = format_etag(version)
+    if if_none_match is not None and not none_match(if_none_match, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+
     # Return the phone number and address
     return {
         'phone': phone_number,
@@ -0,0 +1,58 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from api.dependencies import phonebook_service_provider
+from config.settings import settings
+from models.api_models import BatchLookupRequest
+from services.phonebook_service import PhoneBookService
+from utils.validators import normalize_phone_number
+
+router = APIRouter()
+
+
+@router.post('/addresses/lookup')
+async def get_addresses(
+    request_data: BatchLookupRequest,
+    service: Annotated[PhoneBookService, Depends(phonebook_service_provider)],
+) -> dict[str, Any]:
+    """Retrieve addresses for a batch of phone numbers.
+
+    Args:
+        request_data: The phone numbers to look up
+        service: Phone book service dependency
+
+    Returns:
+        A dictionary with one result per requested phone number, in request order.
+        Each result has a status of found, not_found or invalid.
+
+    Raises:
+        HTTPException: 422 if the batch exceeds the configured maximum size
+
+    """
+    phone_numbers = request_data.phone_numbers
+    if len(phone_numbers) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f'Batch contains {len(phone_numbers)} phone numbers, maximum is {settings.batch_max_size}',
+        )
+
+    # Normalize every number up front; invalid ones never reach Redis
+    normalized_numbers = [normalize_phone_number(phone_number) for phone_number in phone_numbers]
+
+    # Fetch all valid numbers with one MGET per chunk
+    addresses = await service.get_addresses(
+        [phone_number for phone_number in normalized_numbers if phone_number],
+        chunk_size=settings.batch_chunk_size,
+    )
+
+    results = []
+    for phone_number, normalized in zip(phone_numbers, normalized_numbers, strict=True):
+        if not normalized:
+            results.append({'phone': phone_number, 'status': 'invalid'})
+        elif addresses.get(normalized) is None:
+            results.append({'phone': normalized, 'status': 'not_found'})
+        else:
+            results.append({'phone': normalized, 'status': 'found', 'address': addresses[normalized]})
+
+    return {'results': results}
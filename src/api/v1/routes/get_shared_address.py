@@ -0,0 +1,64 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from api.dependencies import phonebook_service_provider
+from services.phonebook_service import PhoneBookService
+from utils.validators import normalize_phone_number, validate_phone_format
+
+router = APIRouter()
+
+
+@router.get('/address/{phone_number}/shared')
+async def get_shared_address(
+    phone_number: str,
+    service: Annotated[PhoneBookService, Depends(phonebook_service_provider)],
+) -> dict[str, Any]:
+    """List the phone numbers stored with the same address as a phone number.
+
+    Answered from the per-address phone number sets of the content storage layout,
+    without scanning the keyspace.
+
+    Args:
+        phone_number: The phone number in international format
+        service: Phone book service dependency
+
+    Returns:
+        A dictionary containing the phone number and every phone number sharing its
+        address, itself included
+
+    Raises:
+        HTTPException: 404 if phone number not found, 422 if invalid format,
+            501 if the storage layout does not support reverse lookups
+
+    """
+    # Validate phone number format
+    if not validate_phone_format(phone_number):
+        # Try to normalize the phone number first
+        normalized = normalize_phone_number(phone_number)
+        if not normalized:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=f'Invalid phone number format: {phone_number}. '
+                + 'Must follow E.164 or Russian format (+7XXXXXXXXXX or 8XXXXXXXXXX)',
+            )
+        phone_number = normalized
+
+    try:
+        phone_numbers = await service.get_phones_sharing_address(phone_number)
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail='Reverse lookups need STORAGE_LAYOUT=content',
+        ) from None
+
+    if phone_numbers is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Phone number not found',
+        )
+
+    return {
+        'phone': phone_number,
+        'shared_with': phone_numbers,
+    }
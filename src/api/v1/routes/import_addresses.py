@@ -0,0 +1,157 @@
+import json
+import logging
+from collections import Counter
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from api.dependencies import writer_service_provider
+from config.settings import settings
+from models.api_models import ImportRecord
+from services.durability import DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+from services.storage_backend import ReadOnlyStorageError
+from utils.ndjson import iter_ndjson_lines, ndjson_line
+from utils.validators import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """Streaming response that is produced while the request body is still being read.
+
+    The base class may listen for client disconnects by calling ``receive`` alongside
+    the response, which would consume request body messages meant for the endpoint.
+    Here disconnects surface through the request stream instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+@router.post('/addresses/import')
+async def import_addresses(
+    request: Request,
+    service: Annotated[PhoneBookService, Depends(writer_service_provider)],
+    mode: Literal['create', 'upsert'] = 'upsert',
+) -> StreamingResponse:
+    """Import phone-address records from an NDJSON request body.
+
+    Each line is a JSON object with ``phone`` and ``address`` fields. The body is read
+    incrementally and written to Redis in fixed-size pipelined chunks; the next part of
+    the body is only read once the previous chunk is stored.
+
+    Args:
+        request: The incoming request, read as a stream
+        service: Phone book service dependency
+        mode: create skips existing phone numbers (conflict), upsert overwrites them
+
+    Returns:
+        An NDJSON stream with an error line for every rejected record, a progress line
+        after every chunk and a final summary line, or a final aborted line if storing
+        a chunk failed
+
+    """
+    if service.storage.read_only:
+        # Raised before streaming starts, while the error can still set the response status
+        raise ReadOnlyStorageError('Records are read-only on this server')
+    if service.durability.level is DurabilityLevel.FIRE_AND_FORGET:
+        # The progress and summary lines report each chunk once it is stored
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f'Imports do not support {DurabilityLevel.FIRE_AND_FORGET} durability',
+        )
+    op = WriteOp.CREATE if mode == 'create' else WriteOp.UPSERT
+    return RequestStreamingResponse(
+        _run_import(request.stream(), service, op),
+        media_type='application/x-ndjson',
+    )
+
+
+async def _run_import(body: AsyncIterable[bytes], service: PhoneBookService, op: WriteOp) -> AsyncIterator[bytes]:
+    counts: Counter[str] = Counter()
+    # (line number, operation) pairs waiting to be written
+    pending: list[tuple[int, WriteOperation]] = []
+    line_number = 0
+
+    try:
+        async for line in iter_ndjson_lines(body, settings.import_max_line_length):
+            line_number += 1
+            if line is not None and not line.strip():
+                continue
+
+            counts['lines'] += 1
+            operation, error = _parse_line(line, op)
+            if error is not None:
+                counts[WriteStatus.INVALID] += 1
+                yield ndjson_line(
+                    {'type': 'error', 'line': line_number, 'status': WriteStatus.INVALID, 'detail': error}
+                )
+                continue
+
+            pending.append((line_number, operation))
+            if len(pending) >= settings.import_chunk_size:
+                for output in await _write_chunk(service, pending, counts):
+                    yield output
+                pending = []
+
+        if pending:
+            for output in await _write_chunk(service, pending, counts):
+                yield output
+    except Exception as e:
+        # The status line was sent with the first output, so the failure can only be reported in the stream
+        logger.exception('Import stopped after line %d', line_number)
+        yield ndjson_line({'type': 'aborted', 'error': f'Import stopped: {e!s}', **counts})
+        return
+
+    yield ndjson_line({'type': 'summary', **counts})
+
+
+def _parse_line(line: bytes | None, op: WriteOp) -> tuple[WriteOperation | None, str | None]:
+    """Validate one NDJSON line, returning either the write operation or an error message."""
+    if line is None:
+        return None, f'Line exceeds {settings.import_max_line_length} bytes'
+
+    try:
+        record = ImportRecord.model_validate(json.loads(line))
+    except (ValueError, ValidationError) as e:
+        return None, f'Invalid record: {e!s}'
+
+    phone_number = normalize_phone_number(record.phone)
+    if not phone_number:
+        return None, f'Invalid phone number format: {record.phone}'
+
+    return WriteOperation(op, phone_number, record.address.model_dump()), None
+
+
+async def _write_chunk(
+    service: PhoneBookService,
+    pending: list[tuple[int, WriteOperation]],
+    counts: Counter[str],
+) -> list[bytes]:
+    """Write one chunk as a single pipeline and return the NDJSON lines to report."""
+    operations = [operation for _, operation in pending]
+    statuses = await service.bulk_write(operations, chunk_size=len(operations), concurrency=1)
+
+    output = []
+    for (line_number, operation), write_status in zip(pending, statuses, strict=True):
+        counts[write_status] += 1
+        if write_status is WriteStatus.CONFLICT:
+            output.append(
+                ndjson_line(
+                    {
+                        'type': 'error',
+                        'line': line_number,
+                        'phone': operation.phone_number,
+                        'status': write_status,
+                        'detail': 'Phone number already exists',
+                    }
+                )
+            )
+    output.append(ndjson_line({'type': 'progress', **counts}))
+    return output
@@ -1,11 +1,11 @@
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from redis.asyncio import Redis
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response, status
 
-from api.dependencies import redis_client_provider
+from api.dependencies import required_version, write_after_response, writer_service_provider
 from models.api_models import CreateAddressRequest
-from services.phonebook_service import PhoneBookService
+from services.durability import DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteStatus
 from utils.validators import normalize_phone_number, validate_phone_format
 
 router = APIRouter()
@@ -15,20 +15,30 @@ router = APIRouter()
 async def update_address(
     phone_number: str,
     request_data: CreateAddressRequest,
-    redis_client: Annotated[Redis, Depends(redis_client_provider)],
+    service: Annotated[PhoneBookService, Depends(writer_service_provider)],
+    background_tasks: BackgroundTasks = None,
+    if_match: Annotated[str | None, Header()] = None,
+    response: Response = None,
 ) -> dict[str, Any]:
     """Update an existing phone-address record.
 
     Args:
         phone_number: The phone number in international format
         address_data: The new address information
-        redis_client: Redis client dependency
+        service: Phone book service dependency
+        background_tasks: Runs fire-and-forget writes after the response
+        if_match: ETags of the versions the record may have; the write is only applied
+            to a record that still has one of them
+        response: The response, whose status is set for accepted writes
 
     Returns:
-        A dictionary containing the phone number and updated address information
+        A dictionary containing the phone number and updated address information, with
+        202 Accepted and without an existence check for fire-and-forget durability, and
+        with 202 Accepted for updates buffered by write-behind
 
     Raises:
-        HTTPException: 404 if phone doesn't exist, 422 if invalid format or data
+        HTTPException: 404 if phone doesn't exist, 412 instead with If-Match or if its
+            version does not match If-Match, 422 if invalid format or data
 
     """
     # Validate phone number format
@@ -52,17 +62,33 @@ async def update_address(
             detail=f'Invalid address data: {e!s}',
         ) from e
 
-    # Create service instance
-    service = PhoneBookService(redis_client)
+    expected_version = await required_version(service, phone_number, if_match)
+
+    if service.durability.level is DurabilityLevel.FIRE_AND_FORGET:
+        write_after_response(
+            background_tasks, service, service.update_address, phone_number, validated_address_data, expected_version
+        )
+        # Set on the injected response, which carries the cookies dependencies set
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {'phone': phone_number, 'address': validated_address_data}
 
     # Try to update the address
-    success = await service.update_address(phone_number, validated_address_data)
+    result = await service.update_address(phone_number, validated_address_data, expected_version=expected_version)
 
-    if not success:
+    # With If-Match, a missing record fails the precondition like a changed one
+    if result is WriteStatus.NOT_FOUND and if_match is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Phone number not found',
         )
+    if result in (WriteStatus.NOT_FOUND, WriteStatus.VERSION_MISMATCH):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail='Record does not match If-Match',
+        )
+
+    if result is WriteStatus.ACCEPTED:
+        response.status_code = status.HTTP_202_ACCEPTED
 
     # Return the updated phone number and address
     return {
@@ -1,4 +1,6 @@
-from pydantic import ConfigDict
+from typing import Literal
+
+from pydantic import ConfigDict, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -7,10 +9,95 @@ class Settings(BaseSettings):
     redis_host: str = 'localhost'
     redis_port: int = 6379
     redis_db: int = 0
+    redis_unix_socket: str = ''  # Path of a Unix socket to reach the primary through instead of redis_host:redis_port
+    # Connection pool of each Redis server: requests wait up to redis_pool_timeout for a free connection
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 5.0
+    redis_socket_timeout: float = 5.0
+    redis_socket_connect_timeout: float = 5.0
+    redis_health_check_interval: float = 30.0  # PING connections idle for longer before reusing them
+    redis_warm_connections: int = 4  # Connections opened per pool at startup
+    # Talk to a Redis Cluster, discovered from redis_cluster_nodes (or redis_host:redis_port if empty)
+    redis_cluster_enabled: bool = False
+    redis_cluster_nodes: str = ''  # Comma-separated host:port startup nodes
+    # Comma-separated host:port servers to spread keys over with a consistent-hash ring; empty for one server
+    redis_shards: str = ''
+    redis_shard_virtual_nodes: int = 160
+    # Send reads to replicas: a comma-separated host:port list, or the replicas Sentinel reports
+    redis_replicas: str = ''
+    # Comma-separated host:port Sentinels; when set, the primary is also discovered through them
+    redis_sentinels: str = ''
+    redis_sentinel_service: str = 'mymaster'
+    # Seconds a client's reads stay on the primary after it writes; 0 disables read-your-writes
+    read_your_writes_window: float = 0.0
+    # Resend slow lookups to a second replica (needs two or more REDIS_REPLICAS)
+    hedged_reads_enabled: bool = False
+    hedge_delay_percentile: float = 95.0  # Hedge once the first replica is slower than this share of recent reads
+    hedge_min_delay_ms: float = 1.0
+    hedge_max_ratio: float = 0.05  # Upper bound on hedges as a share of lookups
     log_level: str = 'INFO'
     api_version: str = 'v1'
+    batch_max_size: int = 1000
+    batch_chunk_size: int = 500
+    batch_concurrency: int = 4
+    import_chunk_size: int = 1000
+    import_max_line_length: int = 65536
+    export_batch_size: int = 1000
+    address_cache_size: int = 0  # 0 disables the in-process address cache
+    address_cache_ttl: float = 60.0
+    # How workers learn about writes made elsewhere: Redis client tracking, keyspace notifications or not at all
+    cache_invalidation: Literal['tracking', 'keyspace', 'none'] = 'tracking'
+    cache_invalidation_health_interval: float = 5.0
+    negative_filter_capacity: int = 0  # 0 disables the negative-lookup filter
+    negative_filter_error_rate: float = 0.01
+    negative_filter_rebuild_interval: float = 3600.0
+    single_flight_enabled: bool = True
+    read_batching_enabled: bool = False
+    read_batch_window_us: int = 0  # 0 batches the reads of one event-loop tick
+    storage_format: Literal['json', 'binary', 'interned'] = 'json'
+    storage_compression: Literal['none', 'zstd'] = 'none'
+    storage_zstd_level: int = 3
+    storage_zstd_dictionary: str = ''  # Path to a trained zstd dictionary; empty for none
+    storage_layout: Literal['string', 'hash', 'content'] = 'string'
+    # Where records live: Redis, this process's memory (single worker, not persisted), an SQLite file
+    # or a read-only snapshot file
+    storage_backend: Literal['redis', 'memory', 'sqlite', 'snapshot'] = 'redis'
+    sqlite_path: str = 'addrex.db'
+    sqlite_read_threads: int = 4
+    sqlite_synchronous: Literal['normal', 'full'] = 'full'
+    snapshot_path: str = ''  # Snapshot file served with STORAGE_BACKEND=snapshot
+    snapshot_check_interval: float = 5.0
+    # Acknowledge plain updates once buffered in the worker, and store them in batches
+    write_behind_enabled: bool = False
+    write_behind_flush_size: int = 500
+    write_behind_flush_interval_ms: float = 100.0
+    write_behind_max_pending: int = 10000
+    # Replicas a write must reach when a request asks for replicated or persisted durability
+    # without a count, and how long to wait for them
+    durability_replicas: int = 1
+    durability_timeout_ms: int = 1000
 
     model_config = ConfigDict(extra='allow', env_file='.env')
 
+    @model_validator(mode='after')
+    def check_cluster_layout(self):
+        if self.redis_cluster_enabled and self.redis_shards:
+            raise ValueError('REDIS_SHARDS cannot be combined with REDIS_CLUSTER_ENABLED')
+        if self.redis_replicas and self.redis_sentinels:
+            raise ValueError('REDIS_REPLICAS cannot be combined with REDIS_SENTINELS')
+        if (self.redis_replicas or self.redis_sentinels) and (self.redis_cluster_enabled or self.redis_shards):
+            raise ValueError('REDIS_REPLICAS and REDIS_SENTINELS need a single Redis primary')
+        # Content layout scripts touch keys they cannot declare, which may live in another slot or shard
+        if self.storage_layout == 'content' and (self.redis_cluster_enabled or self.redis_shards):
+            raise ValueError('STORAGE_LAYOUT=content is not supported with REDIS_CLUSTER_ENABLED or REDIS_SHARDS')
+        # The component dictionary of interned values is kept in Redis
+        if self.storage_backend in ('memory', 'sqlite') and self.storage_format == 'interned':
+            raise ValueError(f'STORAGE_FORMAT=interned is not supported with STORAGE_BACKEND={self.storage_backend}')
+        if self.storage_backend == 'snapshot' and not self.snapshot_path:
+            raise ValueError('STORAGE_BACKEND=snapshot needs SNAPSHOT_PATH')
+        if self.storage_backend == 'snapshot' and self.write_behind_enabled:
+            raise ValueError('WRITE_BEHIND_ENABLED is not supported with STORAGE_BACKEND=snapshot')
+        return self
+
 
 settings = Settings()
@@ -1,26 +1,105 @@
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
+from api import dependencies
 from config.settings import settings
+from models.api_models import CreateAddressRequest
+from services.durability import AppendOnlyDisabledError, ReplicationTimeoutError
+from services.storage_backend import ReadOnlyStorageError
+from utils.validators import normalize_phone_number
 
 # Set up logging
 logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.app_name)
+
+# Sample request data validated at startup
+WARM_UP_ADDRESS = {
+    'street': '1 Main Street',
+    'city': 'Springfield',
+    'state_province': 'Illinois',
+    'postal_code': '62701',
+    'country': 'US',
+}
+WARM_UP_PHONE_NUMBERS = ('+12025550123', '+79123456789', '89123456789')
+
+
+def warm_request_path(app: FastAPI) -> None:
+    """Do the one-off work of a worker's first requests at startup."""
+    # Otherwise built by the first request to /docs or /openapi.json
+    app.openapi()
+    # Compiles the validators' patterns into the re module's cache
+    for phone_number in WARM_UP_PHONE_NUMBERS:
+        normalize_phone_number(phone_number)
+    CreateAddressRequest.model_validate({'address': WARM_UP_ADDRESS})
+    # Per-worker helpers, and the zstd dictionary of the codec, are otherwise created by the first request
+    dependencies.get_address_cache()
+    dependencies.get_key_filter()
+    dependencies.get_single_flight()
+    dependencies.get_read_batcher()
+    dependencies.get_hedged_reader()
+    dependencies.get_storage_codec()
+    dependencies.get_memory_backend()
+    dependencies.get_sqlite_backend()
+    dependencies.get_snapshot_backend()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await dependencies.open_redis_pool()
+    warm_request_path(app)
+    await dependencies.start_cache_invalidation()
+    yield
+    await dependencies.stop_cache_invalidation()
+    await dependencies.stop_write_behind()
+    await dependencies.close_redis_pool()
+    await dependencies.close_storage_backend()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
+
+
+@app.exception_handler(ReadOnlyStorageError)
+async def read_only_storage_error(request: Request, exc: ReadOnlyStorageError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, content={'detail': str(exc)})
+
+
+@app.exception_handler(ReplicationTimeoutError)
+async def replication_timeout_error(request: Request, exc: ReplicationTimeoutError) -> JSONResponse:
+    # The write was applied on the primary; only the requested acknowledgements are missing
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={'detail': str(exc)})
+
+
+@app.exception_handler(AppendOnlyDisabledError)
+async def append_only_disabled_error(request: Request, exc: AppendOnlyDisabledError) -> JSONResponse:
+    # Also applied on the primary; appendonly was disabled after startup or could not be checked
+    return JSONResponse(status_code=status.HTTP_501_NOT_IMPLEMENTED, content={'detail': str(exc)})
+
 
 # Add routes directly without circular imports
+from api.v1.routes.bulk_write import router as bulk_write_router
 from api.v1.routes.create_address import router as create_address_router
 from api.v1.routes.delete_address import router as delete_address_router
+from api.v1.routes.export_addresses import router as export_addresses_router
 from api.v1.routes.get_address import router as get_address_router
+from api.v1.routes.get_addresses import router as get_addresses_router
+from api.v1.routes.get_shared_address import router as get_shared_address_router
+from api.v1.routes.import_addresses import router as import_addresses_router
 from api.v1.routes.update_address import router as update_address_router
 
 # Include routes in the app without prefix, following OpenAPI spec
 app.include_router(get_address_router, tags=['address'])
+app.include_router(get_shared_address_router, tags=['address'])
 app.include_router(create_address_router, tags=['address'])
 app.include_router(update_address_router, tags=['address'])
 app.include_router(delete_address_router, tags=['address'])
+app.include_router(get_addresses_router, tags=['address'])
+app.include_router(bulk_write_router, tags=['address'])
+app.include_router(import_addresses_router, tags=['address'])
+app.include_router(export_addresses_router, tags=['address'])
 
 
 @app.get('/')
@@ -33,3 +112,35 @@ async def root():
 async def health_check():
     logger.info('Health check endpoint accessed')
     return {'status': 'healthy', 'api_version': settings.api_version}
+
+
+@app.get('/metrics')
+async def metrics():
+    """Return in-process counters of this worker."""
+    address_cache = dependencies.get_address_cache()
+    listener = dependencies.cache_invalidation_listener
+    key_filter = dependencies.get_key_filter()
+    single_flight = dependencies.get_single_flight()
+    read_batcher = dependencies.get_read_batcher()
+    storage_codec = dependencies.get_storage_codec()
+    replica_router = dependencies.replica_router
+    hedged_reader = dependencies.get_hedged_reader()
+    memory_backend = dependencies.get_memory_backend()
+    sqlite_backend = dependencies.get_sqlite_backend()
+    snapshot_backend = dependencies.get_snapshot_backend()
+    write_behind = dependencies.write_behind
+    return {
+        'address_cache': address_cache.stats() if address_cache else None,
+        'cache_invalidation': listener.stats() if listener else None,
+        'negative_lookup_filter': key_filter.stats() if key_filter else None,
+        'single_flight': single_flight.stats() if single_flight else None,
+        'read_batcher': read_batcher.stats() if read_batcher else None,
+        'component_dictionary': storage_codec.components.stats(),
+        'replica_routing': replica_router.stats() if replica_router else None,
+        'hedged_reads': hedged_reader.stats() if hedged_reader else None,
+        'redis_pool': dependencies.redis_pool_stats(),
+        'memory_backend': memory_backend.stats() if memory_backend else None,
+        'sqlite_backend': sqlite_backend.stats() if sqlite_backend else None,
+        'snapshot_backend': snapshot_backend.stats() if snapshot_backend else None,
+        'write_behind': write_behind.stats() if write_behind else None,
+    }
@@ -1,7 +1,35 @@
-from pydantic import BaseModel
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, model_validator
 
 from .address import Address
 
 
 class CreateAddressRequest(BaseModel):
     address: Address
+
+
+class BatchLookupRequest(BaseModel):
+    phone_numbers: list[str] = Field(..., min_length=1, description='Phone numbers to look up')
+
+
+class BulkOperation(BaseModel):
+    op: Literal['create', 'update', 'delete'] = Field(..., description='Kind of write to apply')
+    phone: str = Field(..., description='Phone number in international format')
+    address: Address | None = Field(default=None, description='New address, required for create and update')
+
+    @model_validator(mode='after')
+    def require_address_for_writes(self):
+        if self.op != 'delete' and self.address is None:
+            raise ValueError(f'Address is required for {self.op} operations')
+        return self
+
+
+class BulkWriteRequest(BaseModel):
+    # Items are validated one by one as BulkOperation so a bad item does not reject the batch
+    operations: list[dict[str, Any]] = Field(..., min_length=1, description='Operations to apply, in order')
+
+
+class ImportRecord(BaseModel):
+    phone: str = Field(..., description='Phone number in international format')
+    address: Address
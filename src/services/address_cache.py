@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+
+class AddressCache:
+    """Bounded in-process LRU cache of addresses with a per-entry TTL.
+
+    Only found addresses are cached, with the version tag of their stored value when
+    the reader had it. Cached dictionaries are shared between callers and must not be
+    mutated.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any], str | None]] = OrderedDict()
+        # Bumped on every invalidation; lets readers detect a write that raced their fetch
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, phone_number: str) -> dict[str, Any] | None:
+        """Return the cached address, or None on a miss or an expired entry."""
+        entry = self.get_versioned(phone_number)
+        return None if entry is None else entry[0]
+
+    def get_versioned(self, phone_number: str, need_version: bool = False) -> tuple[dict[str, Any], str | None] | None:
+        """Return the cached address and its version tag, or None on a miss or an expired entry.
+
+        With ``need_version``, an entry cached without its version is a miss.
+        """
+        entry = self._entries.get(phone_number)
+        if entry is None or (need_version and entry[2] is None):
+            self.misses += 1
+            return None
+
+        expires_at, address, version = entry
+        if expires_at <= self._clock():
+            del self._entries[phone_number]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(phone_number)
+        self.hits += 1
+        return address, version
+
+    def set(
+        self, phone_number: str, address: dict[str, Any], generation: int | None = None, version: str | None = None
+    ) -> None:
+        """Cache an address, evicting the least recently used entries beyond ``max_size``.
+
+        Args:
+            phone_number: The phone number the address belongs to
+            address: The address read from storage
+            generation: ``generation`` observed before the read; if any invalidation
+                happened since, the value may be stale and is not cached
+            version: Version tag of the stored value, if the reader has it
+
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        self._entries[phone_number] = (self._clock() + self.ttl, address, version)
+        self._entries.move_to_end(phone_number)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, phone_number: str) -> None:
+        """Drop the cached address for a phone number after it was written."""
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.pop(phone_number, None)
+
+    def clear(self) -> None:
+        """Drop every cached address."""
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """Return cache counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
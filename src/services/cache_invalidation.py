@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import math
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from services.address_cache import AddressCache
+from services.key_layout import StringKeyLayout
+from services.negative_lookup_filter import NegativeLookupFilter
+
+logger = logging.getLogger(__name__)
+
+# Channel that receives server-assisted client tracking invalidations in RESP2
+TRACKING_CHANNEL = '__redis__:invalidate'
+# Keyspace notification flags needed for keyevent messages on string, hash and generic events
+KEYSPACE_EVENT_FLAGS = 'E$hgxe'
+KEYSPACE_EVENTS = ('set', 'hset', 'hdel', 'del', 'expired', 'evicted')
+# Keyevent channel suffixes that mean the key no longer exists
+KEYSPACE_REMOVAL_EVENTS = (':del', ':expired', ':evicted')
+
+
+class CacheInvalidationListener:
+    """Evicts entries from a worker's address cache when their keys change in Redis.
+
+    In ``tracking`` mode Redis client tracking (BCAST, restricted to phone key
+    prefixes) is redirected to a dedicated subscriber connection, so every write by
+    any client produces an invalidation. ``keyspace`` mode subscribes to keyevent
+    notifications instead and is used automatically if the server does not support
+    tracking. The whole cache is cleared whenever the listener (re)connects, since
+    invalidations may have been missed while it was not subscribed.
+
+    The same messages keep an optional negative-lookup filter current. The filter is
+    rebuilt from a SCAN after every (re)connect and then every ``filter_rebuild_interval``
+    seconds to shed members that have since been deleted. A message about a key holding
+    many records, such as a hash bucket, does not say which of them changed; rather
+    than adding every number the key could hold, the numbers it does hold are read
+    back in batches and added.
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        cache: AddressCache | None,
+        mode: str = 'tracking',
+        health_check_interval: float = 5.0,
+        reconnect_delay: float = 1.0,
+        key_filter: NegativeLookupFilter | None = None,
+        filter_rebuild_interval: float = 3600.0,
+        layout: StringKeyLayout | None = None,
+    ):
+        self.redis_client = redis_client
+        self.cache = cache
+        self.key_filter = key_filter
+        self.filter_rebuild_interval = filter_rebuild_interval
+        self.layout = layout or StringKeyLayout()
+        self.mode = mode
+        self.health_check_interval = health_check_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self.invalidations_received = 0
+        self.reconnects = 0
+        self._task: asyncio.Task | None = None
+        # Multi-record keys written since their members were last added to the filter
+        self._written_keys: set[str] = set()
+        self._keys_written = asyncio.Event()
+
+    async def start(self) -> None:
+        """Start listening in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop listening and close the listener's connections."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return listener state and counters for monitoring."""
+        return {
+            'mode': self.mode,
+            'connected': self.connected,
+            'invalidations_received': self.invalidations_received,
+            'reconnects': self.reconnects,
+        }
+
+    def handle_message(self, message: Any) -> None:
+        """Apply one pub/sub message from the subscriber connection."""
+        if not isinstance(message, list) or len(message) != 3 or message[0] != 'message':
+            return
+
+        channel, data = message[1], message[2]
+        if data is None:
+            # Tracking sends a null key list when the database is flushed
+            self._clear_cache()
+            return
+
+        one_record = self.layout.one_key_per_record
+        # Only safe to remove from the filter when the deleted key held a single record
+        removed = channel.endswith(KEYSPACE_REMOVAL_EVENTS) and one_record
+        for key in data if isinstance(data, list) else [data]:
+            self.invalidations_received += 1
+            phone_numbers = self.layout.phone_numbers_for_key(key)
+            if self.cache is not None:
+                for phone_number in phone_numbers:
+                    self.cache.invalidate(phone_number)
+            if self.key_filter is None or not phone_numbers:
+                continue
+            if not one_record:
+                # Adding every number the key may hold would saturate the filter
+                self._written_keys.add(key)
+                self._keys_written.set()
+            elif removed:
+                self.key_filter.remove(phone_numbers[0])
+            else:
+                self.key_filter.add(phone_numbers[0])
+
+    def _clear_cache(self) -> None:
+        if self.cache is not None:
+            self.cache.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except (RedisError, OSError) as e:
+                logger.warning(f'Cache invalidation listener disconnected: {e!s}')
+            finally:
+                self.connected = False
+                if self.key_filter is not None:
+                    self.key_filter.suspend()
+            self._clear_cache()
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self) -> None:
+        pool = self.redis_client.connection_pool
+        subscriber = pool.make_connection()
+        tracker = pool.make_connection()
+        try:
+            await subscriber.connect()
+            await tracker.connect()
+            await self._subscribe(subscriber, tracker)
+
+            # Anything cached before the subscription was active may be stale
+            self._clear_cache()
+            self.connected = True
+
+            tasks = {
+                asyncio.create_task(self._read_messages(subscriber)),
+                asyncio.create_task(self._check_health(tracker)),
+            }
+            if self.key_filter is not None:
+                tasks.add(asyncio.create_task(self._maintain_filter()))
+                if not self.layout.one_key_per_record:
+                    tasks.add(asyncio.create_task(self._add_written_members()))
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            await subscriber.disconnect()
+            await tracker.disconnect()
+
+    async def _subscribe(self, subscriber: Any, tracker: Any) -> None:
+        if self.mode == 'tracking':
+            await subscriber.send_command('CLIENT', 'ID')
+            client_id = await subscriber.read_response()
+            await subscriber.send_command('SUBSCRIBE', TRACKING_CHANNEL)
+            await subscriber.read_response()
+
+            prefixes = [arg for prefix in self.layout.tracking_prefixes for arg in ('PREFIX', prefix)]
+            await tracker.send_command('CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST', *prefixes)
+            try:
+                await tracker.read_response()
+                return
+            except ResponseError as e:
+                logger.warning(f'Client tracking unavailable, falling back to keyspace notifications: {e!s}')
+                self.mode = 'keyspace'
+                await subscriber.send_command('UNSUBSCRIBE', TRACKING_CHANNEL)
+                await subscriber.read_response()
+
+        await self._enable_keyspace_events(tracker)
+        db = self.redis_client.connection_pool.connection_kwargs.get('db', 0)
+        channels = [f'__keyevent@{db}__:{event}' for event in KEYSPACE_EVENTS]
+        await subscriber.send_command('SUBSCRIBE', *channels)
+        for _ in channels:
+            await subscriber.read_response()
+
+    async def _enable_keyspace_events(self, connection: Any) -> None:
+        """Add the keyevent flags we need to the server's notify-keyspace-events."""
+        try:
+            await connection.send_command('CONFIG', 'GET', 'notify-keyspace-events')
+            current = (await connection.read_response())[1]
+            if 'A' in current and 'E' in current:
+                return
+            flags = ''.join(sorted(set(current) | set(KEYSPACE_EVENT_FLAGS)))
+            await connection.send_command('CONFIG', 'SET', 'notify-keyspace-events', flags)
+            await connection.read_response()
+        except ResponseError as e:
+            logger.warning(
+                f'Could not enable keyspace notifications ({e!s}); '
+                + f'set notify-keyspace-events to include {KEYSPACE_EVENT_FLAGS} on the server',
+            )
+
+    async def _read_messages(self, subscriber: Any) -> None:
+        # Messages may be minutes apart, so the pool's socket timeout must not end the wait
+        while True:
+            self.handle_message(await subscriber.read_response(timeout=math.inf))
+
+    async def _check_health(self, tracker: Any) -> None:
+        # Tracking stops silently if the tracker connection drops, so probe it regularly
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await tracker.send_command('PING')
+            await tracker.read_response()
+
+    async def _add_written_members(self) -> None:
+        # A failure ends the connection, after which the filter is suspended and rebuilt
+        while True:
+            await self._keys_written.wait()
+            self._keys_written.clear()
+            keys, self._written_keys = list(self._written_keys), set()
+            for phone_number in await self.layout.stored_phone_numbers(self.redis_client, keys):
+                self.key_filter.add(phone_number)
+
+    async def _maintain_filter(self) -> None:
+        # Built only once subscribed, so every write after the SCAN starts is also seen as a message
+        while True:
+            added = await self.key_filter.build(self.layout.scan_phone_numbers(self.redis_client))
+            logger.info(f'Negative lookup filter built with {added} phone numbers')
+            await asyncio.sleep(self.filter_rebuild_interval)
@@ -0,0 +1,91 @@
+from collections.abc import Iterable
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+from services.key_layout import _script_sha
+
+# Keys of the shared dictionary; the hash tag keeps them in one cluster slot for the script
+COMPONENT_IDS_KEY = 'addrex:{dict}:ids'
+COMPONENT_STRINGS_KEY = 'addrex:{dict}:strings'
+COMPONENT_SEQUENCE_KEY = 'addrex:{dict}:seq'
+# Strings interned, or IDs loaded, per round trip
+DEFAULT_RESOLVE_BATCH_SIZE = 500
+
+# Returns the ID of every string in ARGV, assigning the next free ID to strings seen for
+# the first time. Runs atomically, so concurrent writers agree on every assignment.
+INTERN_SCRIPT = """
+local ids = {}
+for i, value in ipairs(ARGV) do
+    local id = redis.call('HGET', KEYS[1], value)
+    if not id then
+        id = redis.call('INCR', KEYS[3])
+        redis.call('HSET', KEYS[1], value, id)
+        redis.call('HSET', KEYS[2], id, value)
+    end
+    ids[i] = tonumber(id)
+end
+return ids
+"""
+
+
+class ComponentDictionary:
+    """Shared Redis dictionary mapping repeated address components to small integer IDs.
+
+    Assignments are permanent: an ID is never reused or remapped, so every worker can
+    cache both directions in process without invalidation. Misses are resolved in
+    batches, one script call (to intern) or one HMGET (to load) per batch.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_RESOLVE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.interned = 0
+        self.loaded = 0
+        self._ids: dict[str, int] = {}
+        self._strings: dict[int, str] = {}
+
+    def id_for(self, value: str) -> int | None:
+        """Return the cached ID of ``value``, or None if this worker has not resolved it."""
+        return self._ids.get(value)
+
+    def string_for(self, component_id: int) -> str | None:
+        """Return the cached string of ``component_id``, or None if this worker has not resolved it."""
+        return self._strings.get(component_id)
+
+    async def intern(self, redis_client: Redis, values: Iterable[str]) -> None:
+        """Make sure every string in ``values`` has an ID, assigning new ones as needed."""
+        missing = [value for value in dict.fromkeys(values) if value not in self._ids]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            keys = (COMPONENT_IDS_KEY, COMPONENT_STRINGS_KEY, COMPONENT_SEQUENCE_KEY)
+            try:
+                ids = await redis_client.evalsha(_script_sha(INTERN_SCRIPT), len(keys), *keys, *batch)
+            except NoScriptError:
+                ids = await redis_client.eval(INTERN_SCRIPT, len(keys), *keys, *batch)
+            for value, component_id in zip(batch, ids, strict=True):
+                self._cache(value, int(component_id))
+            self.interned += len(batch)
+
+    async def load(self, redis_client: Redis, component_ids: Iterable[int]) -> None:
+        """Fetch the strings of IDs not cached yet; unknown IDs stay unresolved."""
+        missing = [component_id for component_id in dict.fromkeys(component_ids) if component_id not in self._strings]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            values = await redis_client.hmget(COMPONENT_STRINGS_KEY, batch)
+            for component_id, value in zip(batch, values, strict=True):
+                if value is not None:
+                    self._cache(value, component_id)
+            self.loaded += len(batch)
+
+    def _cache(self, value: str, component_id: int) -> None:
+        self._ids[value] = component_id
+        self._strings[component_id] = value
+
+    def stats(self) -> dict[str, Any]:
+        """Return the size of the in-process cache and resolution counters for monitoring."""
+        return {
+            'cached': len(self._strings),
+            'interned': self.interned,
+            'loaded': self.loaded,
+        }
@@ -0,0 +1,88 @@
+from enum import StrEnum
+from typing import NamedTuple
+
+# Request header and query parameter choosing a write's durability
+DURABILITY_HEADER = 'Durability'
+DURABILITY_PARAMETER = 'durability'
+
+
+class DurabilityLevel(StrEnum):
+    """How much of a write must be done before the response is sent."""
+
+    # Respond before the write is sent; its outcome is not reported
+    FIRE_AND_FORGET = 'fire-and-forget'
+    # Respond once the primary applied the write
+    PRIMARY = 'primary'
+    # Also wait for replicas to acknowledge it (WAIT)
+    REPLICATED = 'replicated'
+    # Also wait for it to be fsynced to the append-only file locally and on replicas (WAITAOF)
+    PERSISTED = 'persisted'
+
+
+class Durability(NamedTuple):
+    level: DurabilityLevel = DurabilityLevel.PRIMARY
+    # Replicas that must acknowledge a replicated or persisted write
+    replicas: int = 0
+    # Milliseconds to wait for them
+    timeout_ms: int = 0
+
+    @property
+    def waits(self) -> bool:
+        """Whether writes wait for acknowledgements beyond the primary's reply."""
+        return self.level in (DurabilityLevel.REPLICATED, DurabilityLevel.PERSISTED)
+
+
+class DurabilityError(Exception):
+    """Raised when a write was applied on the primary but the durability it asked for was not confirmed."""
+
+
+class ReplicationTimeoutError(DurabilityError):
+    """Raised when fewer replicas than required acknowledged a write within the timeout.
+
+    The write itself was applied on the primary.
+    """
+
+    def __init__(self, acknowledged: int, durability: Durability):
+        super().__init__(
+            f'Stored on the primary, but {acknowledged} of {durability.replicas} replicas acknowledged it '
+            f'as {durability.level} within {durability.timeout_ms} ms'
+        )
+        self.acknowledged = acknowledged
+        self.durability = durability
+
+
+class AppendOnlyDisabledError(DurabilityError):
+    """Raised when a persisted write cannot be waited for because the primary has appendonly disabled.
+
+    The write itself was applied on the primary.
+    """
+
+    def __init__(self):
+        super().__init__(
+            f'Stored on the primary, but {DurabilityLevel.PERSISTED} durability needs appendonly enabled on it'
+        )
+
+
+def parse_durability(value: str, default_replicas: int, timeout_ms: int) -> Durability:
+    """Parse a durability choice: a level, optionally followed by ':N' replicas for the waiting levels.
+
+    Raises:
+        ValueError: If the value names no level or has an invalid replica count
+
+    """
+    name, _, count = value.strip().lower().partition(':')
+    try:
+        level = DurabilityLevel(name)
+    except ValueError:
+        raise ValueError(
+            f'Unknown durability {value!r}; expected one of {", ".join(DurabilityLevel)}, '
+            'with an optional :N replica count for replicated and persisted'
+        ) from None
+    durability = Durability(level)
+    if not durability.waits:
+        if count:
+            raise ValueError(f'Durability {level} takes no replica count')
+        return durability
+    if count and not (count.isascii() and count.isdigit()):
+        raise ValueError(f'Invalid replica count in durability {value!r}')
+    return Durability(level, int(count) if count else default_replicas, timeout_ms)
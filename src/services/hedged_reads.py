@@ -0,0 +1,120 @@
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+T = TypeVar('T')
+
+# Latencies kept to estimate the hedge delay from
+DEFAULT_SAMPLE_SIZE = 1000
+# Reads needed before hedging starts; with fewer the percentile is mostly noise
+MIN_SAMPLES = 100
+# The delay is recomputed after this many new samples rather than on every read
+RECOMPUTE_INTERVAL = 100
+# Hedges that may be spent at once from unused budget, e.g. after a quiet period
+MAX_HEDGE_BURST = 10.0
+
+
+class HedgedReader:
+    """Sends a read to a second replica when the first is slower than usual.
+
+    If the first attempt has not answered after ``percentile`` of recent read latencies,
+    the same read is sent to another replica; the first answer wins and the other
+    attempt is cancelled. Latencies are sampled from first attempts that complete, so
+    the delay tracks the primary attempt's own tail, not that of hedged reads. Each read adds ``max_ratio`` of a hedge to a budget that a
+    hedge spends in full, so hedges stay below that share of reads even when every
+    replica is slow and cannot double the load during an outage.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_delay: float = 0.001,
+        max_ratio: float = 0.05,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._samples: deque[float] = deque(maxlen=sample_size)
+        self._new_samples = 0
+        self._delay: float | None = None
+        self._budget = 0.0
+        self.reads = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0
+
+    @property
+    def delay(self) -> float | None:
+        """Seconds to wait for the first attempt before hedging; None until enough reads were seen."""
+        return self._delay
+
+    async def read(self, first: Callable[[], Awaitable[T]], second: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``first()``, or of ``second()`` if hedged and faster.
+
+        An attempt that fails does not win: the other one's result is awaited instead,
+        and the error is only raised if both fail.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.reads += 1
+        self._budget = min(MAX_HEDGE_BURST, self._budget + self.max_ratio)
+
+        async def timed_first() -> T:
+            result = await first()
+            # Failed or cancelled attempts have no latency of their own to sample
+            self._record(loop.time() - started)
+            return result
+
+        first_task = asyncio.ensure_future(timed_first())
+        try:
+            if self._delay is None:
+                return await first_task
+            done, _ = await asyncio.wait({first_task}, timeout=self._delay)
+            if done:
+                return first_task.result()
+            if self._budget < 1:
+                self.hedges_denied += 1
+                return await first_task
+            self._budget -= 1
+            self.hedges += 1
+            return await self._first_result(first_task, asyncio.ensure_future(second()))
+        finally:
+            first_task.cancel()
+
+    async def _first_result(self, first_task: asyncio.Future, second_task: asyncio.Future) -> Any:
+        pending = {first_task, second_task}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _record(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._new_samples += 1
+        if len(self._samples) >= MIN_SAMPLES and (self._delay is None or self._new_samples >= RECOMPUTE_INTERVAL):
+            self._new_samples = 0
+            samples = sorted(self._samples)
+            index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+            self._delay = max(self.min_delay, samples[index])
+
+    def stats(self) -> dict[str, Any]:
+        """Return hedging counts and the current hedge delay for monitoring."""
+        return {
+            'reads': self.reads,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedges_denied': self.hedges_denied,
+            'delay_ms': self._delay * 1000 if self._delay is not None else None,
+        }
@@ -0,0 +1,455 @@
+import functools
+import hashlib
+from collections.abc import AsyncIterator
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+from services import redis_cluster
+from utils.validators import validate_phone_format
+
+# Compare-and-set scripts. A record's version is the SHA1 of its stored value, so
+# the check and the write happen atomically on the server in a single round trip.
+# Both return 1 on success, 0 if the key is missing and -1 on a version mismatch.
+CAS_UPDATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if redis.sha1hex(current) ~= ARGV[1] then
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2])
+return 1
+"""
+
+CAS_DELETE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if redis.sha1hex(current) ~= ARGV[1] then
+    return -1
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+# Hash layout equivalents: the record is field ARGV[1] of bucket KEYS[1]
+HASH_CAS_UPDATE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+if redis.sha1hex(current) ~= ARGV[2] then
+    return -1
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+return 1
+"""
+
+HASH_CAS_DELETE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return 0
+end
+if redis.sha1hex(current) ~= ARGV[2] then
+    return -1
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+return 1
+"""
+
+# HSET only if the field exists (Redis 7 has no HSET XX); returns 1 if updated, 0 if missing
+HASH_UPDATE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+return 1
+"""
+
+
+@functools.cache
+def _script_sha(script: str) -> str:
+    return hashlib.sha1(script.encode()).hexdigest()
+
+
+# Phone keys start with '+' (E.164) or '8' (Russian national format)
+PHONE_KEY_PREFIXES = ('+', '8')
+# Prefix of the bucket hashes of the hash layout
+HASH_BUCKET_PREFIX = 'addrex:h:'
+# Trailing digits of the phone number that become the field inside its bucket hash
+HASH_FIELD_DIGITS = 2
+# Prefixes of the content layout's shared values and of the phone number sets referencing them
+CONTENT_ADDRESS_PREFIX = 'addrex:a:'
+CONTENT_PHONES_PREFIX = 'addrex:p:'
+
+# Content layout scripts. KEYS[1] is the phone key, which holds the content hash (the SHA1
+# of the stored value, so also its version). The set of phone numbers referencing a hash is
+# its reference count: the shared value is deleted with the last reference.
+_CONTENT_HELPERS = f"""
+local function release(phone, hash)
+    redis.call('SREM', '{CONTENT_PHONES_PREFIX}' .. hash, phone)
+    if redis.call('EXISTS', '{CONTENT_PHONES_PREFIX}' .. hash) == 0 then
+        redis.call('DEL', '{CONTENT_ADDRESS_PREFIX}' .. hash)
+    end
+end
+local function acquire(phone, hash, value)
+    redis.call('SET', '{CONTENT_ADDRESS_PREFIX}' .. hash, value, 'NX')
+    redis.call('SADD', '{CONTENT_PHONES_PREFIX}' .. hash, phone)
+    redis.call('SET', phone, hash)
+end
+local function assign(phone, current, hash, value)
+    if current ~= hash then
+        if current then
+            release(phone, current)
+        end
+        acquire(phone, hash, value)
+    end
+end
+"""
+
+CONTENT_GET_SCRIPT = f"""
+local hash = redis.call('GET', KEYS[1])
+if not hash then
+    return false
+end
+return redis.call('GET', '{CONTENT_ADDRESS_PREFIX}' .. hash)
+"""
+
+CONTENT_SHARED_SCRIPT = f"""
+local hash = redis.call('GET', KEYS[1])
+if not hash then
+    return false
+end
+return redis.call('SMEMBERS', '{CONTENT_PHONES_PREFIX}' .. hash)
+"""
+
+# ARGV: mode ('create', 'update' or 'upsert'), content hash, value. Returns 1 on success and
+# 0 if the phone number's existence rules the write out; upserts return 1 only on create.
+CONTENT_WRITE_SCRIPT = (
+    _CONTENT_HELPERS
+    + """
+local current = redis.call('GET', KEYS[1])
+if (ARGV[1] == 'create' and current) or (ARGV[1] == 'update' and not current) then
+    return 0
+end
+assign(KEYS[1], current, ARGV[2], ARGV[3])
+if ARGV[1] == 'upsert' and current then
+    return 0
+end
+return 1
+"""
+)
+
+CONTENT_DELETE_SCRIPT = (
+    _CONTENT_HELPERS
+    + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+release(KEYS[1], current)
+return 1
+"""
+)
+
+# The stored content hash is the version, so the check needs no hashing of the current value
+CONTENT_CAS_UPDATE_SCRIPT = (
+    _CONTENT_HELPERS
+    + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    return -1
+end
+assign(KEYS[1], current, redis.sha1hex(ARGV[2]), ARGV[2])
+return 1
+"""
+)
+
+CONTENT_CAS_DELETE_SCRIPT = (
+    _CONTENT_HELPERS
+    + """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    return -1
+end
+redis.call('DEL', KEYS[1])
+release(KEYS[1], current)
+return 1
+"""
+)
+
+
+class StringKeyLayout:
+    """One top-level string key per record, named by the phone number.
+
+    Write methods return whatever the client returns: a coroutine for a client, or the
+    pipeline itself when queued on a pipeline, so the same call serves both.
+    """
+
+    name = 'string'
+    tracking_prefixes = PHONE_KEY_PREFIXES
+    # A change notification for a key concerns exactly one record
+    one_key_per_record = True
+    cas_update_script = CAS_UPDATE_SCRIPT
+    cas_delete_script = CAS_DELETE_SCRIPT
+    # Scripts that writes queue by SHA and must be loaded before a pipeline runs
+    pipeline_scripts: tuple[str, ...] = ()
+
+    def get(self, client: Any, phone_number: str) -> Any:
+        return client.get(phone_number)
+
+    async def mget(self, client: Redis, phone_numbers: list[str]) -> list[Any]:
+        return await redis_cluster.mget(client, phone_numbers)
+
+    def create(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return client.set(phone_number, value, nx=True)
+
+    def update(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return client.set(phone_number, value, xx=True)
+
+    def upsert(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        # SET ... GET returns the previous value, telling creates and updates apart
+        return client.set(phone_number, value, get=True)
+
+    def delete(self, client: Any, phone_number: str) -> Any:
+        return client.delete(phone_number)
+
+    @staticmethod
+    def upsert_created(result: Any) -> bool:
+        return result is None
+
+    def cas_target(self, phone_number: str) -> tuple[list[str], list[str]]:
+        """Return the script keys and leading arguments addressing a record."""
+        return [phone_number], []
+
+    async def scan(self, client: Redis, cursor: int, count: int) -> tuple[int, list[tuple[str, Any]]]:
+        """Run one SCAN step and return the next cursor and the (phone number, value) pairs found."""
+        cursor, keys = await redis_cluster.scan_keys(client, cursor, count)
+        phone_numbers = [key for key in keys if validate_phone_format(key)]
+        if not phone_numbers:
+            return cursor, []
+        values = await redis_cluster.mget(client, phone_numbers)
+        return cursor, list(zip(phone_numbers, values, strict=True))
+
+    async def scan_phone_numbers(self, client: Redis, count: int = 1000) -> AsyncIterator[list[str]]:
+        """Yield the stored phone numbers in batches, without fetching their values."""
+        cursor = 0
+        while True:
+            cursor, keys = await redis_cluster.scan_keys(client, cursor, count)
+            yield [key for key in keys if validate_phone_format(key)]
+            if cursor == 0:
+                return
+
+    def phone_numbers_for_key(self, key: str) -> list[str]:
+        """Return the phone numbers whose record may live in ``key``."""
+        return [key] if key.startswith(PHONE_KEY_PREFIXES) else []
+
+    async def stored_phone_numbers(self, client: Redis, keys: list[str]) -> list[str]:
+        """Return the phone numbers stored in ``keys``; only needed if a key holds several records."""
+        raise NotImplementedError(f'The {self.name} layout stores one record per key')
+
+    async def shared_phone_numbers(self, client: Redis, phone_number: str) -> list[str] | None:
+        """Return the phone numbers storing the same address as ``phone_number``.
+
+        Returns None if ``phone_number`` has no record.
+
+        Raises:
+            NotImplementedError: If the layout does not index phone numbers by address
+
+        """
+        raise NotImplementedError(f'The {self.name} layout does not index phone numbers by address')
+
+
+class HashKeyLayout(StringKeyLayout):
+    """Records grouped into small hashes, one per phone number prefix.
+
+    A record is field ``chr(NN)`` of hash ``addrex:h:<phone without last two digits>``,
+    where NN are its last two digits, so a bucket holds at most 100 records and stays
+    within Redis's default ``hash-max-listpack-entries`` (128). Buckets only stay
+    listpack-encoded while every value fits ``hash-max-listpack-value`` (64 bytes by
+    default), which the binary storage format does for typical addresses.
+    """
+
+    name = 'hash'
+    tracking_prefixes = (HASH_BUCKET_PREFIX,)
+    one_key_per_record = False
+    cas_update_script = HASH_CAS_UPDATE_SCRIPT
+    cas_delete_script = HASH_CAS_DELETE_SCRIPT
+    pipeline_scripts = (HASH_UPDATE_SCRIPT,)
+
+    @staticmethod
+    def locate(phone_number: str) -> tuple[str, str]:
+        """Return the bucket key and the one-character field holding a phone number."""
+        prefix, digits = phone_number[:-HASH_FIELD_DIGITS], phone_number[-HASH_FIELD_DIGITS:]
+        return HASH_BUCKET_PREFIX + prefix, chr(int(digits))
+
+    @staticmethod
+    def phone_number(bucket: str, field: str) -> str:
+        """Return the phone number stored in ``field`` of ``bucket``."""
+        return f'{bucket.removeprefix(HASH_BUCKET_PREFIX)}{ord(field):0{HASH_FIELD_DIGITS}d}'
+
+    def get(self, client: Any, phone_number: str) -> Any:
+        return client.hget(*self.locate(phone_number))
+
+    async def mget(self, client: Redis, phone_numbers: list[str]) -> list[Any]:
+        fields_by_bucket: dict[str, list[str]] = {}
+        for phone_number in phone_numbers:
+            bucket, field = self.locate(phone_number)
+            fields_by_bucket.setdefault(bucket, []).append(field)
+
+        async with client.pipeline(transaction=False) as pipe:
+            for bucket, fields in fields_by_bucket.items():
+                pipe.hmget(bucket, fields)
+            results = await pipe.execute()
+
+        values = {}
+        for (bucket, fields), bucket_values in zip(fields_by_bucket.items(), results, strict=True):
+            values.update(zip(((bucket, field) for field in fields), bucket_values, strict=True))
+        return [values[self.locate(phone_number)] for phone_number in phone_numbers]
+
+    def create(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return client.hsetnx(*self.locate(phone_number), value)
+
+    def update(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        bucket, field = self.locate(phone_number)
+        return client.evalsha(_script_sha(HASH_UPDATE_SCRIPT), 1, bucket, field, value)
+
+    def upsert(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        # HSET returns the number of fields added: 1 for a new record, 0 for an update
+        return client.hset(*self.locate(phone_number), value)
+
+    def delete(self, client: Any, phone_number: str) -> Any:
+        return client.hdel(*self.locate(phone_number))
+
+    @staticmethod
+    def upsert_created(result: Any) -> bool:
+        return result == 1
+
+    def cas_target(self, phone_number: str) -> tuple[list[str], list[str]]:
+        bucket, field = self.locate(phone_number)
+        return [bucket], [field]
+
+    async def scan(self, client: Redis, cursor: int, count: int) -> tuple[int, list[tuple[str, Any]]]:
+        cursor, buckets = await redis_cluster.scan_keys(client, cursor, count, match=f'{HASH_BUCKET_PREFIX}*')
+        if not buckets:
+            return cursor, []
+        async with client.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.hgetall(bucket)
+            results = await pipe.execute()
+
+        records = []
+        for bucket, fields in zip(buckets, results, strict=True):
+            records.extend((self.phone_number(bucket, field), value) for field, value in fields.items())
+        return cursor, records
+
+    async def scan_phone_numbers(self, client: Redis, count: int = 1000) -> AsyncIterator[list[str]]:
+        cursor = 0
+        while True:
+            cursor, buckets = await redis_cluster.scan_keys(client, cursor, count, match=f'{HASH_BUCKET_PREFIX}*')
+            if buckets:
+                yield await self.stored_phone_numbers(client, buckets)
+            if cursor == 0:
+                return
+
+    async def stored_phone_numbers(self, client: Redis, buckets: list[str]) -> list[str]:
+        """Return the phone numbers stored in ``buckets``, with one HKEYS per bucket in a pipeline."""
+        async with client.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.hkeys(bucket)
+            results = await pipe.execute()
+        return [
+            self.phone_number(bucket, field)
+            for bucket, fields in zip(buckets, results, strict=True)
+            for field in fields
+        ]
+
+    def phone_numbers_for_key(self, key: str) -> list[str]:
+        if not key.startswith(HASH_BUCKET_PREFIX):
+            return []
+        return [self.phone_number(key, chr(number)) for number in range(10**HASH_FIELD_DIGITS)]
+
+
+class ContentKeyLayout(StringKeyLayout):
+    """Each distinct stored value kept once, under its content hash.
+
+    The phone key holds the SHA1 of the stored value; the value lives in
+    ``addrex:a:<sha1>`` and the phone numbers referencing it in the set
+    ``addrex:p:<sha1>``. Scripts keep the three in step atomically, and the value is
+    deleted together with its last reference. Values of the same address are only
+    shared if they are encoded identically, so keep one storage format per deployment.
+    """
+
+    name = 'content'
+    cas_update_script = CONTENT_CAS_UPDATE_SCRIPT
+    cas_delete_script = CONTENT_CAS_DELETE_SCRIPT
+    pipeline_scripts = (CONTENT_GET_SCRIPT, CONTENT_WRITE_SCRIPT, CONTENT_DELETE_SCRIPT)
+
+    @staticmethod
+    def _write(client: Any, mode: str, phone_number: str, value: str | bytes) -> Any:
+        if isinstance(value, str):
+            # Binary values read back as str carry surrogates; storage_codec.ENCODING_ERRORS,
+            # not imported since storage_codec depends on this module
+            value = value.encode('utf-8', 'surrogateescape')
+        content_hash = hashlib.sha1(value).hexdigest()
+        return client.evalsha(_script_sha(CONTENT_WRITE_SCRIPT), 1, phone_number, mode, content_hash, value)
+
+    def get(self, client: Any, phone_number: str) -> Any:
+        return client.evalsha(_script_sha(CONTENT_GET_SCRIPT), 1, phone_number)
+
+    async def mget(self, client: Redis, phone_numbers: list[str]) -> list[Any]:
+        # A value released between the two MGETs reads as missing, like a record deleted meanwhile
+        hashes = await redis_cluster.mget(client, phone_numbers)
+        unique_hashes = list(dict.fromkeys(content_hash for content_hash in hashes if content_hash is not None))
+        if not unique_hashes:
+            return [None] * len(phone_numbers)
+        values = await redis_cluster.mget(
+            client, [CONTENT_ADDRESS_PREFIX + content_hash for content_hash in unique_hashes]
+        )
+        value_by_hash = dict(zip(unique_hashes, values, strict=True))
+        return [None if content_hash is None else value_by_hash[content_hash] for content_hash in hashes]
+
+    def create(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return self._write(client, 'create', phone_number, value)
+
+    def update(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return self._write(client, 'update', phone_number, value)
+
+    def upsert(self, client: Any, phone_number: str, value: str | bytes) -> Any:
+        return self._write(client, 'upsert', phone_number, value)
+
+    def delete(self, client: Any, phone_number: str) -> Any:
+        return client.evalsha(_script_sha(CONTENT_DELETE_SCRIPT), 1, phone_number)
+
+    @staticmethod
+    def upsert_created(result: Any) -> bool:
+        return result == 1
+
+    async def scan(self, client: Redis, cursor: int, count: int) -> tuple[int, list[tuple[str, Any]]]:
+        cursor, keys = await redis_cluster.scan_keys(client, cursor, count)
+        phone_numbers = [key for key in keys if validate_phone_format(key)]
+        if not phone_numbers:
+            return cursor, []
+        values = await self.mget(client, phone_numbers)
+        return cursor, list(zip(phone_numbers, values, strict=True))
+
+    async def shared_phone_numbers(self, client: Redis, phone_number: str) -> list[str] | None:
+        try:
+            phone_numbers = await client.evalsha(_script_sha(CONTENT_SHARED_SCRIPT), 1, phone_number)
+        except NoScriptError:
+            phone_numbers = await client.eval(CONTENT_SHARED_SCRIPT, 1, phone_number)
+        return None if phone_numbers is None else sorted(phone_numbers)
+
+
+KEY_LAYOUTS = {layout.name: layout for layout in (StringKeyLayout(), HashKeyLayout(), ContentKeyLayout())}
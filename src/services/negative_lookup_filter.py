@@ -0,0 +1,150 @@
+import hashlib
+import math
+from collections.abc import AsyncIterable
+from typing import Any
+
+# Counters stop at this value and are never decremented again, so they cannot underflow
+MAX_COUNT = 255
+
+
+class CountingBloomFilter:
+    """Bloom filter with 8-bit counters instead of bits, so members can be removed.
+
+    Sized for ``capacity`` members at ``error_rate`` false positives. Lookups never
+    give false negatives as long as only members that were added are removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(1, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.counters = bytearray(self.size)
+        self.nonzero = 0
+
+    def _positions(self, item: str) -> list[int]:
+        # Double hashing: k positions from two independent 64-bit hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str) -> None:
+        counters = self.counters
+        for position in self._positions(item):
+            count = counters[position]
+            if count == 0:
+                self.nonzero += 1
+            if count < MAX_COUNT:
+                counters[position] = count + 1
+
+    def remove(self, item: str) -> None:
+        counters = self.counters
+        for position in self._positions(item):
+            count = counters[position]
+            if 0 < count < MAX_COUNT:
+                counters[position] = count - 1
+                if count == 1:
+                    self.nonzero -= 1
+
+    def __contains__(self, item: str) -> bool:
+        counters = self.counters
+        return all(counters[position] for position in self._positions(item))
+
+    def false_positive_rate(self) -> float:
+        """Estimate the current false-positive rate from the share of non-zero counters."""
+        return (self.nonzero / self.size) ** self.hash_count
+
+
+class NegativeLookupFilter:
+    """Per-worker filter of stored phone numbers that answers "definitely absent" without Redis.
+
+    The filter is built from a SCAN of the keyspace and kept up to date by creates
+    through this worker and by the invalidation listener, which reports keys written
+    by any worker. Until a build has completed every number is reported as possibly
+    present. A member is only removed when a keyspace notification reports its
+    deletion, since that guarantees an earlier add; updates and tracking messages
+    (which do not say what changed) only ever add. The filter therefore drifts
+    towards false positives between rebuilds, never towards false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self.checks = 0
+        self.definite_misses = 0
+        self.builds = 0
+        self._filter = CountingBloomFilter(capacity, error_rate)
+        # Filter being rebuilt; receives adds alongside the live one until it replaces it
+        self._pending: CountingBloomFilter | None = None
+
+    def might_contain(self, phone_number: str) -> bool:
+        """Return False only if the phone number is definitely not stored."""
+        if not self.ready:
+            return True
+        self.checks += 1
+        if phone_number in self._filter:
+            return True
+        self.definite_misses += 1
+        return False
+
+    def add(self, phone_number: str) -> None:
+        """Record that a phone number may be stored."""
+        self._filter.add(phone_number)
+        if self._pending is not None:
+            self._pending.add(phone_number)
+
+    def remove(self, phone_number: str) -> None:
+        """Record that a stored phone number was deleted."""
+        # Before the first build the number may never have been added, and during a
+        # build the SCAN may not have reached it yet; removing it could then clear
+        # counters shared with other members
+        if self.ready and self._pending is None:
+            self._filter.remove(phone_number)
+
+    def suspend(self) -> None:
+        """Stop answering definite misses until the next build, e.g. after missed updates."""
+        self.ready = False
+
+    async def build(self, phone_number_batches: AsyncIterable[list[str]]) -> int:
+        """Rebuild the filter from a SCAN of all stored phone numbers.
+
+        Numbers written while the SCAN runs are added to both the live and the new
+        filter, so nothing written during the build is lost when they are swapped.
+
+        Args:
+            phone_number_batches: Batches of stored phone numbers, as yielded by a key layout's SCAN
+
+        Returns:
+            The number of phone numbers added by the SCAN
+
+        """
+        pending = self._pending = CountingBloomFilter(self.capacity, self.error_rate)
+        added = 0
+        try:
+            async for phone_numbers in phone_number_batches:
+                for phone_number in phone_numbers:
+                    pending.add(phone_number)
+                added += len(phone_numbers)
+        finally:
+            self._pending = None
+
+        self._filter = pending
+        self.ready = True
+        self.builds += 1
+        return added
+
+    def stats(self) -> dict[str, Any]:
+        """Return filter state, size and effectiveness for monitoring."""
+        return {
+            'ready': self.ready,
+            'capacity': self.capacity,
+            'target_error_rate': self.error_rate,
+            'estimated_false_positive_rate': self._filter.false_positive_rate(),
+            'memory_bytes': len(self._filter.counters),
+            'hash_count': self._filter.hash_count,
+            'checks': self.checks,
+            'definite_misses': self.definite_misses,
+            'builds': self.builds,
+        }
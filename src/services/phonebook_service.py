@@ -1,12 +1,149 @@
-import json
-from typing import Any
+import asyncio
+import contextlib
+import hashlib
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from enum import StrEnum
+from typing import Any, NamedTuple
 
 from redis.asyncio import Redis
 
+from services.address_cache import AddressCache
+from services.durability import Durability, DurabilityError
+from services.hedged_reads import HedgedReader
+from services.key_layout import StringKeyLayout
+from services.negative_lookup_filter import NegativeLookupFilter
+from services.read_batcher import ReadBatcher
+from services.single_flight import SingleFlight
+from services.storage_backend import RedisBackend, SetCondition, StorageBackend, StoredWrite
+from services.storage_codec import ENCODING_ERRORS, StorageCodec, UnknownComponentError
+from services.write_behind import WriteBehindBuffer
+
+# Keys sent per MGET or pipeline in batch operations, keeping each command (and its reply) bounded
+DEFAULT_BATCH_CHUNK_SIZE = 500
+# Chunks of a bulk write that may be in flight at the same time
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+class WriteStatus(StrEnum):
+    """Outcome of a write operation; routes map it to an HTTP status code."""
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    CONFLICT = 'conflict'
+    NOT_FOUND = 'not_found'
+    VERSION_MISMATCH = 'version_mismatch'
+    # Buffered to be stored later; dropped if the record is deleted meanwhile
+    ACCEPTED = 'accepted'
+    # Rejected by validation before reaching storage
+    INVALID = 'invalid'
+
+
+class WriteOp(StrEnum):
+    """Kind of write in a bulk operation."""
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    # Create or overwrite; reports CREATED or UPDATED
+    UPSERT = 'upsert'
+
+
+# Condition under which each kind of write may store a value
+WRITE_CONDITIONS = {
+    WriteOp.CREATE: SetCondition.IF_MISSING,
+    WriteOp.UPDATE: SetCondition.IF_EXISTS,
+    WriteOp.UPSERT: SetCondition.ALWAYS,
+}
+
+
+class WriteOperation(NamedTuple):
+    op: WriteOp
+    phone_number: str
+    address: dict[str, Any] | None = None
+
+
+def address_version(stored_value: str | bytes) -> str:
+    """Return the version tag of a stored record (SHA1 of the stored value).
+
+    The tag depends on the encoding as well as the address: rewriting a record in
+    another storage format or with other interned component IDs changes it.
+    """
+    if isinstance(stored_value, str):
+        stored_value = stored_value.encode('utf-8', ENCODING_ERRORS)
+    return hashlib.sha1(stored_value).hexdigest()
+
 
 class PhoneBookService:
-    def __init__(self, redis_client: Redis):
+    # How much of each write is done before it returns; primary acknowledgement unless given
+    durability = Durability()
+
+    def __init__(
+        self,
+        redis_client: Redis,
+        cache: AddressCache | None = None,
+        key_filter: NegativeLookupFilter | None = None,
+        single_flight: SingleFlight | None = None,
+        read_batcher: ReadBatcher | None = None,
+        codec: StorageCodec | None = None,
+        layout: StringKeyLayout | None = None,
+        read_client: Redis | None = None,
+        fresh_reads: bool = False,
+        on_write: Callable[[], None] | None = None,
+        on_read: Callable[[], None] | None = None,
+        hedged_reader: HedgedReader | None = None,
+        hedge_client: Redis | None = None,
+        storage: StorageBackend | None = None,
+        write_behind: WriteBehindBuffer | None = None,
+        durability: Durability | None = None,
+    ):
         self.redis_client = redis_client
+        # Where lookups go, e.g. a replica; writes and version checks always use redis_client
+        self.read_client = read_client or redis_client
+        # Read past the cache and lookup coalescing, which may hold values from before this client's writes
+        self.fresh_reads = fresh_reads
+        # Called after each write that changed a record, e.g. to pin the client's next reads to the primary
+        self.on_write = on_write
+        # Called before each read sent through read_client, e.g. to count where reads are routed
+        self.on_read = on_read
+        # Optional per-worker hedging of slow lookups, sent a second time to hedge_client
+        self.hedged_reader = hedged_reader
+        self.hedge_client = hedge_client
+        # Optional per-worker read-through cache; writes through this service invalidate it
+        self.cache = cache
+        # Optional per-worker filter of stored numbers; definite misses skip Redis entirely
+        self.key_filter = key_filter
+        # Optional per-worker coalescing of concurrent lookups of the same number
+        self.single_flight = single_flight
+        # Optional per-worker batching of single-key reads from concurrent requests into MGETs
+        self.read_batcher = read_batcher
+        # Encoding of stored values; plain JSON unless configured otherwise
+        self.codec = codec or StorageCodec()
+        # Where records live in Redis; one string key per phone number unless configured otherwise
+        self.layout = layout or StringKeyLayout()
+        # Where records are written, and read from through read_client and hedge_client; Redis unless given
+        self.storage = storage or RedisBackend(redis_client, self.layout)
+        self.read_storage = storage or RedisBackend(self.read_client, self.layout, read_batcher)
+        self.hedge_storage = None
+        if storage is None and hedge_client is not None:
+            self.hedge_storage = RedisBackend(hedge_client, self.layout, read_batcher)
+        # Only values read from the primary are cached: a lagging replica could return a value
+        # from before an invalidation, which the cache would then serve to every client until its TTL
+        self.caches_reads = not fresh_reads and self.read_client is redis_client and self.hedge_storage is None
+        # Optional per-worker buffer acknowledging plain updates before they are stored
+        self.write_behind = write_behind
+        if durability is not None:
+            self.use_durability(durability)
+
+    def use_durability(self, durability: Durability) -> None:
+        """Make this service's writes wait for ``durability``.
+
+        Raises:
+            NotImplementedError: If the storage cannot wait for it
+
+        """
+        self.storage = self.storage.with_durability(durability)
+        self.durability = durability
 
     async def get_address(self, phone_number: str) -> dict[str, Any] | None:
         """Retrieve an address by phone number from Redis.
@@ -18,76 +155,436 @@ class PhoneBookService:
             Address dictionary if found, None otherwise
 
         """
-        # Retrieve the address data from Redis
-        address_data = await self.redis_client.get(phone_number)
+        found = await self._lookup(phone_number, need_version=False)
+        return None if found is None else found[0]
 
-        if address_data is None:
+    async def get_tagged_address(self, phone_number: str) -> tuple[dict[str, Any], str] | None:
+        """Retrieve an address and its version tag the way lookups are served.
+
+        Unlike ``get_versioned_address``, the tag may come from the cache or a replica,
+        so it suits conditional reads rather than checks before a write.
+
+        Args:
+            phone_number: The phone number to look up
+
+        Returns:
+            Tuple of address dictionary and version if found, None otherwise
+
+        """
+        return await self._lookup(phone_number, need_version=True)
+
+    async def _lookup(self, phone_number: str, need_version: bool) -> tuple[dict[str, Any], str | None] | None:
+        if self.key_filter is not None and not self.key_filter.might_contain(phone_number):
             return None
 
-        # Parse the JSON address data
-        try:
-            return json.loads(address_data)
-        except json.JSONDecodeError:
-            # If there's an error parsing the JSON, return None
+        buffered = None if self.write_behind is None else self.write_behind.pending_value(phone_number)
+        if buffered is not None:
+            [address] = await self._decode_addresses([buffered])
+            return address, address_version(buffered)
+
+        if self.fresh_reads:
+            return await self._fetch_address(phone_number, None)
+
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get_versioned(phone_number, need_version)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation
+
+        if self.single_flight is not None:
+            return await self.single_flight.do(phone_number, lambda: self._fetch_address(phone_number, generation))
+        return await self._fetch_address(phone_number, generation)
+
+    async def _fetch_address(self, phone_number: str, generation: int | None) -> tuple[dict[str, Any], str] | None:
+        # Retrieve the address data from Redis
+        if self.hedged_reader is not None and self.hedge_storage is not None:
+            address_data = await self.hedged_reader.read(
+                lambda: self._reading().get(phone_number),
+                lambda: self.hedge_storage.get(phone_number),
+            )
+        else:
+            address_data = await self._reading().get(phone_number)
+        [address] = await self._decode_addresses([address_data])
+        if address is None:
+            return None
+
+        version = address_version(address_data)
+        if self.cache is not None and self.caches_reads:
+            self.cache.set(phone_number, address, generation, version)
+        return address, version
+
+    async def get_addresses(
+        self,
+        phone_numbers: list[str],
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> dict[str, dict[str, Any] | None]:
+        """Retrieve addresses for many phone numbers with one MGET per chunk.
+
+        Args:
+            phone_numbers: The phone numbers to look up; duplicates are fetched once
+            chunk_size: Maximum number of keys sent in a single MGET
+
+        Returns:
+            Mapping of each phone number to its address dictionary, or None if not found
+
+        """
+        unique_numbers = list(dict.fromkeys(phone_numbers))
+        addresses: dict[str, dict[str, Any] | None] = {}
+
+        if self.key_filter is not None:
+            candidates = []
+            for phone_number in unique_numbers:
+                if self.key_filter.might_contain(phone_number):
+                    candidates.append(phone_number)
+                else:
+                    addresses[phone_number] = None
+            unique_numbers = candidates
+
+        # Buffered updates are newer than anything cached or stored
+        addresses.update(await self._buffered_addresses(unique_numbers))
+        unique_numbers = [number for number in unique_numbers if number not in addresses]
+
+        generation = None
+        if self.cache is not None and not self.fresh_reads:
+            missing = []
+            for phone_number in unique_numbers:
+                cached = self.cache.get(phone_number)
+                if cached is None:
+                    missing.append(phone_number)
+                else:
+                    addresses[phone_number] = cached
+            unique_numbers = missing
+            generation = self.cache.generation
+
+        for start in range(0, len(unique_numbers), chunk_size):
+            chunk = unique_numbers[start : start + chunk_size]
+            values = await self._reading().mget(chunk)
+            for phone_number, address in zip(chunk, await self._decode_addresses(values), strict=True):
+                addresses[phone_number] = address
+                if self.cache is not None and address is not None and self.caches_reads:
+                    self.cache.set(phone_number, address, generation)
+
+        return addresses
+
+    async def get_versioned_address(self, phone_number: str) -> tuple[dict[str, Any], str] | None:
+        """Retrieve an address together with its current version tag.
+
+        Args:
+            phone_number: The phone number to look up
+
+        Returns:
+            Tuple of address dictionary and version if found, None otherwise
+
+        """
+        await self._settle([phone_number])
+        address_data = await self.storage.get(phone_number)
+
+        [address] = await self._decode_addresses([address_data])
+        if address is None:
             return None
+        return address, address_version(address_data)
+
+    async def get_phones_sharing_address(self, phone_number: str) -> list[str] | None:
+        """Return every phone number stored with the same address as ``phone_number``, itself included.
+
+        Args:
+            phone_number: The phone number to look up
+
+        Returns:
+            Sorted phone numbers if found, None otherwise
+
+        Raises:
+            NotImplementedError: If the storage layout does not index phone numbers by address
+
+        """
+        return await self._reading().shared_phone_numbers(phone_number)
+
+    async def scan_addresses(
+        self,
+        cursor: int = 0,
+        batch_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> AsyncIterator[tuple[int, list[tuple[str, dict[str, Any]]]]]:
+        """Walk all stored records with SCAN, fetching each batch of keys in one round trip.
 
-    async def create_address(self, phone_number: str, address: dict[str, Any]) -> bool:
+        Only one batch is held in memory at a time. Like SCAN itself, a record may be
+        returned more than once if the keyspace changes during the walk.
+
+        Args:
+            cursor: SCAN cursor to start from; 0 starts a new walk
+            batch_size: COUNT hint passed to SCAN
+
+        Yields:
+            The cursor to resume after this batch (0 once the walk is complete) and the
+            batch's (phone number, address) pairs
+
+        """
+        while True:
+            cursor, values = await self._reading().scan(cursor, batch_size)
+
+            records = []
+            addresses = await self._decode_addresses([address_data for _, address_data in values])
+            for (phone_number, _), address in zip(values, addresses, strict=True):
+                # Skip keys deleted between SCAN and MGET
+                if address is not None:
+                    records.append((phone_number, address))
+
+            yield cursor, records
+            if cursor == 0:
+                return
+
+    async def create_address(self, phone_number: str, address: dict[str, Any]) -> WriteStatus:
         """Create a new phone-address mapping in Redis.
 
+        Uses ``SET NX`` (``HSETNX`` in the hash layout, a script in the content layout) so
+        the existence check and the write are a single atomic command.
+
         Args:
             phone_number: The phone number to store
             address: The address data to store
 
         Returns:
-            True if created successfully, False if phone number already exists
+            WriteStatus.CREATED if created, WriteStatus.CONFLICT if phone number already exists
 
         """
-        # Check if the phone number already exists
-        existing = await self.redis_client.get(phone_number)
-        if existing is not None:
-            return False  # Phone number already exists
+        await self._settle([phone_number])
+        await self._intern_components([address])
+        with self._applied_on_timeout([phone_number]):
+            created = await self.storage.set(phone_number, self.codec.encode(address), SetCondition.IF_MISSING)
+        return self._record_write(phone_number, self._write_status(WriteOp.CREATE, created))
 
-        # Store the address data in Redis
-        address_json = json.dumps(address)
-        await self.redis_client.set(phone_number, address_json)
-        return True
-
-    async def update_address(self, phone_number: str, address: dict[str, Any]) -> bool:
+    async def update_address(
+        self,
+        phone_number: str,
+        address: dict[str, Any],
+        expected_version: str | None = None,
+    ) -> WriteStatus:
         """Update an existing phone-address mapping in Redis.
 
+        Uses ``SET XX`` (a script in the hash and content layouts), or a compare-and-set script when
+        ``expected_version`` is given, so the update is a single atomic round trip. With a
+        write-behind buffer, an update without ``expected_version`` is buffered instead once
+        the record is known to exist, and reported as accepted.
+
         Args:
             phone_number: The phone number to update
             address: The new address data
+            expected_version: Only update if the stored record still has this version
 
         Returns:
-            True if updated successfully, False if phone number does not exist
+            WriteStatus.UPDATED if updated, WriteStatus.NOT_FOUND if phone number does not exist,
+            WriteStatus.VERSION_MISMATCH if the stored version differs from ``expected_version``,
+            WriteStatus.ACCEPTED if buffered
 
         """
-        # Check if the phone number exists
-        existing = await self.redis_client.get(phone_number)
-        if existing is None:
-            return False  # Phone number doesn't exist
+        await self._intern_components([address])
+        value = self.codec.encode(address)
+        # Buffered updates would be acknowledged before any replica has them
+        if expected_version is None and self.write_behind is not None and not self.durability.waits:
+            return await self._buffer_update(phone_number, value)
+        await self._settle([phone_number])
+        if expected_version is None:
+            with self._applied_on_timeout([phone_number]):
+                updated = await self.storage.set(phone_number, value, SetCondition.IF_EXISTS)
+            return self._record_write(phone_number, self._write_status(WriteOp.UPDATE, updated))
 
-        # Update the address data in Redis
-        address_json = json.dumps(address)
-        await self.redis_client.set(phone_number, address_json)
-        return True
+        with self._applied_on_timeout([phone_number]):
+            result = await self.storage.compare_and_set(phone_number, expected_version, value)
+        return self._record_write(phone_number, self._cas_status(result, WriteStatus.UPDATED))
 
-    async def delete_address(self, phone_number: str) -> bool:
+    async def delete_address(self, phone_number: str, expected_version: str | None = None) -> WriteStatus:
         """Delete a phone-address mapping from Redis.
 
         Args:
             phone_number: The phone number to delete
+            expected_version: Only delete if the stored record still has this version
+
+        Returns:
+            WriteStatus.DELETED if deleted, WriteStatus.NOT_FOUND if phone number does not exist,
+            WriteStatus.VERSION_MISMATCH if the stored version differs from ``expected_version``
+
+        """
+        await self._settle([phone_number])
+        if expected_version is None:
+            with self._applied_on_timeout([phone_number]):
+                deleted = await self.storage.delete(phone_number)
+            return self._record_write(phone_number, self._write_status(WriteOp.DELETE, deleted))
+
+        with self._applied_on_timeout([phone_number]):
+            result = await self.storage.compare_and_set(phone_number, expected_version, None)
+        return self._record_write(phone_number, self._cas_status(result, WriteStatus.DELETED))
+
+    def _decode_address(self, address_data: str | None) -> dict[str, Any] | None:
+        if address_data is None:
+            return None
+
+        # Parse the stored address data
+        try:
+            return self.codec.decode(address_data)
+        except ValueError:
+            # If the stored value is corrupt, return None
+            return None
+
+    async def _decode_addresses(self, values: list[str | None]) -> list[dict[str, Any] | None]:
+        """Decode stored values, loading any component IDs they need in one batch."""
+        addresses: list[dict[str, Any] | None] = []
+        unresolved: dict[int, list[int]] = {}
+        for index, address_data in enumerate(values):
+            try:
+                addresses.append(self._decode_address(address_data))
+            except UnknownComponentError as e:
+                addresses.append(None)
+                unresolved[index] = e.component_ids
+        if unresolved:
+            await self.codec.components.load(
+                self.redis_client, (component_id for ids in unresolved.values() for component_id in ids)
+            )
+            for index in unresolved:
+                try:
+                    addresses[index] = self._decode_address(values[index])
+                except UnknownComponentError:
+                    # The IDs are missing from the dictionary itself; treat the value as corrupt
+                    pass
+        return addresses
+
+    async def _intern_components(self, addresses: list[dict[str, Any]]) -> None:
+        components = self.codec.interned_components(addresses)
+        if components:
+            await self.codec.components.intern(self.redis_client, components)
+
+    async def bulk_write(
+        self,
+        operations: list[WriteOperation],
+        chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> list[WriteStatus]:
+        """Apply many create/update/delete operations as pipelined chunks.
+
+        Each operation has the same semantics as the single-record method of the same
+        kind. Every chunk is sent as one non-transactional pipeline, with at most
+        ``concurrency`` chunks in flight. All operations on a phone number are kept in
+        the same chunk so they apply in request order.
+
+        Args:
+            operations: The writes to apply
+            chunk_size: Target number of operations per pipeline
+            concurrency: Maximum number of pipelines in flight at once
 
         Returns:
-            True if deleted successfully, False if phone number does not exist
+            One WriteStatus per operation, in the order given
 
         """
-        # Check if the phone number exists
-        existing = await self.redis_client.get(phone_number)
-        if existing is None:
-            return False  # Phone number doesn't exist
-
-        # Delete the entry from Redis
-        result = await self.redis_client.delete(phone_number)
-        return result > 0
+        chunks: list[list[int]] = []
+        chunk_by_phone: dict[str, list[int]] = {}
+        for index, operation in enumerate(operations):
+            chunk = chunk_by_phone.get(operation.phone_number)
+            if chunk is None:
+                if not chunks or len(chunks[-1]) >= chunk_size:
+                    chunks.append([])
+                chunk = chunk_by_phone[operation.phone_number] = chunks[-1]
+            chunk.append(index)
+
+        statuses: list[WriteStatus] = [WriteStatus.NOT_FOUND] * len(operations)
+        semaphore = asyncio.Semaphore(concurrency)
+        await self._settle(chunk_by_phone)
+        await self.storage.prepare_batch()
+        # New dictionary entries for the whole batch are resolved up front, in a few round trips
+        await self._intern_components([operation.address for operation in operations if operation.address is not None])
+
+        async def run_chunk(indexes: list[int]) -> None:
+            async with semaphore:
+                with self._applied_on_timeout(operations[index].phone_number for index in indexes):
+                    results = await self.storage.write_many(
+                        [self._stored_write(operations[index]) for index in indexes]
+                    )
+            for index, result in zip(indexes, results, strict=True):
+                operation = operations[index]
+                statuses[index] = self._record_write(operation.phone_number, self._write_status(operation.op, result))
+
+        await asyncio.gather(*(run_chunk(indexes) for indexes in chunks))
+        return statuses
+
+    def _reading(self) -> StorageBackend:
+        """Return the storage lookups read from, reporting the read."""
+        if self.on_read is not None:
+            self.on_read()
+        return self.read_storage
+
+    async def _buffer_update(self, phone_number: str, value: str | bytes) -> WriteStatus:
+        # A buffered number exists; otherwise check now, as the flush cannot report a missing record
+        if self.write_behind.pending_value(phone_number) is None and await self.storage.get(phone_number) is None:
+            return self._record_write(phone_number, WriteStatus.NOT_FOUND)
+        await self.write_behind.put(phone_number, value)
+        # Not UPDATED: a delete by another worker before the flush drops the update
+        return self._record_write(phone_number, WriteStatus.ACCEPTED)
+
+    async def _buffered_addresses(self, phone_numbers: list[str]) -> dict[str, dict[str, Any] | None]:
+        """Return the addresses of buffered updates among ``phone_numbers``."""
+        if self.write_behind is None:
+            return {}
+        values = {number: self.write_behind.pending_value(number) for number in phone_numbers}
+        buffered = {number: value for number, value in values.items() if value is not None}
+        return dict(zip(buffered, await self._decode_addresses(list(buffered.values())), strict=True))
+
+    async def _settle(self, phone_numbers: Iterable[str]) -> None:
+        """Store buffered updates of ``phone_numbers`` first, so a write or version check comes after them."""
+        if self.write_behind is not None:
+            await self.write_behind.settle(phone_numbers)
+
+    @contextlib.contextmanager
+    def _applied_on_timeout(self, phone_numbers: Iterable[str]) -> Iterator[None]:
+        """Record the writes to ``phone_numbers`` if their durability is not confirmed: they were still applied."""
+        try:
+            yield
+        except DurabilityError:
+            for phone_number in phone_numbers:
+                # Whatever each write did, CREATED has every effect it may need
+                self._record_write(phone_number, WriteStatus.CREATED)
+            raise
+
+    def accept_write(self) -> None:
+        """Record a write acknowledged before it is applied, e.g. with fire-and-forget durability."""
+        # The client may read right after the acknowledgement, before the write reaches the replicas
+        if self.on_write is not None:
+            self.on_write()
+
+    def _record_write(self, phone_number: str, status: WriteStatus) -> WriteStatus:
+        # Invalidate whatever the outcome: even a NOT_FOUND shows a cached entry is stale
+        if self.cache is not None:
+            self.cache.invalidate(phone_number)
+        # Deletes are left to the invalidation listener, which can tell when removal is safe
+        if self.key_filter is not None and status is WriteStatus.CREATED:
+            self.key_filter.add(phone_number)
+        # Lookups starting from now must not join a read issued before this write
+        if self.single_flight is not None:
+            self.single_flight.forget(phone_number)
+        if self.on_write is not None and status in (
+            WriteStatus.CREATED,
+            WriteStatus.UPDATED,
+            WriteStatus.DELETED,
+            WriteStatus.ACCEPTED,
+        ):
+            self.on_write()
+        return status
+
+    def _stored_write(self, operation: WriteOperation) -> StoredWrite:
+        if operation.op is WriteOp.DELETE:
+            return StoredWrite(operation.phone_number, None)
+        return StoredWrite(operation.phone_number, self.codec.encode(operation.address), WRITE_CONDITIONS[operation.op])
+
+    def _write_status(self, op: WriteOp, result: Any) -> WriteStatus:
+        if op is WriteOp.CREATE:
+            return WriteStatus.CREATED if result else WriteStatus.CONFLICT
+        if op is WriteOp.UPDATE:
+            return WriteStatus.UPDATED if result else WriteStatus.NOT_FOUND
+        if op is WriteOp.UPSERT:
+            return WriteStatus.CREATED if result else WriteStatus.UPDATED
+        return WriteStatus.DELETED if result else WriteStatus.NOT_FOUND
+
+    @staticmethod
+    def _cas_status(result: int, success: WriteStatus) -> WriteStatus:
+        if result == 1:
+            return success
+        if result == 0:
+            return WriteStatus.NOT_FOUND
+        return WriteStatus.VERSION_MISMATCH
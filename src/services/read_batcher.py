@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any
+
+from redis.asyncio import Redis
+
+from services.key_layout import StringKeyLayout
+
+# Upper bounds of the batch size histogram buckets; larger batches fall in '+Inf'
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class ReadBatcher:
+    """Collects single-key reads from concurrent requests and sends them as one MGET.
+
+    Keys requested within one event-loop tick, or within ``window`` seconds of the
+    first of them, are flushed together. Each caller awaits its own future, which
+    is resolved with its raw stored value (or the MGET's exception).
+    """
+
+    def __init__(self, window: float = 0.0, max_batch_size: int = 500, layout: StringKeyLayout | None = None):
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.layout = layout or StringKeyLayout()
+        self.batches = 0
+        self.keys = 0
+        self.histogram = dict.fromkeys([*map(str, BATCH_SIZE_BUCKETS), '+Inf'], 0)
+        self._pending: dict[Redis, dict[str, list[asyncio.Future]]] = {}
+        # Strong references to running fetches, which the event loop only holds weakly
+        self._fetches: set[asyncio.Task] = set()
+
+    async def load(self, redis_client: Redis, key: str) -> Any:
+        """Return the value of ``key``, fetched in the next batch for ``redis_client``."""
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(redis_client)
+        if pending is None:
+            pending = self._pending[redis_client] = {}
+            if self.window > 0:
+                loop.call_later(self.window, self._flush, redis_client)
+            else:
+                loop.call_soon(self._flush, redis_client)
+
+        future = loop.create_future()
+        pending.setdefault(key, []).append(future)
+        return await future
+
+    def _flush(self, redis_client: Redis) -> None:
+        pending = self._pending.pop(redis_client, {})
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start : start + self.max_batch_size]}
+            self._record(len(batch))
+            task = asyncio.ensure_future(self._fetch(redis_client, batch))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, redis_client: Redis, batch: dict[str, list[asyncio.Future]]) -> None:
+        try:
+            values = await self.layout.mget(redis_client, list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for futures, value in zip(batch.values(), values, strict=True):
+            for future in futures:
+                # Callers that were cancelled while waiting no longer need a result
+                if not future.done():
+                    future.set_result(value)
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.keys += size
+        bucket = next((str(bound) for bound in BATCH_SIZE_BUCKETS if size <= bound), '+Inf')
+        self.histogram[bucket] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return batch counts and the batch size distribution for monitoring."""
+        return {
+            'batches': self.batches,
+            'keys': self.keys,
+            'mean_batch_size': self.keys / self.batches if self.batches else 0.0,
+            'batch_size_histogram': dict(self.histogram),
+        }
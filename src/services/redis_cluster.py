@@ -0,0 +1,54 @@
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.cluster import RedisCluster
+
+# A cluster SCAN cursor packs the index of the node being scanned above that node's own
+# 64-bit cursor, so one integer can resume a walk over every primary
+NODE_CURSOR_BITS = 64
+
+
+def is_cluster(client: Any) -> bool:
+    return isinstance(client, RedisCluster)
+
+
+async def mget(client: Redis | RedisCluster, keys: list[str]) -> list[Any]:
+    """MGET that also works across the slots of a cluster.
+
+    On a cluster the keys are grouped by hash slot and each slot's MGET is pipelined to
+    its node, all nodes in parallel. Values come back in the order of ``keys``.
+    """
+    if is_cluster(client):
+        return await client.mget_nonatomic(keys)
+    return await client.mget(keys)
+
+
+async def scan_keys(
+    client: Redis | RedisCluster,
+    cursor: int,
+    count: int,
+    match: str | None = None,
+) -> tuple[int, list[str]]:
+    """Run one SCAN step, walking the primaries of a cluster one after another.
+
+    Returns the next cursor (0 once the walk is complete) and the keys found. Cluster
+    cursors stay valid while the set of primaries is unchanged; after a topology change
+    a resumed walk may skip or repeat keys.
+    """
+    if not is_cluster(client):
+        if match is None:
+            return await client.scan(cursor, count=count)
+        return await client.scan(cursor, match=match, count=count)
+
+    nodes = sorted(client.get_primaries(), key=lambda node: node.name)
+    index, node_cursor = divmod(cursor, 1 << NODE_CURSOR_BITS)
+    if index >= len(nodes):
+        return 0, []
+    node = nodes[index]
+    cursors, keys = await client.scan(node_cursor, match=match, count=count, target_nodes=node)
+    node_cursor = cursors[node.name]
+    if node_cursor == 0:
+        index += 1
+        if index == len(nodes):
+            return 0, keys
+    return index << NODE_CURSOR_BITS | node_cursor, keys
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.sentinel import SentinelConnectionPool
+
+from services.redis_cluster import is_cluster
+from services.sharding import ShardedRedis
+
+
+def _usage(in_use: int | None, idle: int | None, max_connections: int | None) -> dict[str, Any]:
+    return {
+        'in_use': in_use,
+        'idle': idle,
+        'max_connections': max_connections,
+        # Share of the pool's limit in use; at 1.0 requests wait for a connection
+        'saturation': in_use / max_connections if max_connections and in_use is not None else None,
+    }
+
+
+def _connection_counts(
+    pool: Any, in_use_attribute: str, idle_attribute: str, in_use_includes_idle: bool = False
+) -> tuple[int | None, int | None]:
+    """Return the connections of ``pool`` in use and idle, or Nones if it no longer has these attributes.
+
+    redis-py has no public API for pool usage, so these are its private connection lists,
+    present in every version the pyproject.toml range allows.
+    """
+    connections = getattr(pool, in_use_attribute, None)
+    idle_connections = getattr(pool, idle_attribute, None)
+    if connections is None or idle_connections is None:
+        return None, None
+    # Connections that failed to connect are kept for reuse, but are not open
+    idle = sum(1 for connection in idle_connections if getattr(connection, 'is_connected', True))
+    in_use = len(connections) - len(idle_connections) if in_use_includes_idle else len(connections)
+    return in_use, idle
+
+
+def pool_stats(client: Any) -> dict[str, dict[str, Any]]:
+    """Return connection usage per pool of ``client``: one per shard or cluster node, else one.
+
+    Counts are None if the installed redis-py keeps its connection lists elsewhere.
+    """
+    if isinstance(client, ShardedRedis):
+        return {name: stats for shard in client.shards.values() for name, stats in pool_stats(shard).items()}
+    if is_cluster(client):
+        return {
+            node.name: _usage(*_connection_counts(node, '_connections', '_free', True), node.max_connections)
+            for node in client.get_nodes()
+        }
+    pool = client.connection_pool
+    kwargs = pool.connection_kwargs
+    if isinstance(pool, SentinelConnectionPool):
+        name = f'{pool.service_name} ({"primary" if pool.is_master else "replica"})'
+    else:
+        name = kwargs.get('path') or f'{kwargs.get("host")}:{kwargs.get("port")}'
+    in_use, idle = _connection_counts(pool, '_in_use_connections', '_available_connections')
+    return {name: _usage(in_use, idle, pool.max_connections)}
+
+
+async def open_connections(client: Redis, count: int) -> None:
+    """Open up to ``count`` connections of ``client`` ahead of use.
+
+    Concurrent commands each hold their own connection until answered, so ``count``
+    concurrent PINGs leave that many connections idle in the pool.
+    """
+    await asyncio.gather(*(client.ping() for _ in range(count)))
@@ -0,0 +1,72 @@
+import itertools
+import time
+from typing import Any
+
+from redis.asyncio import Redis
+
+# Cookie holding the time (UNIX seconds) until which a client's reads go to the primary
+READ_YOUR_WRITES_COOKIE = 'addrex_primary_until'
+
+
+class ReplicaRouter:
+    """Spreads reads over replicas round-robin while writes stay on the primary.
+
+    A client that has just written can be pinned to the primary for a short window, so
+    it reads its own writes even while the replicas lag behind. The window is kept by
+    the client itself in a cookie, which lets any worker honour it.
+    """
+
+    def __init__(self, primary: Redis, replicas: list[Redis], read_your_writes_window: float = 0.0):
+        self.primary = primary
+        self.replicas = replicas
+        self.read_your_writes_window = read_your_writes_window
+        self._next_replica = itertools.cycle(replicas) if replicas else None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def read_client(self, pinned: bool = False) -> Redis:
+        """Return the client the next read goes to: the primary if pinned or without replicas."""
+        if pinned or self._next_replica is None:
+            return self.primary
+        return next(self._next_replica)
+
+    def record_read(self, client: Redis) -> None:
+        """Count a read sent to ``client``, as returned by ``read_client``."""
+        if client is self.primary:
+            self.primary_reads += 1
+        else:
+            self.replica_reads += 1
+
+    def hedge_client(self, read_client: Redis) -> Redis | None:
+        """Return the replica after ``read_client`` to send a hedged read to, or None if there is no other."""
+        if len(self.replicas) < 2 or read_client not in self.replicas:
+            return None
+        return self.replicas[(self.replicas.index(read_client) + 1) % len(self.replicas)]
+
+    def is_pinned(self, cookie: str | None, now: float | None = None) -> bool:
+        """Return whether a read-your-writes cookie value still pins reads to the primary."""
+        if self.read_your_writes_window <= 0 or not cookie:
+            return False
+        try:
+            deadline = float(cookie)
+        except ValueError:
+            return False
+        # A forged or skewed deadline is only honoured for one window
+        now = time.time() if now is None else now
+        return now < deadline <= now + self.read_your_writes_window
+
+    def pin_deadline(self, now: float | None = None) -> float:
+        """Return the cookie value pinning reads to the primary from ``now`` on."""
+        return (time.time() if now is None else now) + self.read_your_writes_window
+
+    def stats(self) -> dict[str, Any]:
+        """Return read routing counts for monitoring."""
+        return {
+            'replicas': len(self.replicas),
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+        }
+
+    async def aclose(self) -> None:
+        for replica in self.replicas:
+            await replica.aclose()
@@ -0,0 +1,203 @@
+import asyncio
+import bisect
+import hashlib
+from collections.abc import Callable
+from typing import Any
+
+from redis.asyncio import Redis
+
+# Points each shard gets on the ring; more points spread keys more evenly
+DEFAULT_VIRTUAL_NODES = 160
+# Like the cluster cursor, a sharded SCAN cursor packs the shard index above the shard's cursor
+SHARD_CURSOR_BITS = 64
+
+# Commands whose first argument is the only key they touch
+SINGLE_KEY_COMMANDS = frozenset(
+    {'get', 'set', 'hget', 'hset', 'hsetnx', 'hdel', 'hmget', 'hgetall', 'hkeys', 'hexists', 'exists', 'object'}
+)
+# Script commands: (script or SHA, number of keys, *keys, *args)
+SCRIPT_COMMANDS = frozenset({'eval', 'evalsha'})
+
+
+def parse_endpoints(value: str) -> list[tuple[str, int]]:
+    """Parse a comma-separated list of host:port addresses."""
+    endpoints = []
+    for address in value.split(','):
+        if address.strip():
+            host, _, port = address.strip().rpartition(':')
+            endpoints.append((host, int(port)))
+    return endpoints
+
+
+def hash_key(key: str) -> str:
+    """Return the part of ``key`` that decides its shard: the hash tag, if it has one."""
+    start = key.find('{')
+    if start != -1:
+        end = key.find('}', start + 1)
+        if end > start + 1:
+            return key[start + 1 : end]
+    return key
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8', 'surrogateescape'), digest_size=8).digest())
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to shard names.
+
+    Each shard is placed at ``virtual_nodes`` points; a key belongs to the first point
+    at or after its own hash. Adding a shard only moves the keys falling between its
+    points and their predecessors, roughly 1/N of the keyspace.
+    """
+
+    def __init__(self, shards: list[str], virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        if not shards:
+            raise ValueError('A hash ring needs at least one shard')
+        self.shards = list(shards)
+        points = sorted((_ring_hash(f'{shard}#{i}'), shard) for shard in shards for i in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> str:
+        index = bisect.bisect_left(self._hashes, _ring_hash(hash_key(key)))
+        return self._shards[index % len(self._shards)]
+
+
+class ShardedRedis:
+    """Redis client facade spreading keys over independent servers with a hash ring.
+
+    Supports the commands the storage layer uses: single-key commands and scripts are
+    sent to the shard owning their key, MGET and pipelines are split per shard and run
+    concurrently, SCAN walks the shards in turn and SCRIPT LOAD goes to every shard.
+    Keys sharing a hash tag always live on the same shard, so scripts may use several.
+    """
+
+    def __init__(self, shards: dict[str, Redis], virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        self.shards = shards
+        self.ring = HashRing(list(shards), virtual_nodes)
+        # SCAN walks shards in a fixed order so its cursors can be resumed
+        self._scan_order = sorted(shards)
+
+    def shard_for(self, key: str) -> Redis:
+        return self.shards[self.ring.shard_for(key)]
+
+    def group_by_shard(self, keys: list[str]) -> dict[str, list[int]]:
+        """Return the indexes of ``keys`` owned by each shard."""
+        groups: dict[str, list[int]] = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(self.ring.shard_for(key), []).append(index)
+        return groups
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name in SINGLE_KEY_COMMANDS:
+            return lambda key, *args, **kwargs: getattr(self.shard_for(key), name)(key, *args, **kwargs)
+        if name in SCRIPT_COMMANDS:
+            return lambda script, numkeys, *args: getattr(self._script_shard(numkeys, args), name)(
+                script, numkeys, *args
+            )
+        raise AttributeError(f'{type(self).__name__} does not support {name!r}')
+
+    def _script_shard(self, numkeys: int, args: tuple) -> Redis:
+        if numkeys < 1:
+            return self.shards[self._scan_order[0]]
+        return self.shard_for(args[0])
+
+    async def mget(self, keys: list[str]) -> list[Any]:
+        groups = self.group_by_shard(keys)
+        results = await asyncio.gather(
+            *(self.shards[shard].mget([keys[index] for index in indexes]) for shard, indexes in groups.items())
+        )
+        values: list[Any] = [None] * len(keys)
+        for indexes, shard_values in zip(groups.values(), results, strict=True):
+            for index, value in zip(indexes, shard_values, strict=True):
+                values[index] = value
+        return values
+
+    async def delete(self, *keys: str) -> int:
+        groups = self.group_by_shard(list(keys))
+        counts = await asyncio.gather(
+            *(self.shards[shard].delete(*(keys[index] for index in indexes)) for shard, indexes in groups.items())
+        )
+        return sum(counts)
+
+    async def scan(self, cursor: int = 0, match: str | None = None, count: int | None = None) -> tuple[int, list[str]]:
+        index, shard_cursor = divmod(cursor, 1 << SHARD_CURSOR_BITS)
+        if index >= len(self._scan_order):
+            return 0, []
+        shard_cursor, keys = await self.shards[self._scan_order[index]].scan(shard_cursor, match=match, count=count)
+        if shard_cursor == 0:
+            index += 1
+            if index == len(self._scan_order):
+                return 0, keys
+        return index << SHARD_CURSOR_BITS | shard_cursor, keys
+
+    async def script_load(self, script: str) -> str:
+        shas = await asyncio.gather(*(shard.script_load(script) for shard in self.shards.values()))
+        return shas[0]
+
+    async def ping(self) -> bool:
+        return all(await asyncio.gather(*(shard.ping() for shard in self.shards.values())))
+
+    def pipeline(self, transaction: bool = False) -> 'ShardedPipeline':
+        if transaction:
+            raise ValueError('Transactions cannot span shards')
+        return ShardedPipeline(self)
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(shard.aclose() for shard in self.shards.values()))
+
+
+class ShardedPipeline:
+    """Non-transactional pipeline that queues commands per shard and sends every shard's
+    commands as one pipeline, all shards concurrently. Results come back in queue order.
+    """
+
+    def __init__(self, client: ShardedRedis):
+        self.client = client
+        self._commands: list[tuple[str, str, tuple, dict]] = []
+
+    async def __aenter__(self) -> 'ShardedPipeline':
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._commands.clear()
+
+    def __getattr__(self, name: str) -> Callable[..., 'ShardedPipeline']:
+        if name in SINGLE_KEY_COMMANDS:
+
+            def queue(key: str, *args: Any, **kwargs: Any) -> ShardedPipeline:
+                self._commands.append((self.client.ring.shard_for(key), name, (key, *args), kwargs))
+                return self
+
+            return queue
+        if name in SCRIPT_COMMANDS or name == 'delete':
+
+            def queue_keyed(*args: Any, **kwargs: Any) -> ShardedPipeline:
+                # Scripts are routed by their first key, deletes of one key by that key
+                key = args[2] if name in SCRIPT_COMMANDS else args[0]
+                self._commands.append((self.client.ring.shard_for(key), name, args, kwargs))
+                return self
+
+            return queue_keyed
+        raise AttributeError(f'{type(self).__name__} does not support {name!r}')
+
+    async def execute(self) -> list[Any]:
+        commands, self._commands = self._commands, []
+        groups: dict[str, list[int]] = {}
+        for index, (shard, *_) in enumerate(commands):
+            groups.setdefault(shard, []).append(index)
+
+        async def run(shard: str, indexes: list[int]) -> list[Any]:
+            async with self.client.shards[shard].pipeline(transaction=False) as pipe:
+                for index in indexes:
+                    _, name, args, kwargs = commands[index]
+                    getattr(pipe, name)(*args, **kwargs)
+                return await pipe.execute()
+
+        results = await asyncio.gather(*(run(shard, indexes) for shard, indexes in groups.items()))
+        values: list[Any] = [None] * len(commands)
+        for indexes, shard_results in zip(groups.values(), results, strict=True):
+            for index, value in zip(indexes, shard_results, strict=True):
+                values[index] = value
+        return values
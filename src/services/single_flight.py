@@ -0,0 +1,56 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key starts the call as a task; callers arriving while it
+    runs await the same task and receive its result or exception. Each waiter is
+    shielded, so a cancelled request does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call`` for ``key``, or join the call already in flight for it."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        """Make later calls for ``key`` start afresh instead of joining the one in flight.
+
+        Used after a write, so a lookup that starts after the write cannot be handed a
+        result read before it.
+        """
+        self._calls.pop(key, None)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, Any]:
+        """Return coalescing counters for monitoring."""
+        total = self.leaders + self.shared
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'shared': self.shared,
+            'shared_ratio': self.shared / total if total else 0.0,
+        }
@@ -0,0 +1,372 @@
+import bisect
+import heapq
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from services.storage_backend import ReadOnlyStorageError, SetCondition, StorageBackend, StoredWrite
+from services.storage_codec import ENCODING_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# File layout, all integers little-endian:
+#   header   magic, record count N
+#   index    N packed phone numbers (uint64), sorted ascending
+#   offsets  N + 1 offsets (uint64) into the values area; record i is values[offsets[i]:offsets[i + 1]]
+#   values   the stored values, encoded as in Redis
+SNAPSHOT_MAGIC = b'ADXSNAP1'
+HEADER = struct.Struct('<8sQ')
+# Packed phone numbers are the digits as an integer, with this bit set for a leading '+'
+PLUS_FLAG = 1 << 63
+# Digits that always fit below PLUS_FLAG
+MAX_PACKED_DIGITS = 18
+
+
+def pack_phone_number(phone_number: str) -> int | None:
+    """Return the fixed-width index key of a phone number, or None if it has none.
+
+    Only '+' followed by digits, or digits alone, without a leading zero can be packed
+    losslessly, which covers every format the API accepts.
+    """
+    plus = phone_number.startswith('+')
+    digits = phone_number[1:] if plus else phone_number
+    if not (0 < len(digits) <= MAX_PACKED_DIGITS and digits.isascii() and digits.isdigit()) or digits[0] == '0':
+        return None
+    return int(digits) | (PLUS_FLAG if plus else 0)
+
+
+def unpack_phone_number(key: int) -> str:
+    return f'{"+" if key & PLUS_FLAG else ""}{key & ~PLUS_FLAG}'
+
+
+# Records a SnapshotWriter sorts in memory at a time; larger snapshots are merged from sorted runs
+SNAPSHOT_RUN_RECORDS = 1 << 20
+# uint64 entries read or written per block of a temporary file
+_BLOCK_ENTRIES = 1 << 14
+
+
+class SnapshotWriter:
+    """Write a snapshot file from records added one at a time, in any order.
+
+    Values are appended to a spool file as they arrive; only their packed phone numbers
+    and spool offsets stay in memory, for at most ``run_records`` records. Each full run
+    is sorted and spilled to a temporary file as (key, start, end) uint64 triples, and
+    ``finish`` merges the runs, so memory use does not grow with the snapshot.
+    The snapshot is written next to ``path`` and renamed over it by ``finish``, so readers
+    only ever map a whole snapshot, and processes still mapping the old one keep it.
+    Later records replace earlier ones with the same phone number.
+    """
+
+    def __init__(self, path: str | Path, run_records: int = SNAPSHOT_RUN_RECORDS):
+        self.path = Path(path)
+        self.run_records = run_records
+        self._temporary = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        self._spool = open(self._temporary.with_suffix('.values'), 'w+b')
+        self._runs: list[BinaryIO] = []
+        self._keys = array('Q')
+        # Spool offset of each record of the current run in arrival order, followed by the spool size
+        self._starts = array('Q', [0])
+
+    def add(self, phone_number: str, value: str | bytes) -> None:
+        """Append one record.
+
+        Raises:
+            ValueError: If the phone number cannot be packed into the index
+
+        """
+        key = pack_phone_number(phone_number)
+        if key is None:
+            raise ValueError(f'Phone number cannot be stored in a snapshot: {phone_number!r}')
+        value = value.encode('utf-8', ENCODING_ERRORS) if isinstance(value, str) else value
+        self._spool.write(value)
+        self._keys.append(key)
+        self._starts.append(self._starts[-1] + len(value))
+        if len(self._keys) >= self.run_records:
+            self._spill_run()
+
+    def _spill_run(self) -> None:
+        keys, starts = self._keys, self._starts
+        # Stable, so of several records with one phone number the last added comes last
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        run = tempfile.TemporaryFile(dir=self.path.parent)
+        for block in range(0, len(order), _BLOCK_ENTRIES):
+            entries = array('Q')
+            for i in order[block : block + _BLOCK_ENTRIES]:
+                entries.extend((keys[i], starts[i], starts[i + 1]))
+            run.write(entries)
+        self._runs.append(run)
+        self._keys = array('Q')
+        self._starts = array('Q', [starts[-1]])
+
+    @staticmethod
+    def _read_run(run: BinaryIO) -> Iterator[tuple[int, int, int]]:
+        run.seek(0)
+        while block := run.read(24 * _BLOCK_ENTRIES):
+            entries = array('Q', block)
+            for i in range(0, len(entries), 3):
+                yield entries[i], entries[i + 1], entries[i + 2]
+
+    def _merged(self) -> Iterator[tuple[int, int, int]]:
+        """Yield the (key, start, end) of the last record added for each key, in key order."""
+        if self._keys:
+            self._spill_run()
+        # Spool offsets grow with arrival, so equal keys merge in the order they were added
+        previous = None
+        for entry in heapq.merge(*(self._read_run(run) for run in self._runs)):
+            if previous is not None and entry[0] != previous[0]:
+                yield previous
+            previous = entry
+        if previous is not None:
+            yield previous
+
+    def finish(self) -> int:
+        """Write the snapshot, rename it over the path and return the number of records."""
+        self._spool.flush()
+        try:
+            with (
+                tempfile.TemporaryFile(dir=self.path.parent) as index,
+                tempfile.TemporaryFile(dir=self.path.parent) as offsets,
+                tempfile.TemporaryFile(dir=self.path.parent) as locations,
+            ):
+                count = self._write_index(index, offsets, locations)
+                with open(self._temporary, 'wb') as file:
+                    file.write(HEADER.pack(SNAPSHOT_MAGIC, count))
+                    for part in (index, offsets):
+                        part.seek(0)
+                        shutil.copyfileobj(part, file)
+                    if self._spool.tell():
+                        with mmap.mmap(self._spool.fileno(), 0, access=mmap.ACCESS_READ) as values:
+                            for start, end in self._locations(locations):
+                                file.write(values[start:end])
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(self._temporary, self.path)
+        except BaseException:
+            self._temporary.unlink(missing_ok=True)
+            raise
+        finally:
+            self.close()
+        return count
+
+    def _write_index(self, index: BinaryIO, offsets: BinaryIO, locations: BinaryIO) -> int:
+        """Write the merged keys, value offsets and spool locations to their files; return the count."""
+        count = 0
+        end_offset = 0
+        keys, ends, spans = array('Q'), array('Q', [0]), array('Q')
+        for key, start, end in self._merged():
+            count += 1
+            end_offset += end - start
+            keys.append(key)
+            ends.append(end_offset)
+            spans.extend((start, end))
+            if len(keys) >= _BLOCK_ENTRIES:
+                _write_little_endian(index, keys)
+                _write_little_endian(offsets, ends)
+                locations.write(spans)
+                keys, ends, spans = array('Q'), array('Q'), array('Q')
+        _write_little_endian(index, keys)
+        _write_little_endian(offsets, ends)
+        locations.write(spans)
+        return count
+
+    @staticmethod
+    def _locations(locations: BinaryIO) -> Iterator[tuple[int, int]]:
+        locations.seek(0)
+        while block := locations.read(16 * _BLOCK_ENTRIES):
+            spans = array('Q', block)
+            for i in range(0, len(spans), 2):
+                yield spans[i], spans[i + 1]
+
+    def close(self) -> None:
+        """Remove the spool file and runs; a snapshot not yet finished is abandoned."""
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._spool.close()
+        Path(self._spool.name).unlink(missing_ok=True)
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _write_little_endian(file: BinaryIO, values: array) -> None:
+    if sys.byteorder != 'little':
+        values.byteswap()
+    file.write(values)
+
+
+def write_snapshot(path: str | Path, records: Iterable[tuple[str, str | bytes]]) -> int:
+    """Write (phone number, stored value) pairs as a snapshot file; return the number of records.
+
+    Raises:
+        ValueError: If a phone number cannot be packed into the index
+
+    """
+    with SnapshotWriter(path) as writer:
+        for phone_number, value in records:
+            writer.add(phone_number, value)
+        return writer.finish()
+
+
+class Snapshot:
+    """One snapshot file, mapped read-only.
+
+    The index and offsets are searched in place through memoryviews of the mapping;
+    only the value of a record found is copied out. Pages come from the OS page cache,
+    so every process mapping the same file shares one copy of it.
+    """
+
+    def __init__(self, path: str | Path):
+        if sys.byteorder != 'little':
+            raise ValueError('Snapshots can only be mapped on little-endian hosts')
+        with open(path, 'rb') as file:
+            status = os.fstat(file.fileno())
+            # Identifies the file: a new snapshot renamed over the path has a new inode
+            self.identity = (status.st_dev, status.st_ino, status.st_mtime_ns)
+            if status.st_size < HEADER.size:
+                raise ValueError(f'Not a phone book snapshot: {path}')
+            self._mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, 'MADV_RANDOM'):
+            # Lookups land anywhere in the file; read-ahead would only evict other pages
+            self._mapping.madvise(mmap.MADV_RANDOM)
+
+        view = memoryview(self._mapping)
+        magic, count = HEADER.unpack_from(view)
+        index_end = HEADER.size + 8 * count
+        values_start = index_end + 8 * (count + 1)
+        if magic != SNAPSHOT_MAGIC or len(view) < values_start:
+            raise ValueError(f'Not a phone book snapshot: {path}')
+        self.index = view[HEADER.size : index_end].cast('Q')
+        self.offsets = view[index_end:values_start].cast('Q')
+        self.values = view[values_start:]
+        if self.offsets[count] != len(self.values):
+            raise ValueError(f'Truncated phone book snapshot: {path}')
+        self.count = count
+        self.size = len(view)
+
+    def value_at(self, position: int) -> bytes:
+        return bytes(self.values[self.offsets[position] : self.offsets[position + 1]])
+
+    def get(self, phone_number: str) -> bytes | None:
+        key = pack_phone_number(phone_number)
+        if key is None:
+            return None
+        position = bisect.bisect_left(self.index, key)
+        if position < self.count and self.index[position] == key:
+            return self.value_at(position)
+        return None
+
+
+class SnapshotBackend(StorageBackend):
+    """Records served read-only from a memory-mapped snapshot file, without network I/O.
+
+    Snapshots are compiled by ``tools.compile_snapshot``. To publish a new one, rename
+    it over ``path``: at most every ``check_interval`` seconds a lookup checks whether
+    the file at ``path`` changed, and if so maps the new file and switches to it in a
+    single assignment, so each lookup sees one snapshot or the other. ``on_swap`` is
+    then called, e.g. to clear a cache of the old snapshot's records. The old mapping
+    is released once the last lookup or scan using it is done.
+
+    Writes raise ``ReadOnlyStorageError``. SCAN cursors are index keys rather than
+    positions, so a walk spanning a swap carries on from the same phone number.
+    """
+
+    read_only = True
+
+    def __init__(
+        self,
+        path: str | Path,
+        check_interval: float = 5.0,
+        on_swap: Callable[[], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.on_swap = on_swap
+        self._clock = clock
+        self.snapshot = Snapshot(self.path)
+        self._next_check = clock() + check_interval
+        self.swaps = 0
+        self.swap_errors = 0
+
+    def reload(self) -> bool:
+        """Switch to the file at ``path`` if it is not the mapped snapshot; return whether it switched.
+
+        A file that cannot be mapped is logged and the current snapshot kept.
+        """
+        try:
+            status = os.stat(self.path)
+            if (status.st_dev, status.st_ino, status.st_mtime_ns) == self.snapshot.identity:
+                return False
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError) as e:
+            self.swap_errors += 1
+            logger.warning(f'Keeping the current snapshot; could not map {self.path}: {e!s}')
+            return False
+        self.snapshot = snapshot
+        self.swaps += 1
+        logger.info(f'Switched to snapshot {self.path} with {snapshot.count} records')
+        if self.on_swap is not None:
+            self.on_swap()
+        return True
+
+    def _current(self) -> Snapshot:
+        now = self._clock()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self.snapshot
+
+    async def get(self, phone_number: str) -> bytes | None:
+        return self._current().get(phone_number)
+
+    async def mget(self, phone_numbers: list[str]) -> list[bytes | None]:
+        snapshot = self._current()
+        return [snapshot.get(phone_number) for phone_number in phone_numbers]
+
+    async def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[str, bytes]]]:
+        snapshot = self._current()
+        start = bisect.bisect_left(snapshot.index, cursor)
+        end = min(start + max(count, 1), snapshot.count)
+        records = [
+            (unpack_phone_number(snapshot.index[position]), snapshot.value_at(position))
+            for position in range(start, end)
+        ]
+        # Packed keys are never 0, which is left to mark the end of the walk
+        return (snapshot.index[end] if end < snapshot.count else 0), records
+
+    def _reject_write(self) -> ReadOnlyStorageError:
+        return ReadOnlyStorageError('Records are read-only on this server')
+
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        raise self._reject_write()
+
+    async def delete(self, phone_number: str) -> bool:
+        raise self._reject_write()
+
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        raise self._reject_write()
+
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        raise self._reject_write()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the mapped snapshot's size and the number of swaps for monitoring."""
+        return {
+            'records': self.snapshot.count,
+            'file_bytes': self.snapshot.size,
+            'swaps': self.swaps,
+            'swap_errors': self.swap_errors,
+        }
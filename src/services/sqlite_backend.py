@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, TypeVar
+
+from services.storage_backend import SetCondition, StorageBackend, StoredWrite
+from services.storage_codec import ENCODING_ERRORS
+
+T = TypeVar('T')
+
+# Rows keep their rowid when updated, so it serves as a stable SCAN cursor
+SCHEMA = 'CREATE TABLE IF NOT EXISTS addresses (phone_number TEXT PRIMARY KEY, value BLOB NOT NULL)'
+# The statements are constant strings, so each connection compiles them once and reuses them from its cache
+SELECT_VALUE = 'SELECT value FROM addresses WHERE phone_number = ?'
+INSERT_VALUE = 'INSERT OR IGNORE INTO addresses (phone_number, value) VALUES (?, ?)'
+UPDATE_VALUE = 'UPDATE addresses SET value = ? WHERE phone_number = ?'
+DELETE_VALUE = 'DELETE FROM addresses WHERE phone_number = ?'
+SCAN_ROWS = 'SELECT rowid, phone_number, value FROM addresses WHERE rowid > ? ORDER BY rowid LIMIT ?'
+# Milliseconds a statement waits for another process's write lock before failing
+BUSY_TIMEOUT_MS = 5000
+
+
+class SQLiteBackend(StorageBackend):
+    """Records in an SQLite database file in WAL mode, for single-node deployments without Redis.
+
+    SQLite calls block, so they run in threads: reads in a pool of ``read_threads``,
+    each with its own connection, and writes in one writer thread, which queues this
+    process's writes rather than having them contend for the database's single write
+    lock. Several worker processes may share the file; WAL lets their reads proceed
+    during a write. Batch reads and writes each run in a single transaction.
+
+    ``synchronous`` is SQLite's setting: with ``full`` a committed write survives a
+    power loss, with ``normal`` only a crash of the process.
+    """
+
+    def __init__(self, path: str | Path, read_threads: int = 4, synchronous: str = 'full'):
+        self.path = str(path)
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._readers = ThreadPoolExecutor(max_workers=read_threads, thread_name_prefix='sqlite-read')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-write')
+        self.read_threads = read_threads
+        self.pending_reads = 0
+        self.pending_writes = 0
+        # WAL mode is a property of the database file, set once here for every connection
+        connection = self._connect()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(SCHEMA)
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit, so transactions are exactly the explicit BEGIN ... COMMIT blocks below
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=64)
+        connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        connection.execute(f'PRAGMA synchronous={self.synchronous}')
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _read(self, function: Callable[[sqlite3.Connection], T]) -> T:
+        self.pending_reads += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._readers, lambda: function(self._connection()))
+        finally:
+            self.pending_reads -= 1
+
+    async def _write(self, function: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``function`` in a write transaction on the writer thread."""
+
+        def transaction() -> T:
+            connection = self._connection()
+            # Takes the write lock up front, so reads inside the transaction see what the writes will change
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = function(connection)
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            return result
+
+        self.pending_writes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._writer, transaction)
+        finally:
+            self.pending_writes -= 1
+
+    @staticmethod
+    def _get(connection: sqlite3.Connection, phone_number: str) -> bytes | None:
+        row = connection.execute(SELECT_VALUE, (phone_number,)).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _apply(connection: sqlite3.Connection, write: StoredWrite) -> bool:
+        if write.value is None:
+            return connection.execute(DELETE_VALUE, (write.phone_number,)).rowcount > 0
+        value = write.value.encode('utf-8', ENCODING_ERRORS) if isinstance(write.value, str) else write.value
+        if write.condition is SetCondition.IF_MISSING:
+            return connection.execute(INSERT_VALUE, (write.phone_number, value)).rowcount > 0
+        if connection.execute(UPDATE_VALUE, (value, write.phone_number)).rowcount > 0:
+            # Updated; for ALWAYS the result is whether the record was created
+            return write.condition is SetCondition.IF_EXISTS
+        if write.condition is SetCondition.IF_EXISTS:
+            return False
+        connection.execute(INSERT_VALUE, (write.phone_number, value))
+        return True
+
+    async def get(self, phone_number: str) -> bytes | None:
+        return await self._read(lambda connection: self._get(connection, phone_number))
+
+    async def mget(self, phone_numbers: list[str]) -> list[bytes | None]:
+        def read(connection: sqlite3.Connection) -> list[bytes | None]:
+            # One transaction, so the values come from a single snapshot of the database
+            connection.execute('BEGIN')
+            try:
+                return [self._get(connection, phone_number) for phone_number in phone_numbers]
+            finally:
+                connection.execute('COMMIT')
+
+        return await self._read(read)
+
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        return await self._write(
+            lambda connection: self._apply(connection, StoredWrite(phone_number, value, condition))
+        )
+
+    async def delete(self, phone_number: str) -> bool:
+        return await self._write(lambda connection: self._apply(connection, StoredWrite(phone_number, None)))
+
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        def compare_and_set(connection: sqlite3.Connection) -> int:
+            stored = self._get(connection, phone_number)
+            if stored is None:
+                return 0
+            if hashlib.sha1(stored).hexdigest() != expected_version:
+                return -1
+            self._apply(connection, StoredWrite(phone_number, value, SetCondition.IF_EXISTS))
+            return 1
+
+        return await self._write(compare_and_set)
+
+    async def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[str, bytes]]]:
+        limit = max(count, 1)
+        rows = await self._read(lambda connection: connection.execute(SCAN_ROWS, (cursor, limit)).fetchall())
+        records = [(phone_number, value) for _, phone_number, value in rows]
+        return (rows[-1][0] if len(rows) == limit else 0), records
+
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        """Apply the writes in one transaction."""
+        return await self._write(lambda connection: [self._apply(connection, write) for write in writes])
+
+    def stats(self) -> dict[str, Any]:
+        """Return the thread pool size and the calls waiting for or running in it for monitoring."""
+        return {
+            'read_threads': self.read_threads,
+            'pending_reads': self.pending_reads,
+            'pending_writes': self.pending_writes,
+        }
+
+    async def aclose(self) -> None:
+        """Wait for queued calls, then close every thread's connection."""
+        await asyncio.to_thread(self._readers.shutdown)
+        await asyncio.to_thread(self._writer.shutdown)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
@@ -0,0 +1,395 @@
+import hashlib
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from enum import StrEnum
+from typing import Any, NamedTuple
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, ResponseError
+
+from services.durability import AppendOnlyDisabledError, Durability, DurabilityLevel, ReplicationTimeoutError
+from services.key_layout import StringKeyLayout, _script_sha
+from services.read_batcher import ReadBatcher
+from services.redis_cluster import is_cluster
+from services.sharding import ShardedRedis
+from services.storage_codec import ENCODING_ERRORS
+
+
+class SetCondition(StrEnum):
+    """When a write may replace what is stored under a phone number."""
+
+    # Create or overwrite
+    ALWAYS = 'always'
+    IF_MISSING = 'if_missing'
+    IF_EXISTS = 'if_exists'
+
+
+class StoredWrite(NamedTuple):
+    """One write of a batch; a value of None deletes the record."""
+
+    phone_number: str
+    value: str | bytes | None
+    condition: SetCondition = SetCondition.ALWAYS
+
+
+class ReadOnlyStorageError(Exception):
+    """Raised by the writes of a backend that only serves lookups."""
+
+
+class StorageBackend(ABC):
+    """Where records live: encoded address values keyed by phone number.
+
+    Every write is atomic on its own. A record's version is the SHA1 of its stored
+    value, so compare-and-set checks agree with ``address_version`` in every backend.
+    """
+
+    # Whether every write raises ReadOnlyStorageError
+    read_only = False
+
+    @abstractmethod
+    async def get(self, phone_number: str) -> str | bytes | None:
+        """Return the stored value of a record, or None if there is none."""
+
+    @abstractmethod
+    async def mget(self, phone_numbers: list[str]) -> list[str | bytes | None]:
+        """Return the stored values of many records, in the order given."""
+
+    @abstractmethod
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        """Write a record if ``condition`` holds.
+
+        Returns whether the record was written, or for ``SetCondition.ALWAYS`` whether
+        it was created rather than overwritten.
+        """
+
+    @abstractmethod
+    async def delete(self, phone_number: str) -> bool:
+        """Delete a record; return whether there was one."""
+
+    @abstractmethod
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        """Replace a record, or delete it if ``value`` is None, only if its version is ``expected_version``.
+
+        Returns 1 if applied, 0 if there is no record and -1 if its version differs.
+        """
+
+    @abstractmethod
+    async def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[str, str | bytes | None]]]:
+        """Return the next cursor (0 once the walk is complete) and a batch of (phone number, value) pairs.
+
+        ``count`` is a hint of the work done per call. Records present for the whole walk
+        are returned at least once; values may be None for records deleted meanwhile.
+        """
+
+    @abstractmethod
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        """Apply writes in order, each with the semantics of ``set`` or ``delete``; return their results."""
+
+    async def prepare_batch(self) -> None:  # noqa: B027
+        """Get ready for a round of ``write_many`` calls."""
+
+    async def shared_phone_numbers(self, phone_number: str) -> list[str] | None:
+        """Return the phone numbers storing the same address as ``phone_number``, or None if it has no record.
+
+        Raises:
+            NotImplementedError: If the backend does not index phone numbers by address
+
+        """
+        raise NotImplementedError(f'The {type(self).__name__} does not index phone numbers by address')
+
+    def with_durability(self, durability: Durability) -> 'StorageBackend':
+        """Return a backend writing here whose writes only return once ``durability`` is met.
+
+        Raises:
+            NotImplementedError: If the backend has no replicas or append-only file to wait for
+
+        """
+        if durability.waits:
+            raise NotImplementedError(f'The {type(self).__name__} cannot wait for {durability.level} writes')
+        return self
+
+
+class RedisBackend(StorageBackend):
+    """Records in Redis, laid out by a key layout.
+
+    Single-record reads can be batched with concurrent ones into MGETs by a read
+    batcher, and the layout's scripts are loaded on demand when the server lacks them.
+    """
+
+    def __init__(self, client: Redis, layout: StringKeyLayout | None = None, read_batcher: ReadBatcher | None = None):
+        self.client = client
+        self.layout = layout or StringKeyLayout()
+        self.read_batcher = read_batcher
+
+    async def _call(self, method: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Run a layout command, loading the layout's scripts if the server lacks them."""
+        try:
+            return await method(self.client, *args)
+        except NoScriptError:
+            await self.load_scripts()
+            return await method(self.client, *args)
+
+    async def load_scripts(self) -> None:
+        for script in self.layout.pipeline_scripts:
+            await self.client.script_load(script)
+
+    async def _run_script(self, script: str, keys: list[str], args: list[Any]) -> Any:
+        """Run a Lua script by SHA, loading it with EVAL only if the server does not have it cached."""
+        try:
+            return await self.client.evalsha(_script_sha(script), len(keys), *keys, *args)
+        except NoScriptError:
+            return await self.client.eval(script, len(keys), *keys, *args)
+
+    async def get(self, phone_number: str) -> str | bytes | None:
+        if self.read_batcher is not None:
+            return await self.read_batcher.load(self.client, phone_number)
+        return await self._call(self.layout.get, phone_number)
+
+    async def mget(self, phone_numbers: list[str]) -> list[str | bytes | None]:
+        return await self.layout.mget(self.client, phone_numbers)
+
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        return self._set_result(condition, await self._call(self._write_method(condition), phone_number, value))
+
+    async def delete(self, phone_number: str) -> bool:
+        return bool(await self._call(self.layout.delete, phone_number))
+
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        keys, args = self.layout.cas_target(phone_number)
+        if value is None:
+            return await self._run_script(self.layout.cas_delete_script, keys, [*args, expected_version])
+        return await self._run_script(self.layout.cas_update_script, keys, [*args, expected_version, value])
+
+    async def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[str, str | bytes | None]]]:
+        return await self.layout.scan(self.client, cursor, count)
+
+    async def prepare_batch(self) -> None:
+        # Pipelined writes are queued by SHA; a pipeline cannot fall back to EVAL part way through
+        if self.layout.pipeline_scripts:
+            await self.load_scripts()
+
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        """Send the writes as one non-transactional pipeline."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            self._queue_writes(pipe, writes)
+            results = await pipe.execute()
+        return self._write_results(writes, results)
+
+    async def shared_phone_numbers(self, phone_number: str) -> list[str] | None:
+        return await self.layout.shared_phone_numbers(self.client, phone_number)
+
+    def with_durability(self, durability: Durability) -> 'StorageBackend':
+        if not durability.waits:
+            return self
+        if is_cluster(self.client) or isinstance(self.client, ShardedRedis):
+            # A wait only covers the writes sent before it on the same connection
+            raise NotImplementedError(f'Waiting for {durability.level} writes needs a single Redis primary')
+        return WaitingRedisBackend(self.client, self.layout, durability)
+
+    def _queue_writes(self, pipe: Any, writes: list[StoredWrite]) -> None:
+        for write in writes:
+            if write.value is None:
+                self.layout.delete(pipe, write.phone_number)
+            else:
+                self._write_method(write.condition)(pipe, write.phone_number, write.value)
+
+    def _write_results(self, writes: list[StoredWrite], results: list[Any]) -> list[bool]:
+        return [
+            bool(result) if write.value is None else self._set_result(write.condition, result)
+            for write, result in zip(writes, results, strict=True)
+        ]
+
+    def _write_method(self, condition: SetCondition) -> Callable[..., Any]:
+        if condition is SetCondition.IF_MISSING:
+            return self.layout.create
+        if condition is SetCondition.IF_EXISTS:
+            return self.layout.update
+        return self.layout.upsert
+
+    def _set_result(self, condition: SetCondition, result: Any) -> bool:
+        if condition is SetCondition.ALWAYS:
+            return self.layout.upsert_created(result)
+        return bool(result)
+
+
+class WaitingRedisBackend(RedisBackend):
+    """Redis writes that return once replicas acknowledged them, or fsynced them with ``persisted``.
+
+    Each write is sent in one pipeline with a WAIT (WAITAOF for ``persisted``) right
+    behind it, so waiting costs no extra round trip. If fewer replicas than required
+    acknowledge within the timeout, ``ReplicationTimeoutError`` is raised after the
+    write was applied on the primary; if a persisted write finds appendonly disabled,
+    ``AppendOnlyDisabledError`` is.
+    """
+
+    def __init__(self, client: Redis, layout: StringKeyLayout, durability: Durability):
+        super().__init__(client, layout)
+        self.durability = durability
+
+    def _queue_wait(self, pipe: Any) -> None:
+        if self.durability.level is DurabilityLevel.PERSISTED:
+            pipe.waitaof(1, self.durability.replicas, self.durability.timeout_ms)
+        else:
+            pipe.wait(self.durability.replicas, self.durability.timeout_ms)
+
+    def _check_wait(self, reply: Any) -> None:
+        if isinstance(reply, ResponseError) and 'appendonly' in str(reply):
+            # WAITAOF refuses to wait for a local fsync without the append-only file
+            raise AppendOnlyDisabledError()
+        if isinstance(reply, Exception):
+            raise reply
+        # WAITAOF replies with the number of local and of replica fsyncs, WAIT with the replica count
+        acknowledged = reply[1] if self.durability.level is DurabilityLevel.PERSISTED else reply
+        if acknowledged < self.durability.replicas:
+            raise ReplicationTimeoutError(acknowledged, self.durability)
+
+    async def _waited(self, queue: Callable[[Any], Any]) -> Any:
+        """Send the write queued by ``queue`` followed by the wait, loading scripts once if the server lacks them."""
+        for attempt in range(2):
+            async with self.client.pipeline(transaction=False) as pipe:
+                queue(pipe)
+                self._queue_wait(pipe)
+                result, reply = await pipe.execute(raise_on_error=False)
+            if isinstance(result, NoScriptError) and attempt == 0:
+                await self.load_scripts()
+                for script in (self.layout.cas_update_script, self.layout.cas_delete_script):
+                    await self.client.script_load(script)
+                continue
+            if isinstance(result, Exception):
+                raise result
+            self._check_wait(reply)
+            return result
+
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        result = await self._waited(lambda pipe: self._write_method(condition)(pipe, phone_number, value))
+        return self._set_result(condition, result)
+
+    async def delete(self, phone_number: str) -> bool:
+        return bool(await self._waited(lambda pipe: self.layout.delete(pipe, phone_number)))
+
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        keys, args = self.layout.cas_target(phone_number)
+        if value is None:
+            script, args = self.layout.cas_delete_script, [*args, expected_version]
+        else:
+            script, args = self.layout.cas_update_script, [*args, expected_version, value]
+        return await self._waited(lambda pipe: pipe.evalsha(_script_sha(script), len(keys), *keys, *args))
+
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        """Send the writes and one wait for all of them as one non-transactional pipeline."""
+        async with self.client.pipeline(transaction=False) as pipe:
+            self._queue_writes(pipe, writes)
+            self._queue_wait(pipe)
+            *results, reply = await pipe.execute(raise_on_error=False)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        self._check_wait(reply)
+        return self._write_results(writes, results)
+
+
+class MemoryBackend(StorageBackend):
+    """Records in this process's memory, for single-process deployments, tests and benchmarks.
+
+    Values are kept as bytes in a flat list of slots, indexed by phone number. A
+    deleted record's slot is reused by the next new one, so records never move: a
+    SCAN cursor is simply a slot position, and a record present for the whole walk is
+    returned exactly once. Nothing is persisted, and each worker process has its own data.
+    """
+
+    def __init__(self):
+        self._slots: dict[str, int] = {}
+        self._phone_numbers: list[str | None] = []
+        self._values: list[bytes | None] = []
+        self._free_slots: list[int] = []
+        self._value_bytes = 0
+
+    def _store(self, phone_number: str, value: str | bytes) -> bool:
+        """Write a record; return whether it was created."""
+        if isinstance(value, str):
+            value = value.encode('utf-8', ENCODING_ERRORS)
+        slot = self._slots.get(phone_number)
+        if slot is not None:
+            self._value_bytes += len(value) - len(self._values[slot])
+            self._values[slot] = value
+            return False
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._phone_numbers[slot] = phone_number
+            self._values[slot] = value
+        else:
+            slot = len(self._values)
+            self._phone_numbers.append(phone_number)
+            self._values.append(value)
+        self._slots[phone_number] = slot
+        self._value_bytes += len(value)
+        return True
+
+    def _remove(self, phone_number: str) -> bool:
+        slot = self._slots.pop(phone_number, None)
+        if slot is None:
+            return False
+        self._value_bytes -= len(self._values[slot])
+        self._phone_numbers[slot] = None
+        self._values[slot] = None
+        self._free_slots.append(slot)
+        return True
+
+    def _get(self, phone_number: str) -> bytes | None:
+        slot = self._slots.get(phone_number)
+        return None if slot is None else self._values[slot]
+
+    def _apply(self, write: StoredWrite) -> bool:
+        if write.value is None:
+            return self._remove(write.phone_number)
+        exists = write.phone_number in self._slots
+        if write.condition is SetCondition.IF_MISSING and exists:
+            return False
+        if write.condition is SetCondition.IF_EXISTS and not exists:
+            return False
+        created = self._store(write.phone_number, write.value)
+        return created if write.condition is SetCondition.ALWAYS else True
+
+    async def get(self, phone_number: str) -> bytes | None:
+        return self._get(phone_number)
+
+    async def mget(self, phone_numbers: list[str]) -> list[bytes | None]:
+        return [self._get(phone_number) for phone_number in phone_numbers]
+
+    async def set(self, phone_number: str, value: str | bytes, condition: SetCondition = SetCondition.ALWAYS) -> bool:
+        return self._apply(StoredWrite(phone_number, value, condition))
+
+    async def delete(self, phone_number: str) -> bool:
+        return self._remove(phone_number)
+
+    async def compare_and_set(self, phone_number: str, expected_version: str, value: str | bytes | None) -> int:
+        stored = self._get(phone_number)
+        if stored is None:
+            return 0
+        if hashlib.sha1(stored).hexdigest() != expected_version:
+            return -1
+        if value is None:
+            self._remove(phone_number)
+        else:
+            self._store(phone_number, value)
+        return 1
+
+    async def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[str, bytes | None]]]:
+        end = min(cursor + max(count, 1), len(self._values))
+        records = [
+            (self._phone_numbers[slot], self._values[slot])
+            for slot in range(cursor, end)
+            if self._phone_numbers[slot] is not None
+        ]
+        return (0 if end >= len(self._values) else end), records
+
+    async def write_many(self, writes: list[StoredWrite]) -> list[bool]:
+        return [self._apply(write) for write in writes]
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of records and the bytes their values take for monitoring."""
+        return {
+            'records': len(self._slots),
+            'value_bytes': self._value_bytes,
+            'free_slots': len(self._free_slots),
+        }
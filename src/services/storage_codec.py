@@ -0,0 +1,270 @@
+import json
+from collections.abc import Iterable
+from enum import IntEnum
+from pathlib import Path
+from typing import Any
+
+from services.component_dictionary import ComponentDictionary
+
+# Fields of a stored address, in the order the binary formats write them
+ADDRESS_FIELDS = ('street', 'city', 'state_province', 'postal_code', 'country')
+# Fields the interned format stores as component dictionary IDs
+INTERNED_FIELDS = ('city', 'state_province', 'country')
+# Values are read through a decode_responses client; binary values reach us as str with
+# undecodable bytes escaped, and this error handler turns them back into the original bytes
+ENCODING_ERRORS = 'surrogateescape'
+
+# Set on the header byte when the body is a zstd frame
+COMPRESSED_FLAG = 0x80
+
+
+class StorageFormat(IntEnum):
+    """Header byte identifying how a stored value is encoded.
+
+    Plain JSON values carry no extra header: their first byte is always ``{``, which
+    no other format uses, so values written before the codec existed stay readable.
+    """
+
+    JSON = 0x01
+    # Address fields as length-prefixed UTF-8, with formatted_address derived on read
+    BINARY = 0x02
+    # As BINARY, with city, state_province and country replaced by component dictionary IDs
+    INTERNED = 0x03
+
+
+class UnknownComponentError(LookupError):
+    """Raised when an interned record refers to component IDs this worker has not loaded yet."""
+
+    def __init__(self, component_ids: list[int]):
+        super().__init__(f'Unknown component IDs: {component_ids}')
+        self.component_ids = component_ids
+
+
+def format_address(address: dict[str, Any]) -> str:
+    """Return the formatted_address the Address model derives from the other fields."""
+    return (
+        f'{address["street"]}, {address["city"]}, {address["state_province"]} '
+        + f'{address["postal_code"]}, {address["country"]}'
+    )
+
+
+def _fits_schema(address: dict[str, Any]) -> bool:
+    """Return whether ``address`` can be stored in the binary formats without losing anything."""
+    return (
+        address.keys() == {*ADDRESS_FIELDS, 'formatted_address'}
+        and all(isinstance(value, str) for value in address.values())
+        and address['formatted_address'] == format_address(address)
+    )
+
+
+def _write_varint(body: bytearray, value: int) -> None:
+    # Unsigned LEB128
+    while value >= 0x80:
+        body.append(value & 0x7F | 0x80)
+        value >>= 7
+    body.append(value)
+
+
+def _read_varint(body: bytes, position: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = body[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+
+def _encode_binary(address: dict[str, Any]) -> bytes | None:
+    """Encode an address in the binary format, or return None if it does not fit the schema."""
+    if not _fits_schema(address):
+        return None
+
+    body = bytearray()
+    for field in ADDRESS_FIELDS:
+        data = address[field].encode()
+        _write_varint(body, len(data))
+        body += data
+    return bytes(body)
+
+
+def _decode_binary(body: bytes) -> dict[str, Any]:
+    address = {}
+    position = 0
+    for field in ADDRESS_FIELDS:
+        length, position = _read_varint(body, position)
+        address[field] = body[position : position + length].decode()
+        position += length
+    if position != len(body):
+        raise ValueError('Trailing bytes after binary address record')
+    address['formatted_address'] = format_address(address)
+    return address
+
+
+def _encode_interned(address: dict[str, Any], components: ComponentDictionary) -> bytes | None:
+    """Encode an address in the interned format, or return None if it does not fit the schema
+    or one of its components has no cached ID yet.
+    """
+    if not _fits_schema(address):
+        return None
+
+    body = bytearray()
+    for field in ADDRESS_FIELDS:
+        if field in INTERNED_FIELDS:
+            component_id = components.id_for(address[field])
+            if component_id is None:
+                return None
+            _write_varint(body, component_id)
+        else:
+            data = address[field].encode()
+            _write_varint(body, len(data))
+            body += data
+    return bytes(body)
+
+
+def _decode_interned(body: bytes, components: ComponentDictionary) -> dict[str, Any]:
+    address = {}
+    unknown = []
+    position = 0
+    for field in ADDRESS_FIELDS:
+        if field in INTERNED_FIELDS:
+            component_id, position = _read_varint(body, position)
+            value = components.string_for(component_id)
+            if value is None:
+                unknown.append(component_id)
+            address[field] = value
+        else:
+            length, position = _read_varint(body, position)
+            address[field] = body[position : position + length].decode()
+            position += length
+    if position != len(body):
+        raise ValueError('Trailing bytes after interned address record')
+    if unknown:
+        raise UnknownComponentError(unknown)
+    address['formatted_address'] = format_address(address)
+    return address
+
+
+def load_dictionary(path: str) -> bytes | None:
+    """Read a zstd dictionary file, or return None if no path is configured."""
+    return Path(path).read_bytes() if path else None
+
+
+class StorageCodec:
+    """Encodes addresses for storage in Redis and decodes any supported stored format.
+
+    ``storage_format`` only selects how new values are written; decoding always looks
+    at the header byte, so a keyspace with a mix of formats reads correctly. Records
+    that do not fit the binary schema are written as JSON instead.
+
+    With ``compression='zstd'`` the encoded body is compressed with the given level and
+    optional trained dictionary (raw dictionary bytes). Compressed values can be read
+    whatever ``compression`` is set to, but need the dictionary they were written with.
+
+    The interned format needs the IDs of a record's components in ``components``: call
+    ``ComponentDictionary.intern`` with ``interned_components()`` before encoding (records
+    with components not interned yet are written as BINARY), and load the IDs reported by
+    ``UnknownComponentError`` before decoding again.
+    """
+
+    def __init__(
+        self,
+        storage_format: str = 'json',
+        compression: str = 'none',
+        level: int = 3,
+        dictionary: bytes | None = None,
+        components: ComponentDictionary | None = None,
+    ):
+        self.storage_format = StorageFormat[storage_format.upper()]
+        self.components = components or ComponentDictionary()
+        self.compression = compression
+        self.level = level
+        self.dictionary = dictionary
+        self._zstd: Any = None
+        self._zstd_dict: Any = None
+        if compression == 'zstd' or dictionary is not None:
+            self._load_zstd()
+
+    def _load_zstd(self) -> None:
+        # Imported lazily so the module is only needed once zstd values are written or read
+        from compression import zstd
+
+        self._zstd = zstd
+        if self.dictionary is not None:
+            self._zstd_dict = zstd.ZstdDict(self.dictionary)
+
+    def serialize(self, address: dict[str, Any]) -> tuple[StorageFormat, bytes]:
+        """Return the format and uncompressed body ``address`` would be written with."""
+        if self.storage_format is StorageFormat.INTERNED:
+            body = _encode_interned(address, self.components)
+            if body is not None:
+                return StorageFormat.INTERNED, body
+        if self.storage_format is not StorageFormat.JSON:
+            body = _encode_binary(address)
+            if body is not None:
+                return StorageFormat.BINARY, body
+        return StorageFormat.JSON, json.dumps(address, separators=(',', ':')).encode()
+
+    def interned_components(self, addresses: Iterable[dict[str, Any]]) -> list[str]:
+        """Return the components of ``addresses`` that need an ID before they can be encoded."""
+        if self.storage_format is not StorageFormat.INTERNED:
+            return []
+        return [address[field] for address in addresses if _fits_schema(address) for field in INTERNED_FIELDS]
+
+    def encode(self, address: dict[str, Any]) -> str | bytes:
+        """Return the value to store for ``address``."""
+        if self.compression != 'zstd' and self.storage_format is StorageFormat.JSON:
+            # Uncompressed JSON is stored as is; its leading '{' identifies it
+            return json.dumps(address)
+
+        storage_format, body = self.serialize(address)
+        if self.compression == 'zstd':
+            body = self._zstd.compress(body, level=self.level, zstd_dict=self._zstd_dict)
+            return bytes([storage_format | COMPRESSED_FLAG]) + body
+        if storage_format is StorageFormat.JSON:
+            return json.dumps(address)
+        return bytes([storage_format]) + body
+
+    def decode(self, value: str | bytes) -> dict[str, Any]:
+        """Decode a stored value of any supported format.
+
+        Raises:
+            ValueError: If the value is corrupt or uses an unknown format
+            UnknownComponentError: If an interned value refers to component IDs not loaded yet
+
+        """
+        if isinstance(value, str):
+            if value.startswith('{'):
+                return json.loads(value)
+            value = value.encode('utf-8', ENCODING_ERRORS)
+        if value[:1] == b'{':
+            return json.loads(value)
+        if not value:
+            raise ValueError('Empty stored value')
+
+        header, body = value[0], value[1:]
+        if header & COMPRESSED_FLAG:
+            body = self._decompress(body)
+            header &= ~COMPRESSED_FLAG
+
+        try:
+            storage_format = StorageFormat(header)
+        except ValueError:
+            raise ValueError(f'Unknown storage format header {header:#04x}') from None
+        try:
+            if storage_format is StorageFormat.BINARY:
+                return _decode_binary(body)
+            if storage_format is StorageFormat.INTERNED:
+                return _decode_interned(body, self.components)
+        except (IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f'Corrupt {storage_format.name.lower()} address record: {e!s}') from e
+        return json.loads(body)
+
+    def _decompress(self, body: bytes) -> bytes:
+        if self._zstd is None:
+            self._load_zstd()
+        try:
+            return self._zstd.decompress(body, zstd_dict=self._zstd_dict)
+        except self._zstd.ZstdError as e:
+            raise ValueError(f'Corrupt compressed value: {e!s}') from e
@@ -0,0 +1,152 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from services.storage_backend import SetCondition, StorageBackend, StoredWrite
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Holds acknowledged updates in memory and writes them to storage in batches.
+
+    Updates of the same phone number coalesce, last write wins. The buffer is flushed
+    as ``write_many`` batches of ``flush_size`` once it holds that many numbers, and
+    otherwise every ``flush_interval`` seconds. With ``max_pending`` numbers waiting,
+    an update of a new number waits for a flush first, which bounds memory and slows
+    writers down to what storage keeps up with.
+
+    Buffered updates are lost if the process dies before they are flushed, and other
+    workers only see them once flushed; ``stats()`` reports how many are waiting and
+    for how long. An update whose record was deleted before its flush is dropped, and
+    logged; this is why buffered updates are reported as accepted rather than updated.
+    """
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        flush_size: int = 500,
+        flush_interval: float = 0.1,
+        max_pending: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.storage = storage
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        # Phone number -> (stored value, time its oldest unflushed update was acknowledged)
+        self._pending: dict[str, tuple[str | bytes, float]] = {}
+        # The batch being written, still visible to reads until it is stored
+        self._flushing: dict[str, tuple[str | bytes, float]] = {}
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.updates = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_lag: float | None = None
+
+    def pending_value(self, phone_number: str) -> str | bytes | None:
+        """Return the latest buffered value of a phone number, or None if it has none."""
+        entry = self._pending.get(phone_number) or self._flushing.get(phone_number)
+        return None if entry is None else entry[0]
+
+    async def put(self, phone_number: str, value: str | bytes) -> None:
+        """Buffer an update of an existing record."""
+        entry = self._pending.get(phone_number)
+        if entry is not None:
+            self.coalesced += 1
+            self._pending[phone_number] = (value, entry[1])
+        else:
+            if len(self._pending) >= self.max_pending:
+                await self.flush()
+            self._pending[phone_number] = (value, self._clock())
+        self.updates += 1
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.flush_size:
+            self._wake.set()
+
+    async def settle(self, phone_numbers: Iterable[str]) -> None:
+        """Store every buffered update if any of ``phone_numbers`` has one, e.g. before another kind of write."""
+        if any(number in self._pending or number in self._flushing for number in phone_numbers):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write every buffered update to storage.
+
+        Updates that could not be written are kept for the next flush, unless superseded
+        meanwhile, and the error is raised.
+        """
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            started = self._clock()
+            items = list(batch.items())
+            stored = 0
+            try:
+                await self.storage.prepare_batch()
+                while stored < len(items):
+                    chunk = items[stored : stored + self.flush_size]
+                    writes = [StoredWrite(number, value, SetCondition.IF_EXISTS) for number, (value, _) in chunk]
+                    results = await self.storage.write_many(writes)
+                    stored += len(chunk)
+                    self.flushed += sum(results)
+                    dropped = [number for (number, _), result in zip(chunk, results, strict=True) if not result]
+                    if dropped:
+                        self.dropped += len(dropped)
+                        logger.warning(f'Write-behind dropped updates of records deleted before the flush: {dropped}')
+            except BaseException:
+                self.flush_errors += 1
+                for number, entry in items[stored:]:
+                    self._pending.setdefault(number, entry)
+                raise
+            finally:
+                self._flushing = {}
+            self.flushes += 1
+            # Time the oldest update of the batch waited before its flush started
+            self.last_flush_lag = started - min(enqueued for _, enqueued in batch.values())
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f'Write-behind flush failed, retrying with the next one: {e!s}')
+
+    async def aclose(self) -> None:
+        """Stop the periodic flushes and write what is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        """Return buffered update counts and flush lag for monitoring."""
+        waiting = [enqueued for _, enqueued in (*self._pending.values(), *self._flushing.values())]
+        return {
+            # Numbers with accepted updates not yet stored: lost if the process dies now
+            'pending': len(self._pending.keys() | self._flushing.keys()),
+            'updates': self.updates,
+            'coalesced': self.coalesced,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'flush_errors': self.flush_errors,
+            'oldest_pending_ms': (self._clock() - min(waiting)) * 1000 if waiting else None,
+            'last_flush_lag_ms': self.last_flush_lag * 1000 if self.last_flush_lag is not None else None,
+        }
@@ -0,0 +1,77 @@
+"""Compile the phone book in Redis into a snapshot file for read-only replicas.
+
+Usage: python -m tools.compile_snapshot OUTPUT [--format json|binary] [--batch-size N]
+
+Records are re-encoded in the given format (compressed if ``STORAGE_COMPRESSION`` is
+zstd), since interned values would need the component dictionary in Redis to be read.
+The snapshot is renamed over OUTPUT once complete; servers with ``STORAGE_BACKEND=snapshot``
+and ``SNAPSHOT_PATH`` pointing at it switch to it within ``SNAPSHOT_CHECK_INTERVAL``.
+Redis is reached like the servers reach it, so every cluster node or shard is walked.
+Records written during the walk may or may not be included. Values are spooled to a file
+next to OUTPUT as they are read, and the index is sorted in runs spilled to temporary
+files, so memory use does not grow with the number of records.
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+from api.dependencies import create_redis_client
+from config.settings import settings
+from services.key_layout import KEY_LAYOUTS
+from services.phonebook_service import PhoneBookService
+from services.snapshot_backend import SnapshotWriter, pack_phone_number
+from services.storage_codec import StorageCodec, load_dictionary
+
+
+async def collect_records(
+    redis_client: Redis, codec: StorageCodec, batch_size: int, writer: SnapshotWriter
+) -> list[str]:
+    """Add the stored records, re-encoded with ``codec``, to ``writer`` as they are scanned.
+
+    Returns the phone numbers that cannot be indexed.
+    """
+    # Reads any stored format, loading interned components from Redis as needed
+    reader = StorageCodec(dictionary=load_dictionary(settings.storage_zstd_dictionary))
+    service = PhoneBookService(redis_client, codec=reader, layout=KEY_LAYOUTS[settings.storage_layout])
+    skipped = []
+    async for _, batch in service.scan_addresses(batch_size=batch_size):
+        for phone_number, address in batch:
+            if pack_phone_number(phone_number) is None:
+                skipped.append(phone_number)
+            else:
+                writer.add(phone_number, codec.encode(address))
+    return skipped
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', type=Path, help='Snapshot file to write')
+    parser.add_argument('--format', choices=['json', 'binary'], default='binary', help='Format of stored values')
+    parser.add_argument('--batch-size', type=int, default=1000, help='COUNT hint per SCAN')
+    args = parser.parse_args()
+
+    codec = StorageCodec(
+        storage_format=args.format,
+        compression=settings.storage_compression,
+        level=settings.storage_zstd_level,
+        dictionary=load_dictionary(settings.storage_zstd_dictionary),
+    )
+    # Same topology as the servers: a cluster or shard set is walked node by node
+    redis_client = create_redis_client()
+    try:
+        with SnapshotWriter(args.output) as writer:
+            skipped = await collect_records(redis_client, codec, args.batch_size, writer)
+            count = writer.finish()
+    finally:
+        await redis_client.aclose()
+
+    print(f'Wrote {count} records to {args.output} ({args.output.stat().st_size} bytes)')
+    if skipped:
+        print(f'Skipped {len(skipped)} phone numbers that cannot be indexed, e.g. {skipped[0]!r}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Measure Redis memory per record for the string and hash key layouts.
+
+Usage: python -m tools.measure_layout_memory [--records N] [--format json|binary|interned]
+
+Writes N synthetic records in each layout under throwaway '+999' phone numbers,
+reports the growth of used_memory per record and the encoding of a sample key, then
+deletes them again. Run it against a server that is otherwise idle, since concurrent
+writes by other clients distort the measurement.
+"""
+
+import argparse
+import asyncio
+from typing import Any
+
+from redis.asyncio import Redis
+
+from config.settings import settings
+from services.key_layout import KEY_LAYOUTS, StringKeyLayout
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation
+from services.storage_codec import ENCODING_ERRORS, StorageCodec
+
+# Synthetic records use this prefix so they never collide with real numbers
+SYNTHETIC_PREFIX = '+999'
+WRITE_CHUNK_SIZE = 1000
+
+
+def synthetic_operations(count: int) -> list[WriteOperation]:
+    """Return upserts of ``count`` distinct synthetic records."""
+    operations = []
+    for i in range(count):
+        address = {
+            'street': f'{100 + i % 9000} Main St',
+            'city': 'Anytown',
+            'state_province': 'NY',
+            'postal_code': f'{10000 + i % 90000:05d}',
+            'country': 'US',
+        }
+        address['formatted_address'] = f'{address["street"]}, Anytown, NY {address["postal_code"]}, US'
+        operations.append(WriteOperation(WriteOp.UPSERT, f'{SYNTHETIC_PREFIX}{i:010d}', address))
+    return operations
+
+
+async def used_memory(redis_client: Redis) -> int:
+    return (await redis_client.info('memory'))['used_memory']
+
+
+async def measure(redis_client: Redis, layout: StringKeyLayout, codec: StorageCodec, count: int) -> dict[str, Any]:
+    """Write ``count`` records in ``layout`` and return memory per record and a sample encoding."""
+    service = PhoneBookService(redis_client, codec=codec, layout=layout)
+    operations = synthetic_operations(count)
+    before = await used_memory(redis_client)
+    await service.bulk_write(operations, chunk_size=WRITE_CHUNK_SIZE)
+    after = await used_memory(redis_client)
+
+    sample_key = layout.cas_target(operations[0].phone_number)[0][0]
+    encoding = await redis_client.object('encoding', sample_key)
+
+    await service.bulk_write(
+        [WriteOperation(WriteOp.DELETE, operation.phone_number) for operation in operations],
+        chunk_size=WRITE_CHUNK_SIZE,
+    )
+    return {'bytes_per_record': (after - before) / count, 'sample_encoding': encoding}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help='Records to write per layout')
+    parser.add_argument('--format', choices=['json', 'binary', 'interned'], default=settings.storage_format)
+    args = parser.parse_args()
+
+    codec = StorageCodec(storage_format=args.format)
+    redis_client = Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+        encoding_errors=ENCODING_ERRORS,
+    )
+    try:
+        for name, layout in KEY_LAYOUTS.items():
+            result = await measure(redis_client, layout, codec, args.records)
+            print(
+                f'{name:6} layout, {args.format} values: {result["bytes_per_record"]:.1f} bytes/record '
+                + f'(sample key encoding: {result["sample_encoding"]})'
+            )
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""Move keys to the shard that owns them after REDIS_SHARDS changes.
+
+Usage: python -m tools.rebalance_shards [--shards HOST:PORT,...] [--drain HOST:PORT,...] [--dry-run]
+
+Scans every shard in ``--shards`` (default: REDIS_SHARDS) plus any being removed
+(``--drain``), and MIGRATEs each key whose owner on the new hash ring is a different
+shard. A key the owner already holds was written there by a worker on the new ring and
+is newer, so the owner's copy is kept and the old one deleted. The ring is consistent, so adding a shard only moves the keys it takes over,
+roughly 1/N of them. Until the tool finishes, workers using the new ring miss keys that
+have not moved yet: run it right after deploying the new REDIS_SHARDS, off-peak.
+"""
+
+import argparse
+import asyncio
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from config.settings import settings
+from services.sharding import HashRing, parse_endpoints
+
+MIGRATE_TIMEOUT_MS = 5000
+
+
+async def migrate_keys(client: Redis, target: str, keys: list[str]) -> int:
+    """MIGRATE ``keys`` to ``target`` without replacing its copies; return how many it already had.
+
+    Workers on the new ring write to the target during the rebalance, so a copy already
+    there is newer than the source's: it is kept and the source's is deleted.
+    """
+    host, port = parse_endpoints(target)[0]
+    try:
+        await client.migrate(host, port, keys, settings.redis_db, MIGRATE_TIMEOUT_MS)
+        return 0
+    except ResponseError as e:
+        if not str(e).startswith('BUSYKEY'):
+            raise
+    # Keys moved before the error are gone from the source and answer NOKEY; retry the rest one by one
+    superseded = 0
+    for key in keys:
+        try:
+            await client.migrate(host, port, key, settings.redis_db, MIGRATE_TIMEOUT_MS)
+        except ResponseError as e:
+            if not str(e).startswith('BUSYKEY'):
+                raise
+            await client.delete(key)
+            superseded += 1
+    return superseded
+
+
+async def rebalance_shard(
+    source: str,
+    ring: HashRing,
+    scan_count: int,
+    dry_run: bool,
+) -> tuple[dict[str, int], int]:
+    """Move the keys of ``source`` that ``ring`` assigns elsewhere.
+
+    Returns the count per target, and how many of those keys the target had already
+    written itself, so that only the source's older copy was deleted.
+    """
+    host, port = parse_endpoints(source)[0]
+    client = Redis(host=host, port=port, db=settings.redis_db, decode_responses=True)
+    moved: dict[str, int] = {}
+    superseded = 0
+    try:
+        cursor = 0
+        while True:
+            cursor, keys = await client.scan(cursor, count=scan_count)
+            by_target: dict[str, list[str]] = {}
+            for key in keys:
+                target = ring.shard_for(key)
+                if target != source:
+                    by_target.setdefault(target, []).append(key)
+            for target, target_keys in by_target.items():
+                if not dry_run:
+                    superseded += await migrate_keys(client, target, target_keys)
+                moved[target] = moved.get(target, 0) + len(target_keys)
+            if cursor == 0:
+                return moved, superseded
+    finally:
+        await client.aclose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', default=settings.redis_shards, help='The new shard list')
+    parser.add_argument('--drain', default='', help='Shards being removed, emptied into the others')
+    parser.add_argument('--scan-count', type=int, default=1000, help='COUNT hint for each SCAN')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the keys that would move')
+    args = parser.parse_args()
+
+    shards = [f'{host}:{port}' for host, port in parse_endpoints(args.shards)]
+    if not shards:
+        parser.error('No shards given; set REDIS_SHARDS or pass --shards')
+    ring = HashRing(shards, settings.redis_shard_virtual_nodes)
+    sources = shards + [f'{host}:{port}' for host, port in parse_endpoints(args.drain)]
+
+    for source in sources:
+        moved, superseded = await rebalance_shard(source, ring, args.scan_count, args.dry_run)
+        verb = 'would move' if args.dry_run else 'moved'
+        summary = ', '.join(f'{count} to {target}' for target, count in sorted(moved.items())) or 'nothing'
+        if superseded:
+            summary += f' ({superseded} already rewritten on their target, kept there)'
+        print(f'{source}: {verb} {summary}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Train a zstd dictionary from a sample of stored addresses.
+
+Usage: python -m tools.train_zstd_dictionary OUTPUT [--samples N] [--size BYTES]
+
+Samples are serialized in the configured ``STORAGE_FORMAT``, so the dictionary matches
+what will be compressed. Point ``STORAGE_ZSTD_DICTIONARY`` at the output file. Keep
+every dictionary that values were written with: compressed values can only be read
+with the dictionary they were compressed with.
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from redis.asyncio import Redis
+
+from config.settings import settings
+from services.phonebook_service import PhoneBookService
+from services.storage_codec import ENCODING_ERRORS, StorageCodec, load_dictionary
+
+
+async def collect_samples(redis_client: Redis, codec: StorageCodec, limit: int) -> list[bytes]:
+    """Return up to ``limit`` stored addresses serialized as uncompressed bodies."""
+    service = PhoneBookService(redis_client, codec=codec)
+    samples: list[bytes] = []
+    async for _, records in service.scan_addresses(batch_size=1000):
+        # Interned samples need their component IDs, as they would when written
+        await codec.components.intern(redis_client, codec.interned_components(address for _, address in records))
+        for _, address in records:
+            samples.append(codec.serialize(address)[1])
+            if len(samples) >= limit:
+                return samples
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', type=Path, help='File to write the dictionary to')
+    parser.add_argument('--samples', type=int, default=10000, help='Maximum records to sample')
+    parser.add_argument('--size', type=int, default=16384, help='Dictionary size in bytes')
+    args = parser.parse_args()
+
+    from compression import zstd
+
+    # The current dictionary, if any, is still needed to read values compressed with it
+    codec = StorageCodec(
+        storage_format=settings.storage_format,
+        dictionary=load_dictionary(settings.storage_zstd_dictionary),
+    )
+    redis_client = Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+        encoding_errors=ENCODING_ERRORS,
+    )
+    try:
+        samples = await collect_samples(redis_client, codec, args.samples)
+    finally:
+        await redis_client.aclose()
+
+    dictionary = zstd.train_dict(samples, args.size)
+    args.output.write_bytes(dictionary.dict_content)
+    print(f'Trained a {len(dictionary.dict_content)} byte dictionary from {len(samples)} records: {args.output}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+def format_etag(version: str) -> str:
+    """Return the strong entity tag of a record version."""
+    return f'"{version}"'
+
+
+def entity_tags(header: str) -> list[str]:
+    """Split an If-Match or If-None-Match header into its entity tags, as sent."""
+    return [tag for tag in (part.strip() for part in header.split(',')) if tag]
+
+
+def none_match(header: str, version: str) -> bool:
+    """Return whether an If-None-Match header lets a read of ``version`` through.
+
+    It does unless the header is ``*`` or one of its tags weakly matches the version.
+    """
+    tags = entity_tags(header)
+    return '*' not in tags and format_etag(version) not in (tag.removeprefix('W/') for tag in tags)
+
+
+def if_match_versions(header: str) -> list[str] | None:
+    """Return the versions an If-Match header accepts, or None if it accepts any existing record (``*``).
+
+    A weak tag never matches strongly, so it is returned as is and fails the version check.
+
+    Raises:
+        ValueError: If the header names no entity tag
+
+    """
+    tags = entity_tags(header)
+    if not tags:
+        raise ValueError('If-Match must name an entity tag or *')
+    if '*' in tags:
+        return None
+    return [tag[1:-1] if len(tag) >= 2 and tag[0] == tag[-1] == '"' else tag for tag in tags]
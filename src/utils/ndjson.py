@@ -0,0 +1,53 @@
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes], max_line_length: int) -> AsyncIterator[bytes | None]:
+    """Split a stream of byte chunks into NDJSON lines without buffering the whole stream.
+
+    At most one line (capped at ``max_line_length`` bytes) is held in memory at a time.
+
+    Args:
+        chunks: Byte chunks in arrival order, e.g. a request body stream
+        max_line_length: Longest line kept, in bytes
+
+    Yields:
+        Each line without its line terminator, or None in place of a line that
+        exceeded ``max_line_length`` and was discarded
+
+    """
+    buffer = bytearray()
+    # Set while discarding the remainder of an overlong line
+    skipping = False
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b'\n', start)
+            if newline == -1:
+                if not skipping:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_length:
+                        buffer.clear()
+                        skipping = True
+                break
+
+            if skipping:
+                skipping = False
+                yield None
+            else:
+                buffer += chunk[start:newline]
+                yield None if len(buffer) > max_line_length else bytes(buffer.rstrip(b'\r'))
+                buffer.clear()
+            start = newline + 1
+
+    if skipping:
+        yield None
+    elif buffer:
+        yield bytes(buffer.rstrip(b'\r'))
+
+
+def ndjson_line(data: Any) -> bytes:
+    """Serialize one object as an NDJSON line."""
+    return json.dumps(data).encode() + b'\n'
@@ -0,0 +1,42 @@
+"""Shared fixtures for tests that need a running Redis Cluster.
+
+Start one locally with ``docker compose -f docker-compose.cluster.yml up -d`` and point
+``REDIS_CLUSTER_NODES`` at it if it is not on localhost:7000-7002.
+"""
+
+import os
+
+import pytest
+from redis.asyncio.cluster import ClusterNode, RedisCluster
+from redis.exceptions import RedisClusterException, RedisError
+
+from services.storage_codec import ENCODING_ERRORS
+
+# Tests write throwaway keys under this prefix; they are removed after each test
+CLUSTER_TEST_KEY_PREFIX = '+999'
+
+
+@pytest.fixture
+async def local_cluster():
+    """Return a client for the local Redis Cluster, skipping if it is not reachable."""
+    addresses = os.environ.get('REDIS_CLUSTER_NODES', 'localhost:7000,localhost:7001,localhost:7002')
+    nodes = [
+        ClusterNode(host, int(port)) for host, _, port in (a.strip().rpartition(':') for a in addresses.split(','))
+    ]
+    client = RedisCluster(startup_nodes=nodes, decode_responses=True, encoding_errors=ENCODING_ERRORS)
+    try:
+        await client.initialize()
+    except (RedisClusterException, RedisError, OSError):
+        await client.aclose()
+        pytest.skip(f'No Redis Cluster reachable at {addresses}')
+    if len(client.get_primaries()) < 2:
+        await client.aclose()
+        pytest.skip('The Redis Cluster needs at least two primaries')
+
+    yield client
+
+    keys = [key async for key in client.scan_iter(match=f'{CLUSTER_TEST_KEY_PREFIX}*', count=1000)]
+    keys += [key async for key in client.scan_iter(match=f'addrex:h:{CLUSTER_TEST_KEY_PREFIX}*', count=1000)]
+    for key in keys:
+        await client.delete(key)
+    await client.aclose()
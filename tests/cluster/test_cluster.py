@@ -0,0 +1,84 @@
+"""Tests of the storage layer against a multi-node Redis Cluster."""
+
+import pytest
+from redis.crc import key_slot
+
+from services.component_dictionary import COMPONENT_IDS_KEY, COMPONENT_SEQUENCE_KEY, COMPONENT_STRINGS_KEY
+from services.key_layout import HashKeyLayout, StringKeyLayout
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+from services.storage_codec import StorageCodec
+
+# Removed again by the local_cluster fixture after each test
+CLUSTER_TEST_KEY_PREFIX = '+999'
+RECORD_COUNT = 300
+
+
+def _address(i: int) -> dict:
+    street = f'{i} Main St'
+    return {
+        'street': street,
+        'city': 'Anytown',
+        'state_province': 'NY',
+        'postal_code': '12345',
+        'country': 'US',
+        'formatted_address': f'{street}, Anytown, NY 12345, US',
+    }
+
+
+def _phone(i: int) -> str:
+    return f'{CLUSTER_TEST_KEY_PREFIX}{i * 7919:08d}'
+
+
+@pytest.mark.parametrize('layout', [StringKeyLayout(), HashKeyLayout()], ids=lambda layout: layout.name)
+async def test_batch_operations_span_slots(local_cluster, layout):
+    """Test bulk writes, batch reads and SCAN over keys spread across every primary."""
+    service = PhoneBookService(local_cluster, codec=StorageCodec(storage_format='binary'), layout=layout)
+    phones = [_phone(i) for i in range(RECORD_COUNT)]
+    keys = [layout.cas_target(phone)[0][0] for phone in phones]
+    assert len({local_cluster.nodes_manager.get_node_from_slot(key_slot(key.encode())).name for key in keys}) > 1
+
+    statuses = await service.bulk_write(
+        [WriteOperation(WriteOp.UPSERT, phone, _address(i)) for i, phone in enumerate(phones)],
+        chunk_size=100,
+    )
+    assert statuses == [WriteStatus.CREATED] * RECORD_COUNT
+
+    addresses = await service.get_addresses([*phones, f'{CLUSTER_TEST_KEY_PREFIX}99999999'], chunk_size=100)
+    assert [addresses[phone] for phone in phones] == [_address(i) for i in range(RECORD_COUNT)]
+    assert addresses[f'{CLUSTER_TEST_KEY_PREFIX}99999999'] is None
+
+    scanned = {}
+    async for _, records in service.scan_addresses(batch_size=100):
+        scanned.update(record for record in records if record[0].startswith(CLUSTER_TEST_KEY_PREFIX))
+    assert scanned == {phone: _address(i) for i, phone in enumerate(phones)}
+
+    statuses = await service.bulk_write([WriteOperation(WriteOp.DELETE, phone) for phone in phones])
+    assert statuses == [WriteStatus.DELETED] * RECORD_COUNT
+
+
+@pytest.mark.parametrize('layout', [StringKeyLayout(), HashKeyLayout()], ids=lambda layout: layout.name)
+async def test_single_record_scripts(local_cluster, layout):
+    """Test that script-based writes are routed to the slot of the key they declare."""
+    service = PhoneBookService(local_cluster, layout=layout)
+    phone = _phone(1)
+
+    assert await service.create_address(phone, _address(1)) is WriteStatus.CREATED
+    assert await service.update_address(phone, _address(2)) is WriteStatus.UPDATED
+    _, version = await service.get_versioned_address(phone)
+    assert await service.update_address(phone, _address(3), expected_version='0' * 40) is WriteStatus.VERSION_MISMATCH
+    assert await service.delete_address(phone, expected_version=version) is WriteStatus.DELETED
+    assert await service.get_address(phone) is None
+
+
+async def test_component_dictionary_keys_share_a_slot(local_cluster):
+    """Test that the hash-tagged dictionary keys work with the multi-key interning script."""
+    assert (
+        len({key_slot(key.encode()) for key in (COMPONENT_IDS_KEY, COMPONENT_STRINGS_KEY, COMPONENT_SEQUENCE_KEY)}) == 1
+    )
+
+    writer = PhoneBookService(local_cluster, codec=StorageCodec(storage_format='interned'))
+    assert await writer.create_address(_phone(1), _address(1)) is WriteStatus.CREATED
+
+    reader = PhoneBookService(local_cluster, codec=StorageCodec())
+    assert await reader.get_address(_phone(1)) == _address(1)
+    assert reader.codec.components.stats()['loaded'] == 3
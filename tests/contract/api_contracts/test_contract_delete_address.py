@@ -32,6 +32,7 @@ async def test_delete_address_contract_not_found():
     """Contract test for DELETE /address/{phone_number} - not found response."""
     mock_redis = AsyncMock()
     mock_redis.get = AsyncMock(return_value=None)
+    mock_redis.delete = AsyncMock(return_value=0)  # No key removed
 
     async def override():
         return mock_redis
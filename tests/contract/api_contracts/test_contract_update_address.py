@@ -10,7 +10,8 @@ from main import app
 def _mock_redis(existing_json: str | None):
     mock_redis = AsyncMock()
     mock_redis.get = AsyncMock(return_value=existing_json)
-    mock_redis.set = AsyncMock(return_value=True)
+    # SET XX only writes (and returns True) when the key is present
+    mock_redis.set = AsyncMock(return_value=True if existing_json else None)
     mock_redis.exists = AsyncMock(return_value=bool(existing_json))
     return mock_redis
 
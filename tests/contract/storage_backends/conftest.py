@@ -0,0 +1,65 @@
+"""Storage backends the contract tests run against.
+
+The Redis variants use the configured Redis server and are skipped if it is not
+reachable; they only touch records under ``CONTRACT_KEY_PREFIX``.
+"""
+
+import pytest
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from config.settings import settings
+from services.key_layout import KEY_LAYOUTS
+from services.sqlite_backend import SQLiteBackend
+from services.storage_backend import MemoryBackend, RedisBackend
+from services.storage_codec import ENCODING_ERRORS
+
+# Phone numbers written by the tests start with this; they are removed after each test
+CONTRACT_KEY_PREFIX = '+999'
+
+# Set once Redis was found unreachable, so later tests skip without retrying the connection
+redis_unreachable = False
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis-string', 'redis-hash', 'redis-content'])
+async def backend(request, tmp_path):
+    """Return an empty storage backend of each kind."""
+    global redis_unreachable
+    if request.param == 'memory':
+        yield MemoryBackend()
+        return
+    if request.param == 'sqlite':
+        backend = SQLiteBackend(tmp_path / 'contract.db')
+        yield backend
+        await backend.aclose()
+        return
+    if redis_unreachable:
+        pytest.skip(f'Redis is not reachable at {settings.redis_host}:{settings.redis_port}')
+
+    client = Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+        encoding_errors=ENCODING_ERRORS,
+    )
+    try:
+        await client.ping()
+    except (RedisConnectionError, OSError):
+        await client.aclose()
+        redis_unreachable = True
+        pytest.skip(f'Redis is not reachable at {settings.redis_host}:{settings.redis_port}')
+    backend = RedisBackend(client, KEY_LAYOUTS[request.param.removeprefix('redis-')])
+
+    yield backend
+
+    # Deleting through the backend also releases what the layout keeps besides the record
+    cursor = 0
+    while True:
+        cursor, records = await backend.scan(cursor, 1000)
+        for phone_number, _ in records:
+            if phone_number.startswith(CONTRACT_KEY_PREFIX):
+                await backend.delete(phone_number)
+        if cursor == 0:
+            break
+    await client.aclose()
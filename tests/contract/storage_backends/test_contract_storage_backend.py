@@ -0,0 +1,145 @@
+import pytest
+
+from services.phonebook_service import address_version
+from services.storage_backend import SetCondition, StoredWrite
+from services.storage_codec import StorageCodec, format_address
+
+# Must start with CONTRACT_KEY_PREFIX from conftest.py, so the Redis variants clean them up
+PHONE = '+9991000001'
+OTHER_PHONE = '+9991000002'
+MISSING_PHONE = '+9991000009'
+VALUE = '{"street":"1 Main Street"}'
+NEW_VALUE = '{"street":"2 High Street"}'
+# A binary-format value that is not valid UTF-8
+BINARY_VALUE = b'\x02\xff\x00binary'
+
+
+def _stored(value):
+    """Return a stored value as bytes, whichever type the backend returns."""
+    return value.encode('utf-8', 'surrogateescape') if isinstance(value, str) else value
+
+
+@pytest.mark.asyncio
+async def test_set_get_and_delete(backend):
+    """Contract test for storage backends - records round-trip and deletes report whether they applied."""
+    assert await backend.get(PHONE) is None
+    assert await backend.set(PHONE, VALUE) is True
+    assert _stored(await backend.get(PHONE)) == VALUE.encode()
+
+    assert await backend.set(PHONE, BINARY_VALUE) is False
+    assert _stored(await backend.get(PHONE)) == BINARY_VALUE
+
+    assert await backend.delete(PHONE) is True
+    assert await backend.delete(PHONE) is False
+    assert await backend.get(PHONE) is None
+
+
+@pytest.mark.asyncio
+async def test_binary_format_values_round_trip(backend):
+    """Contract test for storage backends - STORAGE_FORMAT=binary values survive being read and written back."""
+    codec = StorageCodec(storage_format='binary')
+    # A field of 128 bytes or more has a length prefix that is not valid UTF-8
+    address = {
+        'street': '1 ' + 'Long ' * 30 + 'Street',
+        'city': 'Anytown',
+        'state_province': 'NY',
+        'postal_code': '12345',
+        'country': 'US',
+    }
+    address['formatted_address'] = format_address(address)
+    assert await backend.set(PHONE, codec.encode(address)) is True
+
+    # Copies and migrations write back values as the backend returned them
+    assert await backend.set(OTHER_PHONE, await backend.get(PHONE)) is True
+
+    assert _stored(await backend.get(OTHER_PHONE)) == codec.encode(address)
+    assert codec.decode(await backend.get(OTHER_PHONE)) == address
+
+
+@pytest.mark.asyncio
+async def test_conditional_set(backend):
+    """Contract test for storage backends - create only when missing, update only when present."""
+    assert await backend.set(PHONE, VALUE, SetCondition.IF_EXISTS) is False
+    assert await backend.get(PHONE) is None
+
+    assert await backend.set(PHONE, VALUE, SetCondition.IF_MISSING) is True
+    assert await backend.set(PHONE, NEW_VALUE, SetCondition.IF_MISSING) is False
+    assert _stored(await backend.get(PHONE)) == VALUE.encode()
+
+    assert await backend.set(PHONE, NEW_VALUE, SetCondition.IF_EXISTS) is True
+    assert _stored(await backend.get(PHONE)) == NEW_VALUE.encode()
+
+
+@pytest.mark.asyncio
+async def test_mget_keeps_order(backend):
+    """Contract test for storage backends - MGET returns one value per number, None for missing ones."""
+    await backend.set(PHONE, VALUE)
+    await backend.set(OTHER_PHONE, NEW_VALUE)
+
+    values = await backend.mget([OTHER_PHONE, MISSING_PHONE, PHONE])
+
+    assert [None if value is None else _stored(value) for value in values] == [
+        NEW_VALUE.encode(),
+        None,
+        VALUE.encode(),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set(backend):
+    """Contract test for storage backends - writes conditional on the version, the SHA1 of the stored value."""
+    assert await backend.compare_and_set(PHONE, '0' * 40, NEW_VALUE) == 0
+
+    await backend.set(PHONE, BINARY_VALUE)
+    version = address_version(await backend.get(PHONE))
+    assert version == address_version(BINARY_VALUE)
+
+    assert await backend.compare_and_set(PHONE, '0' * 40, NEW_VALUE) == -1
+    assert await backend.compare_and_set(PHONE, version, NEW_VALUE) == 1
+    assert _stored(await backend.get(PHONE)) == NEW_VALUE.encode()
+
+    assert await backend.compare_and_set(PHONE, version, None) == -1
+    assert await backend.compare_and_set(PHONE, address_version(NEW_VALUE), None) == 1
+    assert await backend.get(PHONE) is None
+
+
+@pytest.mark.asyncio
+async def test_write_many_applies_in_order(backend):
+    """Contract test for storage backends - batched writes keep their order and per-write semantics."""
+    await backend.prepare_batch()
+    results = await backend.write_many(
+        [
+            StoredWrite(PHONE, VALUE, SetCondition.IF_MISSING),
+            StoredWrite(PHONE, NEW_VALUE, SetCondition.IF_MISSING),
+            StoredWrite(PHONE, NEW_VALUE, SetCondition.IF_EXISTS),
+            StoredWrite(OTHER_PHONE, VALUE, SetCondition.IF_EXISTS),
+            StoredWrite(OTHER_PHONE, VALUE),
+            StoredWrite(OTHER_PHONE, NEW_VALUE),
+            StoredWrite(OTHER_PHONE, None),
+            StoredWrite(MISSING_PHONE, None),
+        ]
+    )
+
+    assert results == [True, False, True, False, True, False, True, False]
+    assert _stored(await backend.get(PHONE)) == NEW_VALUE.encode()
+    assert await backend.get(OTHER_PHONE) is None
+
+
+@pytest.mark.asyncio
+async def test_scan_returns_every_record(backend):
+    """Contract test for storage backends - a walk in small steps returns each record present throughout."""
+    phone_numbers = [f'+99920000{index:02d}' for index in range(25)]
+    for phone_number in phone_numbers:
+        await backend.set(phone_number, VALUE)
+
+    found = {}
+    cursor = 0
+    while True:
+        cursor, records = await backend.scan(cursor, 4)
+        for phone_number, value in records:
+            if phone_number.startswith('+9992') and value is not None:
+                found[phone_number] = _stored(value)
+        if cursor == 0:
+            break
+
+    assert found == dict.fromkeys(phone_numbers, VALUE.encode())
@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_integration_single_pipeline():
+    """Integration test for bulk writes - all operations are sent in one pipeline."""
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis = MagicMock()
+        mock_dep.return_value = mock_redis
+        mock_pipe = MagicMock()
+        mock_pipe.execute = AsyncMock(return_value=[True, None, 0])
+        mock_redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=mock_pipe)
+        mock_redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        address = {
+            'street': '123 Main St',
+            'city': 'Anytown',
+            'state_province': 'NY',
+            'postal_code': '12345',
+            'country': 'US',
+        }
+        test_payload = {
+            'operations': [
+                {'op': 'create', 'phone': '+1234567890', 'address': address},
+                {'op': 'update', 'phone': '+1234567891', 'address': address},
+                {'op': 'delete', 'phone': '+1234567892'},
+                {'op': 'delete', 'phone': 'invalid_phone'},
+            ]
+        }
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post('/addresses/bulk', json=test_payload)
+
+        assert response.status_code == 200
+        statuses = [item['status'] for item in response.json()['results']]
+        assert statuses == ['created', 'not_found', 'not_found', 'invalid']
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        mock_pipe.execute.assert_awaited_once()
+        assert mock_pipe.set.call_count == 2
+        mock_pipe.delete.assert_called_once_with('+1234567892')
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_integration_empty_batch():
+    """Integration test for bulk writes - an empty batch is a validation error."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.post('/addresses/bulk', json={'operations': []})
+
+    assert response.status_code == 422
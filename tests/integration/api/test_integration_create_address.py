@@ -4,6 +4,7 @@ import pytest
 from httpx import ASGITransport, AsyncClient
 
 from main import app
+from services.snapshot_backend import SnapshotBackend, write_snapshot
 
 
 @pytest.mark.asyncio
@@ -42,6 +43,7 @@ async def test_create_address_integration_conflict():
         mock_redis = AsyncMock()
         mock_dep.return_value = mock_redis
         mock_redis.get = AsyncMock(return_value='{"street": "Old St", "city": "Oldtown", "state_province": "OLD", "postal_code": "OLD00", "country": "US", "formatted_address": "Old St, Oldtown, OLD OLD00, US"}')
+        mock_redis.set = AsyncMock(return_value=None)  # SET NX skipped the write
 
         test_payload = {
             "address": {
@@ -103,3 +105,19 @@ async def test_create_address_integration_invalid_address():
             response = await client.post("/address/+1234567890", json=test_payload)
 
         assert response.status_code == 422  # Validation error
+
+
+@pytest.mark.asyncio
+async def test_create_address_integration_read_only_storage(tmp_path):
+    """Integration test for creating a record - a read-only snapshot server answers 405."""
+    path = tmp_path / "phonebook.snapshot"
+    write_snapshot(path, [])
+    payload = {
+        "address": {"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US"}
+    }
+    with patch("api.dependencies.snapshot_backend", SnapshotBackend(path)):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/address/+1234567890", json=payload)
+
+    assert response.status_code == 405
+    assert response.json() == {"detail": "Records are read-only on this server"}
@@ -28,6 +28,7 @@ async def test_delete_address_integration_not_found():
         mock_redis = AsyncMock()
         mock_dep.return_value = mock_redis
         mock_redis.get = AsyncMock(return_value=None)
+        mock_redis.delete = AsyncMock(return_value=0)  # No key removed
 
         async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
             response = await client.delete("/address/+1234567890")
@@ -0,0 +1,68 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from api.v1.routes.export_addresses import decode_cursor, encode_cursor
+from main import app
+
+STORED = '{"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US", "formatted_address": "123 Main St, Anytown, NY 12345, US"}'
+
+
+@pytest.mark.asyncio
+async def test_export_addresses_integration_stream():
+    """Integration test for export - records, resume cursors and end marker are streamed."""
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis = AsyncMock()
+        mock_dep.return_value = mock_redis
+        mock_redis.scan = AsyncMock(side_effect=[(42, ['+1234567890']), (0, ['+1234567891'])])
+        mock_redis.mget = AsyncMock(side_effect=[[STORED], [STORED]])
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.get('/addresses/export?batch_size=50')
+
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]['phone'] == '+1234567890'
+        assert lines[0]['address']['street'] == '123 Main St'
+        assert lines[1] == {'type': 'cursor', 'cursor': encode_cursor(42)}
+        assert lines[2]['phone'] == '+1234567891'
+        assert lines[3] == {'type': 'end'}
+        assert mock_redis.scan.call_args.kwargs == {'count': 50}
+
+
+@pytest.mark.asyncio
+async def test_export_addresses_integration_resume_gzip():
+    """Integration test for export - resuming from a cursor with gzip encoding."""
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis = AsyncMock()
+        mock_dep.return_value = mock_redis
+        mock_redis.scan = AsyncMock(return_value=(0, ['+1234567891']))
+        mock_redis.mget = AsyncMock(return_value=[STORED])
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.get(f'/addresses/export?cursor={encode_cursor(42)}&gzip=true')
+
+        assert response.status_code == 200
+        assert response.headers['content-encoding'] == 'gzip'
+        # httpx transparently decodes the gzip content encoding
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]['phone'] == '+1234567891'
+        assert lines[-1] == {'type': 'end'}
+        assert mock_redis.scan.call_args.args == (42,)
+
+
+@pytest.mark.asyncio
+async def test_export_addresses_integration_invalid_cursor():
+    """Integration test for export - an invalid cursor token is rejected."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.get('/addresses/export?cursor=not-a-cursor')
+
+    assert response.status_code == 422
+
+
+def test_cursor_round_trip():
+    """Test that resume tokens decode to the SCAN cursor they were made from."""
+    assert decode_cursor(encode_cursor(123456)) == 123456
+    assert decode_cursor('!!!') is None
@@ -1,3 +1,4 @@
+import hashlib
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -54,3 +55,23 @@ async def test_get_address_integration_invalid_phone_format():
     # For now, assume it returns a validation error
     assert response.status_code == 422
     # This test might need to be adjusted based on actual endpoint implementation
+
+
+@pytest.mark.asyncio
+async def test_get_address_integration_not_modified():
+    """Integration test for conditional lookups - the ETag is the SHA1 of the stored value."""
+    stored = '{"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US"}'
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis = AsyncMock()
+        mock_dep.return_value = mock_redis
+        mock_redis.get = AsyncMock(return_value=stored)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/address/+1234567890")
+            etag = response.headers["etag"]
+            not_modified = await client.get("/address/+1234567890", headers={"If-None-Match": etag})
+
+        assert etag == f'"{hashlib.sha1(stored.encode()).hexdigest()}"'
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
@@ -0,0 +1,42 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_integration_single_mget():
+    """Integration test for batch lookup - all numbers are fetched with one MGET."""
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis = AsyncMock()
+        mock_dep.return_value = mock_redis
+        mock_redis.mget = AsyncMock(
+            return_value=[
+                '{"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US", "formatted_address": "123 Main St, Anytown, NY 12345, US"}',
+                None,
+            ]
+        )
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post(
+                '/addresses/lookup',
+                json={'phone_numbers': ['+1234567890', '+442079460000', 'not-a-phone']},
+            )
+
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [item['status'] for item in results] == ['found', 'not_found', 'invalid']
+        assert results[0]['address']['street'] == '123 Main St'
+        mock_redis.mget.assert_called_once_with(['+1234567890', '+442079460000'])
+        mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_integration_empty_batch():
+    """Integration test for batch lookup - an empty batch is a validation error."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.post('/addresses/lookup', json={'phone_numbers': []})
+
+    assert response.status_code == 422
@@ -0,0 +1,123 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from redis.exceptions import RedisError
+
+from main import app
+from services.snapshot_backend import SnapshotBackend, write_snapshot
+
+ADDRESS = {'street': '123 Main St', 'city': 'Anytown', 'state_province': 'NY', 'postal_code': '12345', 'country': 'US'}
+
+
+def _mock_pipeline_redis(results_per_pipeline: list[list]):
+    mock_redis = MagicMock()
+    pipes = []
+    contexts = []
+    for results in results_per_pipeline:
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=results)
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=pipe)
+        context.__aexit__ = AsyncMock(return_value=False)
+        pipes.append(pipe)
+        contexts.append(context)
+    mock_redis.pipeline.side_effect = contexts
+    return mock_redis, pipes
+
+
+async def _body(lines: list[str]):
+    # Split each line in two so records cross request body chunk boundaries
+    for line in lines:
+        yield line[:5].encode()
+        yield line[5:].encode()
+
+
+@pytest.mark.asyncio
+async def test_import_addresses_integration_chunks_and_progress():
+    """Integration test for NDJSON import - fixed-size pipelined chunks with streamed progress."""
+    with (
+        patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep,
+        patch('api.v1.routes.import_addresses.settings.import_chunk_size', 2),
+    ):
+        mock_redis, pipes = _mock_pipeline_redis([[None, None], ['{"street": "Old St"}']])
+        mock_dep.return_value = mock_redis
+        lines = [json.dumps({'phone': f'+155500000{i}', 'address': ADDRESS}) + '\n' for i in range(3)]
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post('/addresses/import', content=_body(lines))
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        output = [json.loads(line) for line in response.text.splitlines()]
+        assert output == [
+            {'type': 'progress', 'lines': 2, 'created': 2},
+            {'type': 'progress', 'lines': 3, 'created': 2, 'updated': 1},
+            {'type': 'summary', 'lines': 3, 'created': 2, 'updated': 1},
+        ]
+        # Upsert mode writes with SET ... GET to tell creates from updates
+        assert pipes[0].set.call_args.kwargs == {'get': True}
+
+
+@pytest.mark.asyncio
+async def test_import_addresses_integration_reports_storage_failure():
+    """Integration test for NDJSON import - a storage error ends the stream with an aborted line."""
+    with (
+        patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep,
+        patch('api.v1.routes.import_addresses.settings.import_chunk_size', 2),
+    ):
+        mock_redis, pipes = _mock_pipeline_redis([[None, None], []])
+        pipes[1].execute.side_effect = RedisError('Connection lost')
+        mock_dep.return_value = mock_redis
+        lines = [json.dumps({'phone': f'+155500000{i}', 'address': ADDRESS}) + '\n' for i in range(4)]
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post('/addresses/import', content=_body(lines))
+
+        assert response.status_code == 200
+        output = [json.loads(line) for line in response.text.splitlines()]
+        assert output == [
+            {'type': 'progress', 'lines': 2, 'created': 2},
+            {'type': 'aborted', 'error': 'Import stopped: Connection lost', 'lines': 4, 'created': 2},
+        ]
+
+
+@pytest.mark.asyncio
+async def test_import_addresses_integration_reports_rejected_lines():
+    """Integration test for NDJSON import - invalid lines and conflicts are reported by line number."""
+    with patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock) as mock_dep:
+        mock_redis, pipes = _mock_pipeline_redis([[None]])
+        mock_dep.return_value = mock_redis
+        lines = [
+            'not json\n',
+            '\n',
+            json.dumps({'phone': 'invalid_phone', 'address': ADDRESS}) + '\n',
+            json.dumps({'phone': '+1234567890', 'address': {**ADDRESS, 'street': 'A'}}) + '\n',
+            json.dumps({'phone': '+1234567890', 'address': ADDRESS}),
+        ]
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post('/addresses/import?mode=create', content=_body(lines))
+
+        assert response.status_code == 200
+        output = [json.loads(line) for line in response.text.splitlines()]
+        errors = [(item['line'], item['status']) for item in output if item['type'] == 'error']
+        assert errors == [(1, 'invalid'), (3, 'invalid'), (4, 'invalid'), (5, 'conflict')]
+        assert output[-1] == {'type': 'summary', 'lines': 4, 'invalid': 3, 'conflict': 1}
+        assert pipes[0].set.call_args.kwargs == {'nx': True}
+
+
+@pytest.mark.asyncio
+async def test_import_addresses_integration_read_only_storage(tmp_path):
+    """Integration test for import - a read-only snapshot server rejects it before streaming."""
+    path = tmp_path / 'phonebook.snapshot'
+    write_snapshot(path, [])
+    with patch('api.dependencies.snapshot_backend', SnapshotBackend(path)):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.post(
+                '/addresses/import', content=json.dumps({'phone': '+1234567890', 'address': ADDRESS})
+            )
+
+    assert response.status_code == 405
+    assert response.json() == {'detail': 'Records are read-only on this server'}
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from main import app
+from services.address_cache import AddressCache
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_address_cache():
+    """Integration test for metrics - address cache counters are exposed."""
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set('+1234567890', {'street': '123 Main St'})
+    cache.get('+1234567890')
+    cache.get('+1234567891')
+
+    with patch('api.dependencies.address_cache', cache):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.get('/metrics')
+
+    assert response.status_code == 200
+    stats = response.json()['address_cache']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_without_cache():
+    """Integration test for metrics - cache section is null when caching is disabled."""
+    with patch('api.dependencies.address_cache', None), patch('api.dependencies.settings.address_cache_size', 0):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+            response = await client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.json()['address_cache'] is None
+    assert response.json()['negative_lookup_filter'] is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_redis_pool():
+    """Integration test for metrics - connection pool usage is exposed per pool."""
+    client = Redis.from_pool(BlockingConnectionPool(host='redis', port=6379, max_connections=20))
+    with patch('api.dependencies.redis_pool', client), patch('api.dependencies.replica_router', None):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as http_client:
+            response = await http_client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.json()['redis_pool'] == {
+        'redis:6379': {'in_use': 0, 'idle': 0, 'max_connections': 20, 'saturation': 0.0}
+    }
@@ -4,6 +4,7 @@ import pytest
 from httpx import ASGITransport, AsyncClient
 
 from main import app
+from services.replica_routing import READ_YOUR_WRITES_COOKIE, ReplicaRouter
 
 
 @pytest.mark.asyncio
@@ -42,6 +43,7 @@ async def test_update_address_integration_not_found():
         mock_redis = AsyncMock()
         mock_dep.return_value = mock_redis
         mock_redis.get = AsyncMock(return_value=None)  # Phone doesn't exist
+        mock_redis.set = AsyncMock(return_value=None)  # SET XX skipped the write
 
         test_payload = {
             "address": {
@@ -103,3 +105,73 @@ async def test_update_address_integration_invalid_address():
             response = await client.put("/address/+1234567890", json=test_payload)
 
         assert response.status_code == 422  # Validation error
+
+
+@pytest.mark.asyncio
+async def test_update_address_integration_if_match():
+    """Integration test for conditional updates and deletes - a stale If-Match is 412."""
+    test_payload = {
+        "address": {
+            "street": "123 New St",
+            "city": "Newtown",
+            "state_province": "NW",
+            "postal_code": "NEW00",
+            "country": "US"
+        }
+    }
+    with (
+        patch('api.dependencies.memory_backend', None),
+        patch('api.dependencies.settings.storage_backend', 'memory'),
+    ):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.post("/address/+1234567890", json=test_payload)
+            etag = (await client.get("/address/+1234567890")).headers["etag"]
+
+            test_payload["address"]["street"] = "456 Newer St"
+            updated = await client.put("/address/+1234567890", json=test_payload, headers={"If-Match": etag})
+            stale = await client.put("/address/+1234567890", json=test_payload, headers={"If-Match": etag})
+            stale_list = await client.put("/address/+1234567890", json=test_payload, headers={"If-Match": f'"0", {etag}'})
+            stale_delete = await client.delete("/address/+1234567890", headers={"If-Match": etag})
+            current = (await client.get("/address/+1234567890")).headers["etag"]
+            deleted = await client.delete("/address/+1234567890", headers={"If-Match": f"{etag}, {current}"})
+            missing = await client.put("/address/+1234567890", json=test_payload, headers={"If-Match": "*"})
+            missing_delete = await client.delete("/address/+1234567890", headers={"If-Match": "*"})
+
+        assert updated.status_code == 200
+        assert stale.status_code == 412
+        assert stale_list.status_code == 412
+        assert stale_delete.status_code == 412
+        assert current != etag
+        assert deleted.status_code == 200
+        assert missing.status_code == 412
+        assert missing_delete.status_code == 412
+
+
+@pytest.mark.asyncio
+async def test_update_address_integration_fire_and_forget_pins_reads():
+    """Integration test for a fire-and-forget update - the 202 sets the read-your-writes cookie."""
+    primary = AsyncMock()
+    primary.set.return_value = True
+    router = ReplicaRouter(primary, [AsyncMock()], read_your_writes_window=5.0)
+    with (
+        patch('api.dependencies.redis_client_dependency', new_callable=AsyncMock, return_value=primary),
+        patch('api.dependencies.redis_pool', primary),
+        patch('api.dependencies.replica_router', router),
+        patch('api.dependencies.settings.redis_replicas', 'r:6379'),
+    ):
+        test_payload = {
+            "address": {
+                "street": "123 New St",
+                "city": "Newtown",
+                "state_province": "NW",
+                "postal_code": "NEW00",
+                "country": "US"
+            }
+        }
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.put("/address/+1234567890?durability=fire-and-forget", json=test_payload)
+
+        assert response.status_code == 202
+        assert response.json()["phone"] == "+1234567890"
+        assert READ_YOUR_WRITES_COOKIE in response.headers["set-cookie"]
@@ -0,0 +1,35 @@
+"""Shared fixtures for benchmarks that need a running Redis server."""
+
+import pytest
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from config.settings import settings
+from services.storage_codec import ENCODING_ERRORS
+
+# Benchmarks write throwaway keys under this prefix; they are removed after each test
+BENCHMARK_KEY_PREFIX = '+999'
+
+
+@pytest.fixture
+async def local_redis():
+    """Return a client for the configured Redis server, skipping if it is not reachable."""
+    client = Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+        encoding_errors=ENCODING_ERRORS,
+    )
+    try:
+        await client.ping()
+    except (RedisConnectionError, OSError):
+        await client.aclose()
+        pytest.skip(f'Redis is not reachable at {settings.redis_host}:{settings.redis_port}')
+
+    yield client
+
+    keys = [key async for key in client.scan_iter(match=f'{BENCHMARK_KEY_PREFIX}*', count=1000)]
+    if keys:
+        await client.delete(*keys)
+    await client.aclose()
@@ -0,0 +1,42 @@
+"""Benchmark: single-number lookups per second with and without cross-request read batching."""
+
+import asyncio
+import json
+import time
+
+from conftest import BENCHMARK_KEY_PREFIX
+
+from services.phonebook_service import PhoneBookService
+from services.read_batcher import ReadBatcher
+
+NUM_RECORDS = 2000
+CONCURRENCY = 200
+
+
+async def _lookups_per_second(service: PhoneBookService, phones: list[str]) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(phone_number: str):
+        async with semaphore:
+            return await service.get_address(phone_number)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded(phone) for phone in phones))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return len(phones) / elapsed
+
+
+async def test_get_address_lookups_per_second(local_redis):
+    """Compare concurrent lookup throughput of one GET per call against batched MGETs."""
+    phones = [f'{BENCHMARK_KEY_PREFIX}4{i:07d}' for i in range(NUM_RECORDS)]
+    await local_redis.mset({phone: json.dumps({'street': '123 Main St'}) for phone in phones})
+
+    direct_rate = await _lookups_per_second(PhoneBookService(local_redis), phones)
+    batcher = ReadBatcher()
+    batched_rate = await _lookups_per_second(PhoneBookService(local_redis, read_batcher=batcher), phones)
+
+    print(f'GET per lookup:   {direct_rate:.0f} lookups/s')
+    print(f'Batched MGET:     {batched_rate:.0f} lookups/s ({batched_rate / direct_rate:.2f}x)')
+    print(f'Batch sizes:      {batcher.stats()["batch_size_histogram"]}')
+    assert batched_rate > direct_rate
@@ -0,0 +1,93 @@
+"""Benchmark: the SQLite backend against Redis for single lookups, batch lookups and bulk import."""
+
+import asyncio
+import time
+
+import pytest
+from conftest import BENCHMARK_KEY_PREFIX
+
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation
+from services.sqlite_backend import SQLiteBackend
+
+NUM_RECORDS = 5000
+NUM_LOOKUPS = 5000
+CONCURRENCY = 50
+LOOKUP_BATCH_SIZE = 100
+IMPORT_CHUNK_SIZE = 1000
+
+ADDRESS = {
+    'street': '123 Main St',
+    'city': 'Anytown',
+    'state_province': 'NY',
+    'postal_code': '12345',
+    'country': 'US',
+    'formatted_address': '123 Main St, Anytown, NY 12345, US',
+}
+
+PHONES = [f'{BENCHMARK_KEY_PREFIX}{i:07d}' for i in range(NUM_RECORDS)]
+
+
+@pytest.fixture
+async def services(local_redis, tmp_path):
+    """Return services over Redis and over an SQLite file, keyed by backend name."""
+    sqlite_backend = SQLiteBackend(tmp_path / 'benchmark.db')
+    yield {
+        'redis': PhoneBookService(local_redis),
+        'sqlite': PhoneBookService(None, storage=sqlite_backend),
+    }
+    await sqlite_backend.aclose()
+
+
+async def _import(service: PhoneBookService) -> float:
+    """Upsert every record in bulk chunks and return records per second."""
+    operations = [WriteOperation(WriteOp.UPSERT, phone, ADDRESS) for phone in PHONES]
+    start = time.perf_counter()
+    for i in range(0, len(operations), IMPORT_CHUNK_SIZE):
+        await service.bulk_write(operations[i : i + IMPORT_CHUNK_SIZE], chunk_size=IMPORT_CHUNK_SIZE)
+    return len(operations) / (time.perf_counter() - start)
+
+
+async def _lookups_per_second(lookup, count: int) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(i: int):
+        async with semaphore:
+            return await lookup(i)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return count / elapsed
+
+
+async def test_bulk_import_records_per_second(services):
+    """Compare bulk import throughput: pipelined Redis writes against one SQLite transaction per chunk."""
+    for name, service in services.items():
+        print(f'{name:>6} bulk import: {await _import(service):.0f} records/s')
+
+
+async def test_single_lookups_per_second(services):
+    """Compare concurrent single-number lookups: Redis round trips against SQLite reads in the thread pool."""
+    for name, service in services.items():
+        await _import(service)
+        rate = await _lookups_per_second(
+            lambda i, service=service: service.get_address(PHONES[i % NUM_RECORDS]), NUM_LOOKUPS
+        )
+        print(f'{name:>6} single lookups: {rate:.0f} lookups/s')
+
+
+async def test_batch_lookups_per_second(services):
+    """Compare batch lookups: MGET against one SQLite read transaction per batch."""
+    batches = NUM_LOOKUPS // LOOKUP_BATCH_SIZE
+
+    for name, service in services.items():
+        await _import(service)
+
+        async def lookup(i: int, service=service) -> bool:
+            start = i * LOOKUP_BATCH_SIZE % NUM_RECORDS
+            addresses = await service.get_addresses(PHONES[start : start + LOOKUP_BATCH_SIZE])
+            return all(address is not None for address in addresses.values())
+
+        rate = await _lookups_per_second(lookup, batches) * LOOKUP_BATCH_SIZE
+        print(f'{name:>6} batch lookups: {rate:.0f} lookups/s')
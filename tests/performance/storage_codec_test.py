@@ -0,0 +1,67 @@
+"""Benchmark: bytes per record and encode/decode cost of each storage codec."""
+
+import importlib.util
+import time
+
+from conftest import BENCHMARK_KEY_PREFIX
+
+from services.storage_codec import StorageCodec
+
+NUM_RECORDS = 2000
+CITIES = [('Anytown', 'NY'), ('Springfield', 'IL'), ('Riverside', 'CA'), ('Franklin', 'TN')]
+
+
+def _addresses() -> list[dict]:
+    addresses = []
+    for i in range(NUM_RECORDS):
+        city, state = CITIES[i % len(CITIES)]
+        address = {
+            'street': f'{100 + i} Main St',
+            'city': city,
+            'state_province': state,
+            'postal_code': f'{10000 + i:05d}',
+            'country': 'US',
+        }
+        address['formatted_address'] = f'{address["street"]}, {city}, {state} {address["postal_code"]}, US'
+        addresses.append(address)
+    return addresses
+
+
+def _codecs(addresses: list[dict]) -> dict[str, StorageCodec]:
+    codecs = {'json': StorageCodec(), 'binary': StorageCodec(storage_format='binary')}
+    if importlib.util.find_spec('compression') is not None:
+        from compression import zstd
+
+        codecs['binary+zstd'] = StorageCodec(storage_format='binary', compression='zstd')
+        samples = [codecs['binary'].serialize(address)[1] for address in addresses]
+        dictionary = zstd.train_dict(samples, 4096).dict_content
+        codecs['binary+zstd+dict'] = StorageCodec(storage_format='binary', compression='zstd', dictionary=dictionary)
+    return codecs
+
+
+def test_codec_encode_decode_cost():
+    """Measure value size and per-record encode and decode time without Redis."""
+    addresses = _addresses()
+    for name, codec in _codecs(addresses).items():
+        start = time.perf_counter()
+        values = [codec.encode(address) for address in addresses]
+        encode_us = (time.perf_counter() - start) / NUM_RECORDS * 1e6
+
+        start = time.perf_counter()
+        decoded = [codec.decode(value) for value in values]
+        decode_us = (time.perf_counter() - start) / NUM_RECORDS * 1e6
+
+        assert decoded == addresses
+        size = sum(len(value.encode() if isinstance(value, str) else value) for value in values) / NUM_RECORDS
+        print(f'{name:18} {size:6.1f} bytes/value  encode {encode_us:5.2f} us  decode {decode_us:5.2f} us')
+
+
+async def test_codec_bytes_per_record_in_redis(local_redis):
+    """Measure MEMORY USAGE per record for each codec."""
+    addresses = _addresses()
+    for index, (name, codec) in enumerate(_codecs(addresses).items()):
+        phones = [f'{BENCHMARK_KEY_PREFIX}5{index}{i:06d}' for i in range(NUM_RECORDS)]
+        await local_redis.mset({phone: codec.encode(address) for phone, address in zip(phones, addresses, strict=True)})
+
+        usage = [await local_redis.memory_usage(phone) for phone in phones]
+        print(f'{name:18} {sum(usage) / NUM_RECORDS:6.1f} bytes/record in Redis')
@@ -0,0 +1,88 @@
+"""Benchmark: writes per second of the atomic write path against a local Redis."""
+
+import asyncio
+import json
+import time
+
+from conftest import BENCHMARK_KEY_PREFIX
+
+from services.phonebook_service import PhoneBookService, WriteStatus
+
+NUM_WRITES = 2000
+CONCURRENCY = 50
+
+ADDRESS = {
+    'street': '123 Main St',
+    'city': 'Anytown',
+    'state_province': 'NY',
+    'postal_code': '12345',
+    'country': 'US',
+    'formatted_address': '123 Main St, Anytown, NY 12345, US',
+}
+
+
+async def _legacy_create(redis_client, phone_number: str) -> bool:
+    """Previous create path: GET for the existence check, then SET (two round trips)."""
+    if await redis_client.get(phone_number) is not None:
+        return False
+    await redis_client.set(phone_number, json.dumps(ADDRESS))
+    return True
+
+
+async def _run(write, phones: list[str]) -> float:
+    """Run ``write`` for every phone with bounded concurrency and return writes per second."""
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(phone_number: str):
+        async with semaphore:
+            return await write(phone_number)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded(phone) for phone in phones))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return len(phones) / elapsed
+
+
+async def test_create_writes_per_second(local_redis):
+    """Compare create throughput of GET+SET against the single SET NX round trip."""
+    service = PhoneBookService(local_redis)
+    legacy_phones = [f'{BENCHMARK_KEY_PREFIX}1{i:07d}' for i in range(NUM_WRITES)]
+    atomic_phones = [f'{BENCHMARK_KEY_PREFIX}2{i:07d}' for i in range(NUM_WRITES)]
+
+    legacy_rate = await _run(lambda phone: _legacy_create(local_redis, phone), legacy_phones)
+
+    async def atomic_create(phone_number: str) -> bool:
+        return await service.create_address(phone_number, ADDRESS) is WriteStatus.CREATED
+
+    atomic_rate = await _run(atomic_create, atomic_phones)
+
+    print(f'GET+SET create: {legacy_rate:.0f} writes/s')
+    print(f'SET NX create:  {atomic_rate:.0f} writes/s ({atomic_rate / legacy_rate:.2f}x)')
+    assert atomic_rate > legacy_rate
+
+
+async def test_update_and_delete_writes_per_second(local_redis):
+    """Measure throughput of single round trip updates, CAS updates and deletes."""
+    service = PhoneBookService(local_redis)
+    phones = [f'{BENCHMARK_KEY_PREFIX}3{i:07d}' for i in range(NUM_WRITES)]
+    for phone in phones:
+        await service.create_address(phone, ADDRESS)
+
+    async def update(phone_number: str) -> bool:
+        return await service.update_address(phone_number, ADDRESS) is WriteStatus.UPDATED
+
+    async def cas_update(phone_number: str) -> bool:
+        _, version = await service.get_versioned_address(phone_number)
+        return await service.update_address(phone_number, ADDRESS, expected_version=version) is WriteStatus.UPDATED
+
+    async def delete(phone_number: str) -> bool:
+        return await service.delete_address(phone_number) is WriteStatus.DELETED
+
+    update_rate = await _run(update, phones)
+    cas_rate = await _run(cas_update, phones)
+    delete_rate = await _run(delete, phones)
+
+    print(f'SET XX update:       {update_rate:.0f} writes/s')
+    print(f'GET + CAS update:    {cas_rate:.0f} writes/s')
+    print(f'DEL delete:          {delete_rate:.0f} writes/s')
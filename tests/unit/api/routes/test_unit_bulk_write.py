@@ -0,0 +1,94 @@
+"""Unit tests for the bulk_write route function."""
+
+from unittest import mock
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from api.v1.routes.bulk_write import bulk_write
+from models.api_models import BulkWriteRequest
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+
+ADDRESS = {'street': '123 Main St', 'city': 'Anytown', 'state_province': 'NY', 'postal_code': '12345', 'country': 'US'}
+FORMATTED_ADDRESS = {**ADDRESS, 'formatted_address': '123 Main St, Anytown, NY 12345, US'}
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_mixed_operations():
+    """Test that valid operations go to the service and statuses come back in request order."""
+    # Arrange
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.bulk_write = AsyncMock(return_value=[WriteStatus.CREATED, WriteStatus.NOT_FOUND, WriteStatus.DELETED])
+    request_data = BulkWriteRequest(
+        operations=[
+            {'op': 'create', 'phone': '+1234567890', 'address': ADDRESS},
+            {'op': 'update', 'phone': '89123456789', 'address': ADDRESS},
+            {'op': 'delete', 'phone': '+442079460000'},
+        ]
+    )
+
+    # Act
+    result = await bulk_write(request_data, mock_service)
+
+    # Assert
+    assert result == {
+        'results': [
+            {'phone': '+1234567890', 'op': 'create', 'status': 'created'},
+            {'phone': '+79123456789', 'op': 'update', 'status': 'not_found'},
+            {'phone': '+442079460000', 'op': 'delete', 'status': 'deleted'},
+        ]
+    }
+    assert mock_service.bulk_write.call_args.args[0] == [
+        WriteOperation(WriteOp.CREATE, '+1234567890', FORMATTED_ADDRESS),
+        WriteOperation(WriteOp.UPDATE, '+79123456789', FORMATTED_ADDRESS),
+        WriteOperation(WriteOp.DELETE, '+442079460000', None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_invalid_items():
+    """Test that invalid items are reported without rejecting the rest of the batch."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.bulk_write = AsyncMock(return_value=[WriteStatus.CONFLICT])
+    request_data = BulkWriteRequest(
+        operations=[
+            {'op': 'create', 'phone': '+1234567890', 'address': {**ADDRESS, 'street': 'A'}},
+            {'op': 'update', 'phone': '+1234567890'},
+            {'op': 'upsert', 'phone': '+1234567890', 'address': ADDRESS},
+            {'op': 'create', 'phone': 'not-a-phone', 'address': ADDRESS},
+            {'op': 'create', 'phone': '+1234567890', 'address': ADDRESS},
+        ]
+    )
+
+    result = await bulk_write(request_data, mock_service)
+
+    statuses = [item['status'] for item in result['results']]
+    assert statuses == ['invalid', 'invalid', 'invalid', 'invalid', 'conflict']
+    assert 'Invalid phone number format' in result['results'][3]['detail']
+    assert len(mock_service.bulk_write.call_args.args[0]) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_all_invalid_skips_service():
+    """Test that Redis is not touched when no operation is valid."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    request_data = BulkWriteRequest(operations=[{'op': 'delete', 'phone': 'abc'}])
+
+    result = await bulk_write(request_data, mock_service)
+
+    assert result['results'][0]['status'] == 'invalid'
+    mock_service.bulk_write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_batch_too_large():
+    """Test that batches above the configured maximum are rejected."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    request_data = BulkWriteRequest(operations=[{'op': 'delete', 'phone': '+1234567890'}] * 3)
+
+    with mock.patch('api.v1.routes.bulk_write.settings.batch_max_size', 2):
+        with pytest.raises(HTTPException) as exc_info:
+            await bulk_write(request_data, mock_service)
+
+    assert exc_info.value.status_code == 422
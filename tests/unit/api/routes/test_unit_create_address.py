@@ -4,12 +4,13 @@ from unittest import mock
 from unittest.mock import AsyncMock
 
 import pytest
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException, Response
 
 from api.v1.routes.create_address import create_address
 from models.address import Address
 from models.api_models import CreateAddressRequest
-from services.phonebook_service import PhoneBookService
+from services.durability import Durability, DurabilityLevel
+from services.phonebook_service import PhoneBookService, WriteStatus
 
 
 def _make_request(data: dict) -> CreateAddressRequest:
@@ -26,9 +27,8 @@ async def test_create_address_valid_request():
         "postal_code": "12345",
         "country": "US",
     }
-    mock_redis_client = AsyncMock()
-
     mock_service = AsyncMock(spec=PhoneBookService)
+
     expected_address_data = {
         "street": "123 Main St",
         "city": "Anytown",
@@ -37,11 +37,10 @@ async def test_create_address_valid_request():
         "country": "US",
         "formatted_address": "123 Main St, Anytown, NY 12345, US",
     }
-    mock_service.create_address = AsyncMock(return_value=True)
+    mock_service.create_address = AsyncMock(return_value=WriteStatus.CREATED)
 
-    with mock.patch("api.v1.routes.create_address.PhoneBookService", return_value=mock_service):
-        request_data = _make_request(address_data)
-        result = await create_address(phone_number, request_data, mock_redis_client)
+    request_data = _make_request(address_data)
+    result = await create_address(phone_number, request_data, mock_service)
 
     assert result == {"phone": phone_number, "address": expected_address_data}
     mock_service.create_address.assert_called_once_with(phone_number, expected_address_data)
@@ -57,14 +56,12 @@ async def test_create_address_conflict():
         "postal_code": "12345",
         "country": "US",
     }
-    mock_redis_client = AsyncMock()
     mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.create_address = AsyncMock(return_value=False)
+    mock_service.create_address = AsyncMock(return_value=WriteStatus.CONFLICT)
 
-    with mock.patch("api.v1.routes.create_address.PhoneBookService", return_value=mock_service):
-        with pytest.raises(HTTPException) as exc_info:
-            request_data = _make_request(address_data)
-            await create_address(phone_number, request_data, mock_redis_client)
+    with pytest.raises(HTTPException) as exc_info:
+        request_data = _make_request(address_data)
+        await create_address(phone_number, request_data, mock_service)
 
     assert exc_info.value.status_code == 409
     assert exc_info.value.detail == "Phone number already exists"
@@ -80,13 +77,13 @@ async def test_create_address_invalid_phone_format():
         "postal_code": "12345",
         "country": "US",
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     with mock.patch("api.v1.routes.create_address.validate_phone_format", return_value=False):
         with mock.patch("api.v1.routes.create_address.normalize_phone_number", return_value=None):
             with pytest.raises(HTTPException) as exc_info:
                 request_data = _make_request(address_data)
-                await create_address(phone_number, request_data, mock_redis_client)
+                await create_address(phone_number, request_data, mock_service)
 
     assert exc_info.value.status_code == 422
     assert "Invalid phone number format" in exc_info.value.detail
@@ -103,11 +100,10 @@ async def test_create_address_with_normalized_phone():
         "postal_code": "12345",
         "country": "US",
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     with mock.patch("api.v1.routes.create_address.validate_phone_format", side_effect=[False, True]):
         with mock.patch("api.v1.routes.create_address.normalize_phone_number", return_value=normalized_phone):
-            mock_service = AsyncMock(spec=PhoneBookService)
             expected_address_data = {
                 "street": "123 Main St",
                 "city": "Anytown",
@@ -116,11 +112,10 @@ async def test_create_address_with_normalized_phone():
                 "country": "US",
                 "formatted_address": "123 Main St, Anytown, NY 12345, US",
             }
-            mock_service.create_address = AsyncMock(return_value=True)
+            mock_service.create_address = AsyncMock(return_value=WriteStatus.CREATED)
 
-            with mock.patch("api.v1.routes.create_address.PhoneBookService", return_value=mock_service):
-                request_data = _make_request(address_data)
-                result = await create_address(original_phone, request_data, mock_redis_client)
+            request_data = _make_request(address_data)
+            result = await create_address(original_phone, request_data, mock_service)
 
     assert result == {"phone": normalized_phone, "address": expected_address_data}
     mock_service.create_address.assert_called_once_with(normalized_phone, expected_address_data)
@@ -136,12 +131,39 @@ async def test_create_address_invalid_address_data():
         "postal_code": "12345",
         "country": "US",
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
     request_data = _make_request(invalid_address_data)
 
     with pytest.raises(HTTPException) as exc_info:
         with mock.patch("models.address.Address.model_dump", side_effect=Exception("Validation failed"), create=True):
-            await create_address(phone_number, request_data, mock_redis_client)
+            await create_address(phone_number, request_data, mock_service)
 
     assert exc_info.value.status_code == 422
     assert "Invalid address data" in str(exc_info.value.detail)
+
+
+@pytest.mark.asyncio
+async def test_create_address_fire_and_forget():
+    """Test that a fire-and-forget create is accepted before it is written, and written after the response."""
+    address_data = {
+        "street": "123 Main St",
+        "city": "Anytown",
+        "state_province": "NY",
+        "postal_code": "12345",
+        "country": "US",
+    }
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.durability = Durability(DurabilityLevel.FIRE_AND_FORGET)
+    mock_service.create_address = AsyncMock(return_value=WriteStatus.CONFLICT)
+    background_tasks = BackgroundTasks()
+    response = Response()
+
+    result = await create_address("+1234567890", _make_request(address_data), mock_service, background_tasks, response)
+
+    assert response.status_code == 202
+    assert result["phone"] == "+1234567890"
+    # The client is pinned to the primary before the write runs
+    mock_service.accept_write.assert_called_once_with()
+    mock_service.create_address.assert_not_called()
+    await background_tasks()
+    mock_service.create_address.assert_awaited_once()
@@ -7,7 +7,7 @@ import pytest
 from fastapi import HTTPException
 
 from api.v1.routes.delete_address import delete_address
-from services.phonebook_service import PhoneBookService
+from services.phonebook_service import PhoneBookService, WriteStatus
 
 
 @pytest.mark.asyncio
@@ -15,20 +15,16 @@ async def test_delete_address_valid_request():
     """Test delete_address with a valid phone number."""
     # Arrange
     phone_number = "+1234567890"
-    mock_redis_client = AsyncMock()
-
-    # Mock the service to return success
     mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.delete_address = AsyncMock(return_value=True)
+    mock_service.delete_address = AsyncMock(return_value=WriteStatus.DELETED)
 
     # Act
-    with mock.patch('api.v1.routes.delete_address.PhoneBookService', return_value=mock_service):
-        # For delete, the function returns None (204 No Content)
-        result = await delete_address(phone_number, mock_redis_client)
+    # For delete, the function returns None (204 No Content)
+    result = await delete_address(phone_number, mock_service)
 
     # Assert
     assert result is None  # DELETE operations return 204, which is None in FastAPI
-    mock_service.delete_address.assert_called_once_with(phone_number)
+    mock_service.delete_address.assert_called_once_with(phone_number, expected_version=None)
 
 
 @pytest.mark.asyncio
@@ -36,16 +32,12 @@ async def test_delete_address_not_found():
     """Test delete_address when phone number does not exist."""
     # Arrange
     phone_number = "+1234567890"
-    mock_redis_client = AsyncMock()
-
-    # Mock the service to return False (not found)
     mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.delete_address = AsyncMock(return_value=False)
+    mock_service.delete_address = AsyncMock(return_value=WriteStatus.NOT_FOUND)
 
     # Act & Assert
-    with mock.patch('api.v1.routes.delete_address.PhoneBookService', return_value=mock_service):
-        with pytest.raises(HTTPException) as exc_info:
-            await delete_address(phone_number, mock_redis_client)
+    with pytest.raises(HTTPException) as exc_info:
+        await delete_address(phone_number, mock_service)
 
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "Phone number not found"
@@ -56,13 +48,13 @@ async def test_delete_address_invalid_phone_format():
     """Test delete_address with an invalid phone number format."""
     # Arrange
     phone_number = "invalid-phone"
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     # Mock validate_phone_format to return False and normalization to fail
     with mock.patch('api.v1.routes.delete_address.validate_phone_format', return_value=False):
         with mock.patch('api.v1.routes.delete_address.normalize_phone_number', return_value=None):
             with pytest.raises(HTTPException) as exc_info:
-                await delete_address(phone_number, mock_redis_client)
+                await delete_address(phone_number, mock_service)
 
     # Assert
     assert exc_info.value.status_code == 422
@@ -75,18 +67,15 @@ async def test_delete_address_with_normalized_phone():
     # Arrange
     original_phone = "89123456789"  # Russian format without +
     normalized_phone = "+79123456789"  # What it should normalize to
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     # Mock the phone validation and normalization
     with mock.patch('api.v1.routes.delete_address.validate_phone_format', side_effect=[False, True]):  # First call False, then True
         with mock.patch('api.v1.routes.delete_address.normalize_phone_number', return_value=normalized_phone):
-            # Mock the service to return success
-            mock_service = AsyncMock(spec=PhoneBookService)
-            mock_service.delete_address = AsyncMock(return_value=True)
+            mock_service.delete_address = AsyncMock(return_value=WriteStatus.DELETED)
 
-            with mock.patch('api.v1.routes.delete_address.PhoneBookService', return_value=mock_service):
-                result = await delete_address(original_phone, mock_redis_client)
+            result = await delete_address(original_phone, mock_service)
 
     # Assert
     assert result is None  # DELETE operations return 204, which is None in FastAPI
-    mock_service.delete_address.assert_called_once_with(normalized_phone)
+    mock_service.delete_address.assert_called_once_with(normalized_phone, expected_version=None)
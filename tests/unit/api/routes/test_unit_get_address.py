@@ -4,7 +4,7 @@ from unittest import mock
 from unittest.mock import AsyncMock
 
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 
 from api.v1.routes.get_address import get_address
 from services.phonebook_service import PhoneBookService
@@ -15,20 +15,19 @@ async def test_get_address_valid_request():
     """Test get_address with a valid phone number."""
     # Arrange
     phone_number = "+1234567890"
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
     expected_address_data = {"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US"}
 
-    # Mock the service to return address data
-    mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.get_address = AsyncMock(return_value=expected_address_data)
+    mock_service.get_tagged_address = AsyncMock(return_value=(expected_address_data, "abc"))
+    response = Response()
 
     # Act
-    with mock.patch('api.v1.routes.get_address.PhoneBookService', return_value=mock_service):
-        result = await get_address(phone_number, mock_redis_client)
+    result = await get_address(phone_number, mock_service, response)
 
     # Assert
     assert result == {"phone": phone_number, "address": expected_address_data}
-    mock_service.get_address.assert_called_once_with(phone_number)
+    assert response.headers["ETag"] == '"abc"'
+    mock_service.get_tagged_address.assert_called_once_with(phone_number)
 
 
 @pytest.mark.asyncio
@@ -36,16 +35,12 @@ async def test_get_address_phone_not_found():
     """Test get_address when phone number is not found."""
     # Arrange
     phone_number = "+1234567890"
-    mock_redis_client = AsyncMock()
-
-    # Mock the service to return None (not found)
     mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.get_address = AsyncMock(return_value=None)
+    mock_service.get_tagged_address = AsyncMock(return_value=None)
 
     # Act & Assert
-    with mock.patch('api.v1.routes.get_address.PhoneBookService', return_value=mock_service):
-        with pytest.raises(HTTPException) as exc_info:
-            await get_address(phone_number, mock_redis_client)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_address(phone_number, mock_service, Response())
 
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "Phone number not found"
@@ -56,13 +51,13 @@ async def test_get_address_invalid_phone_format():
     """Test get_address with an invalid phone number format."""
     # Arrange
     phone_number = "invalid-phone"
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     # Mock validate_phone_format to return False
     with mock.patch('api.v1.routes.get_address.validate_phone_format', return_value=False):
         with mock.patch('api.v1.routes.get_address.normalize_phone_number', return_value=None):
             with pytest.raises(HTTPException) as exc_info:
-                await get_address(phone_number, mock_redis_client)
+                await get_address(phone_number, mock_service)
 
     # Assert
     assert exc_info.value.status_code == 422
@@ -75,19 +70,33 @@ async def test_get_address_with_normalized_phone():
     # Arrange
     original_phone = "89123456789"  # Russian format without +
     normalized_phone = "+79123456789"  # What it should normalize to
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
     expected_address_data = {"street": "123 Main St", "city": "Anytown", "state_province": "NY", "postal_code": "12345", "country": "US"}
 
     # Mock the phone validation and normalization
     with mock.patch('api.v1.routes.get_address.validate_phone_format', side_effect=[False, True]):  # First call False, then True
         with mock.patch('api.v1.routes.get_address.normalize_phone_number', return_value=normalized_phone):
-            # Mock the service to return address data
-            mock_service = AsyncMock(spec=PhoneBookService)
-            mock_service.get_address = AsyncMock(return_value=expected_address_data)
+            mock_service.get_tagged_address = AsyncMock(return_value=(expected_address_data, "abc"))
 
-            with mock.patch('api.v1.routes.get_address.PhoneBookService', return_value=mock_service):
-                result = await get_address(original_phone, mock_redis_client)
+            result = await get_address(original_phone, mock_service, Response())
 
     # Assert
     assert result == {"phone": normalized_phone, "address": expected_address_data}
-    mock_service.get_address.assert_called_once_with(normalized_phone)
+    mock_service.get_tagged_address.assert_called_once_with(normalized_phone)
+
+
+@pytest.mark.asyncio
+async def test_get_address_not_modified():
+    """Test that a request naming the current ETag in If-None-Match gets 304 without a body."""
+    phone_number = "+1234567890"
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_tagged_address = AsyncMock(return_value=({"street": "123 Main St"}, "abc"))
+
+    result = await get_address(phone_number, mock_service, Response(), '"old", W/"abc"')
+
+    assert result.status_code == 304
+    assert result.body == b""
+    assert result.headers["ETag"] == '"abc"'
+
+    result = await get_address(phone_number, mock_service, Response(), '"old"')
+    assert result == {"phone": phone_number, "address": {"street": "123 Main St"}}
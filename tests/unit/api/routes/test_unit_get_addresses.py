@@ -0,0 +1,67 @@
+"""Unit tests for the get_addresses batch lookup route function."""
+
+from unittest import mock
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from api.v1.routes.get_addresses import get_addresses
+from models.api_models import BatchLookupRequest
+from services.phonebook_service import PhoneBookService
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_mixed_results():
+    """Test that each requested number gets a found, not_found or invalid result in order."""
+    # Arrange
+    address = {
+        'street': '123 Main St',
+        'city': 'Anytown',
+        'state_province': 'NY',
+        'postal_code': '12345',
+        'country': 'US',
+    }
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_addresses = AsyncMock(return_value={'+1234567890': address, '+79123456789': None})
+    request_data = BatchLookupRequest(phone_numbers=['+1234567890', 'invalid-phone', '89123456789'])
+
+    # Act
+    result = await get_addresses(request_data, mock_service)
+
+    # Assert
+    assert result == {
+        'results': [
+            {'phone': '+1234567890', 'status': 'found', 'address': address},
+            {'phone': 'invalid-phone', 'status': 'invalid'},
+            {'phone': '+79123456789', 'status': 'not_found'},
+        ]
+    }
+    # Invalid numbers are never sent to the service, Russian numbers are normalized
+    assert mock_service.get_addresses.call_args.args[0] == ['+1234567890', '+79123456789']
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_all_invalid():
+    """Test that a batch of only invalid numbers returns invalid results."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_addresses = AsyncMock(return_value={})
+    request_data = BatchLookupRequest(phone_numbers=['abc', '123'])
+
+    result = await get_addresses(request_data, mock_service)
+
+    assert [item['status'] for item in result['results']] == ['invalid', 'invalid']
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_batch_too_large():
+    """Test that batches above the configured maximum are rejected."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    request_data = BatchLookupRequest(phone_numbers=['+1234567890'] * 3)
+
+    with mock.patch('api.v1.routes.get_addresses.settings.batch_max_size', 2):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_addresses(request_data, mock_service)
+
+    assert exc_info.value.status_code == 422
+    assert 'maximum is 2' in exc_info.value.detail
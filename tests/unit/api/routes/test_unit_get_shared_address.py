@@ -0,0 +1,57 @@
+"""Unit tests for the get_shared_address route function."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from api.v1.routes.get_shared_address import get_shared_address
+from services.phonebook_service import PhoneBookService
+
+
+@pytest.mark.asyncio
+async def test_get_shared_address_valid_request():
+    """Test get_shared_address with a phone number whose address is shared."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_phones_sharing_address = AsyncMock(return_value=['+1234567890', '+1234567891'])
+
+    result = await get_shared_address('+1234567890', mock_service)
+
+    assert result == {'phone': '+1234567890', 'shared_with': ['+1234567890', '+1234567891']}
+    mock_service.get_phones_sharing_address.assert_called_once_with('+1234567890')
+
+
+@pytest.mark.asyncio
+async def test_get_shared_address_phone_not_found():
+    """Test get_shared_address when phone number is not found."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_phones_sharing_address = AsyncMock(return_value=None)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_shared_address('+1234567890', mock_service)
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_shared_address_unsupported_layout():
+    """Test get_shared_address when the storage layout keeps no reverse index."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.get_phones_sharing_address = AsyncMock(side_effect=NotImplementedError)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_shared_address('+1234567890', mock_service)
+
+    assert exc_info.value.status_code == 501
+
+
+@pytest.mark.asyncio
+async def test_get_shared_address_invalid_phone_format():
+    """Test get_shared_address with an invalid phone number format."""
+    mock_service = AsyncMock(spec=PhoneBookService)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_shared_address('invalid', mock_service)
+
+    assert exc_info.value.status_code == 422
+    mock_service.get_phones_sharing_address.assert_not_called()
@@ -4,12 +4,12 @@ from unittest import mock
 from unittest.mock import AsyncMock
 
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 
 from api.v1.routes.update_address import update_address
 from models.address import Address
 from models.api_models import CreateAddressRequest
-from services.phonebook_service import PhoneBookService
+from services.phonebook_service import PhoneBookService, WriteStatus
 
 
 def _make_request(data: dict) -> CreateAddressRequest:
@@ -28,10 +28,8 @@ async def test_update_address_valid_request():
         "postal_code": "54321",
         "country": "US"
     }
-    mock_redis_client = AsyncMock()
-
-    # Mock the service to return success
     mock_service = AsyncMock(spec=PhoneBookService)
+
     # Expected address data after validation will include formatted_address
     expected_address_data = {
         "street": "456 Oak Ave",
@@ -41,16 +39,15 @@ async def test_update_address_valid_request():
         "country": "US",
         "formatted_address": "456 Oak Ave, Newtown, CA 54321, US"
     }
-    mock_service.update_address = AsyncMock(return_value=True)
+    mock_service.update_address = AsyncMock(return_value=WriteStatus.UPDATED)
 
     # Act
-    with mock.patch('api.v1.routes.update_address.PhoneBookService', return_value=mock_service):
-        request_data = _make_request(address_data)
-        result = await update_address(phone_number, request_data, mock_redis_client)
+    request_data = _make_request(address_data)
+    result = await update_address(phone_number, request_data, mock_service)
 
     # Assert
     assert result == {"phone": phone_number, "address": expected_address_data}
-    mock_service.update_address.assert_called_once_with(phone_number, expected_address_data)
+    mock_service.update_address.assert_called_once_with(phone_number, expected_address_data, expected_version=None)
 
 
 @pytest.mark.asyncio
@@ -65,17 +62,13 @@ async def test_update_address_not_found():
         "postal_code": "54321",
         "country": "US"
     }
-    mock_redis_client = AsyncMock()
-
-    # Mock the service to return False (not found)
     mock_service = AsyncMock(spec=PhoneBookService)
-    mock_service.update_address = AsyncMock(return_value=False)
+    mock_service.update_address = AsyncMock(return_value=WriteStatus.NOT_FOUND)
 
     # Act & Assert
-    with mock.patch('api.v1.routes.update_address.PhoneBookService', return_value=mock_service):
-        with pytest.raises(HTTPException) as exc_info:
-            request_data = _make_request(address_data)
-            await update_address(phone_number, request_data, mock_redis_client)
+    with pytest.raises(HTTPException) as exc_info:
+        request_data = _make_request(address_data)
+        await update_address(phone_number, request_data, mock_service)
 
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "Phone number not found"
@@ -93,14 +86,14 @@ async def test_update_address_invalid_phone_format():
         "postal_code": "54321",
         "country": "US"
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     # Mock validate_phone_format to return False and normalization to fail
     with mock.patch('api.v1.routes.update_address.validate_phone_format', return_value=False):
         with mock.patch('api.v1.routes.update_address.normalize_phone_number', return_value=None):
             with pytest.raises(HTTPException) as exc_info:
                 request_data = _make_request(address_data)
-                await update_address(phone_number, request_data, mock_redis_client)
+                await update_address(phone_number, request_data, mock_service)
 
     # Assert
     assert exc_info.value.status_code == 422
@@ -120,13 +113,11 @@ async def test_update_address_with_normalized_phone():
         "postal_code": "54321",
         "country": "US"
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
 
     # Mock the phone validation and normalization
     with mock.patch('api.v1.routes.update_address.validate_phone_format', side_effect=[False, True]):  # First call False, then True
         with mock.patch('api.v1.routes.update_address.normalize_phone_number', return_value=normalized_phone):
-            # Mock the service to return success
-            mock_service = AsyncMock(spec=PhoneBookService)
             # Expected address data after validation will include formatted_address
             expected_address_data = {
                 "street": "456 Oak Ave",
@@ -136,15 +127,14 @@ async def test_update_address_with_normalized_phone():
                 "country": "US",
                 "formatted_address": "456 Oak Ave, Newtown, CA 54321, US"
             }
-            mock_service.update_address = AsyncMock(return_value=True)
+            mock_service.update_address = AsyncMock(return_value=WriteStatus.UPDATED)
 
-            with mock.patch('api.v1.routes.update_address.PhoneBookService', return_value=mock_service):
-                request_data = _make_request(address_data)
-                result = await update_address(original_phone, request_data, mock_redis_client)
+            request_data = _make_request(address_data)
+            result = await update_address(original_phone, request_data, mock_service)
 
     # Assert
     assert result == {"phone": normalized_phone, "address": expected_address_data}
-    mock_service.update_address.assert_called_once_with(normalized_phone, expected_address_data)
+    mock_service.update_address.assert_called_once_with(normalized_phone, expected_address_data, expected_version=None)
 
 
 @pytest.mark.asyncio
@@ -160,13 +150,34 @@ async def test_update_address_invalid_address_data():
         "postal_code": "54321",
         "country": "US"
     }
-    mock_redis_client = AsyncMock()
+    mock_service = AsyncMock(spec=PhoneBookService)
     request_data = _make_request(address_data)
 
     # Act & Assert
     with pytest.raises(HTTPException) as exc_info:
         with mock.patch('models.address.Address.model_dump', side_effect=Exception('Validation failed')):
-            await update_address(phone_number, request_data, mock_redis_client)
+            await update_address(phone_number, request_data, mock_service)
 
     assert exc_info.value.status_code == 422
     assert "Invalid address data" in str(exc_info.value.detail)
+
+
+@pytest.mark.asyncio
+async def test_update_address_buffered():
+    """Test that an update buffered by write-behind is answered with 202 Accepted."""
+    address_data = {
+        "street": "456 Oak Ave",
+        "city": "Newtown",
+        "state_province": "CA",
+        "postal_code": "54321",
+        "country": "US",
+    }
+    mock_service = AsyncMock(spec=PhoneBookService)
+    mock_service.update_address = AsyncMock(return_value=WriteStatus.ACCEPTED)
+
+    response = Response()
+
+    result = await update_address("+1234567890", _make_request(address_data), mock_service, response=response)
+
+    assert response.status_code == 202
+    assert result["phone"] == "+1234567890"
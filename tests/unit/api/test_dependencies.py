@@ -1,6 +1,21 @@
-from fastapi import HTTPException
+from http.cookies import SimpleCookie
+from unittest.mock import AsyncMock, patch
 
-from api.dependencies import handle_error
+import pytest
+from fastapi import HTTPException, Request, Response
+from redis.asyncio import BlockingConnectionPool
+
+from api import dependencies
+from api.dependencies import get_address_cache, handle_error, phonebook_service_provider, writer_service_provider
+from services.address_cache import AddressCache
+from services.durability import Durability, DurabilityLevel
+from services.negative_lookup_filter import NegativeLookupFilter
+from services.phonebook_service import PhoneBookService
+from services.replica_routing import READ_YOUR_WRITES_COOKIE, ReplicaRouter
+from services.sharding import ShardedRedis
+from services.snapshot_backend import SnapshotBackend, write_snapshot
+from services.sqlite_backend import SQLiteBackend
+from services.storage_backend import MemoryBackend, WaitingRedisBackend
 
 
 def test_handle_error_creates_http_exception():
@@ -20,3 +35,378 @@ def test_handle_error_with_different_codes():
     error_500 = handle_error(500, "Internal Server Error")
     assert error_500.status_code == 500
     assert error_500.detail == "Internal Server Error"
+
+
+def test_get_address_cache_disabled_by_default():
+    """Test that no cache is created when ADDRESS_CACHE_SIZE is 0."""
+    with patch("api.dependencies.address_cache", None), patch("api.dependencies.settings.address_cache_size", 0):
+        assert get_address_cache() is None
+
+
+def test_get_address_cache_shared_per_worker():
+    """Test that the cache is created once from settings and then reused."""
+    with patch("api.dependencies.address_cache", None), \
+            patch("api.dependencies.settings.address_cache_size", 100), \
+            patch("api.dependencies.settings.address_cache_ttl", 5.0):
+        cache = get_address_cache()
+        assert cache.max_size == 100
+        assert cache.ttl == 5.0
+        assert get_address_cache() is cache
+
+
+async def test_phonebook_service_provider_wires_cache():
+    """Test that the service provider passes the worker cache to the service."""
+    mock_redis = AsyncMock()
+    cache = AddressCache(max_size=10, ttl=60)
+    key_filter = NegativeLookupFilter(capacity=100)
+    with patch("api.dependencies.address_cache", cache), patch("api.dependencies.key_filter", key_filter):
+        service = await phonebook_service_provider(mock_redis)
+
+    assert service.redis_client is mock_redis
+    assert service.cache is cache
+    assert service.key_filter is key_filter
+    assert service.single_flight is dependencies.get_single_flight()
+    assert service.read_batcher is None
+
+
+@pytest.mark.asyncio
+async def test_start_cache_invalidation_skipped_without_cache():
+    """Test that no listener is started when the address cache is disabled."""
+    with (
+        patch("api.dependencies.address_cache", None),
+        patch("api.dependencies.settings.address_cache_size", 0),
+        patch("api.dependencies.key_filter", None),
+        patch("api.dependencies.settings.negative_filter_capacity", 0),
+        patch("api.dependencies.cache_invalidation_listener", None),
+    ):
+        await dependencies.start_cache_invalidation()
+        assert dependencies.cache_invalidation_listener is None
+
+
+@pytest.mark.asyncio
+async def test_start_and_stop_cache_invalidation():
+    """Test that the listener is started for an enabled cache and cleared on stop."""
+    listener = AsyncMock()
+    with (
+        patch("api.dependencies.address_cache", AddressCache(max_size=10, ttl=60)),
+        patch("api.dependencies.cache_invalidation_listener", None),
+        patch("api.dependencies.get_redis_pool", AsyncMock()),
+        patch("api.dependencies.CacheInvalidationListener", return_value=listener) as listener_class,
+    ):
+        await dependencies.start_cache_invalidation()
+        assert dependencies.cache_invalidation_listener is listener
+        assert listener_class.call_args.kwargs["mode"] == "tracking"
+        listener.start.assert_awaited_once()
+
+        await dependencies.stop_cache_invalidation()
+        listener.stop.assert_awaited_once()
+        assert dependencies.cache_invalidation_listener is None
+
+
+@pytest.mark.asyncio
+async def test_negative_filter_inactive_without_cache_invalidation():
+    """Test that no listener is started for the filter when invalidation is disabled."""
+    with (
+        patch("api.dependencies.address_cache", None),
+        patch("api.dependencies.key_filter", NegativeLookupFilter(capacity=100)),
+        patch("api.dependencies.settings.cache_invalidation", "none"),
+        patch("api.dependencies.cache_invalidation_listener", None),
+    ):
+        await dependencies.start_cache_invalidation()
+        assert dependencies.cache_invalidation_listener is None
+
+
+def test_cluster_startup_nodes():
+    """Test that startup nodes are parsed from settings, defaulting to the single Redis address."""
+    with patch("api.dependencies.settings.redis_cluster_nodes", "10.0.0.1:7000, 10.0.0.2:7001"):
+        nodes = dependencies.cluster_startup_nodes()
+    assert [(node.host, node.port) for node in nodes] == [("10.0.0.1", 7000), ("10.0.0.2", 7001)]
+
+    with (
+        patch("api.dependencies.settings.redis_cluster_nodes", ""),
+        patch("api.dependencies.settings.redis_host", "redis"),
+        patch("api.dependencies.settings.redis_port", 6380),
+    ):
+        nodes = dependencies.cluster_startup_nodes()
+    assert [(node.host, node.port) for node in nodes] == [("redis", 6380)]
+
+
+@pytest.mark.asyncio
+async def test_get_redis_pool_builds_cluster_client():
+    """Test that cluster mode creates a cluster-aware client."""
+    with (
+        patch("api.dependencies.redis_pool", None),
+        patch("api.dependencies.settings.redis_cluster_enabled", True),
+        patch("api.dependencies.RedisCluster") as cluster_class,
+    ):
+        client = await dependencies.get_redis_pool()
+
+    assert client is cluster_class.return_value
+    assert cluster_class.call_args.kwargs["decode_responses"] is True
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidation_skipped_on_cluster():
+    """Test that no listener is started in cluster mode."""
+    with (
+        patch("api.dependencies.address_cache", AddressCache(max_size=10, ttl=60)),
+        patch("api.dependencies.cache_invalidation_listener", None),
+        patch("api.dependencies.settings.redis_cluster_enabled", True),
+        patch("api.dependencies.CacheInvalidationListener") as listener_class,
+    ):
+        await dependencies.start_cache_invalidation()
+        assert dependencies.cache_invalidation_listener is None
+    listener_class.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_redis_pool_builds_sharded_client():
+    """Test that a shard list creates one client per shard behind a hash ring."""
+    with (
+        patch("api.dependencies.redis_pool", None),
+        patch("api.dependencies.settings.redis_shards", "a:6379,b:6380"),
+    ):
+        client = await dependencies.get_redis_pool()
+
+    assert isinstance(client, ShardedRedis)
+    assert list(client.shards) == ["a:6379", "b:6380"]
+    assert client.shards["b:6380"].connection_pool.connection_kwargs["port"] == 6380
+
+
+@pytest.mark.asyncio
+async def test_provider_routes_reads_to_replica_until_client_writes():
+    """Test that reads go to a replica, and a write pins the client's next reads to the primary."""
+    primary = AsyncMock()
+    primary.set.return_value = True
+    primary.get.return_value = None
+    replica = AsyncMock()
+    router = ReplicaRouter(primary, [replica], read_your_writes_window=5.0)
+    response = Response()
+    with (
+        patch("api.dependencies.redis_pool", primary),
+        patch("api.dependencies.replica_router", router),
+        patch("api.dependencies.settings.redis_replicas", "r:6379"),
+    ):
+        service = await phonebook_service_provider(primary, Request({"type": "http", "method": "PUT", "query_string": b"", "headers": []}), response)
+        assert service.read_client is replica
+        assert not service.fresh_reads
+
+        await service.create_address("+1234567890", {"street": "A St"})
+        cookie = SimpleCookie(response.headers["set-cookie"])[READ_YOUR_WRITES_COOKIE]
+        assert cookie["max-age"] == "5"
+        # The write request sent no read to the replica
+        assert router.replica_reads == 0
+
+        headers = [(b"cookie", f"{READ_YOUR_WRITES_COOKIE}={cookie.value}".encode())]
+        service = await phonebook_service_provider(primary, Request({"type": "http", "method": "GET", "query_string": b"", "headers": headers}), Response())
+        assert service.read_client is primary
+        assert service.fresh_reads
+        await service.get_address("+1234567890")
+        assert (router.replica_reads, router.primary_reads) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_get_replica_router_static_list():
+    """Test that a static replica list creates one client per replica behind the primary."""
+    with (
+        patch("api.dependencies.redis_pool", None),
+        patch("api.dependencies.replica_router", None),
+        patch("api.dependencies.settings.redis_replicas", "r1:6379,r2:6380"),
+    ):
+        router = await dependencies.get_replica_router()
+        assert router.primary is await dependencies.get_redis_pool()
+
+    assert [replica.connection_pool.connection_kwargs["host"] for replica in router.replicas] == ["r1", "r2"]
+
+
+@pytest.mark.asyncio
+async def test_open_redis_pool_warms_connections_and_scripts():
+    """Test that startup opens connections and loads the layout's scripts, and shutdown closes the client."""
+    client = AsyncMock()
+    client.config_get.return_value = {"appendonly": "yes"}
+    with (
+        patch("api.dependencies.redis_pool", client),
+        patch("api.dependencies.settings.storage_layout", "hash"),
+        patch("api.dependencies.settings.redis_warm_connections", 2),
+        patch("api.dependencies.append_only_disabled", False),
+    ):
+        await dependencies.open_redis_pool()
+        assert client.ping.await_count == 2
+        assert client.script_load.await_count == len(dependencies.get_key_layout().pipeline_scripts)
+        assert not dependencies.append_only_disabled
+
+        await dependencies.close_redis_pool()
+        assert dependencies.redis_pool is None
+    client.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_open_redis_pool_tolerates_unreachable_redis():
+    """Test that the service still starts when Redis cannot be reached."""
+    client = AsyncMock()
+    client.ping.side_effect = ConnectionError("Connection refused")
+    with patch("api.dependencies.redis_pool", client):
+        await dependencies.open_redis_pool()
+    client.script_load.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_redis_pool_configures_connection_pool():
+    """Test that the client's pool is bounded, times out and can use a Unix socket."""
+    with (
+        patch("api.dependencies.redis_pool", None),
+        patch("api.dependencies.settings.redis_unix_socket", "/run/redis.sock"),
+        patch("api.dependencies.settings.redis_max_connections", 8),
+        patch("api.dependencies.settings.redis_socket_timeout", 1.5),
+    ):
+        client = await dependencies.get_redis_pool()
+
+    pool = client.connection_pool
+    assert isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == 8
+    assert pool.connection_kwargs["path"] == "/run/redis.sock"
+    assert pool.connection_kwargs["socket_timeout"] == 1.5
+
+
+@pytest.mark.asyncio
+async def test_provider_uses_memory_backend():
+    """Test that with the memory backend every request shares this worker's in-process store."""
+    with (
+        patch("api.dependencies.memory_backend", None),
+        patch("api.dependencies.settings.storage_backend", "memory"),
+    ):
+        first = await phonebook_service_provider(AsyncMock())
+        second = await phonebook_service_provider(AsyncMock())
+
+    assert isinstance(first.storage, MemoryBackend)
+    assert first.storage is second.storage is first.read_storage
+
+
+@pytest.mark.asyncio
+async def test_provider_uses_snapshot_backend_clearing_cache_on_swap(tmp_path):
+    """Test that the snapshot backend is shared by requests and a swap clears this worker's cache."""
+    path = tmp_path / "phonebook.snapshot"
+    write_snapshot(path, [("+12025550123", "{}")])
+    cache = AddressCache(max_size=10, ttl=60)
+    with (
+        patch("api.dependencies.snapshot_backend", None),
+        patch("api.dependencies.address_cache", cache),
+        patch("api.dependencies.settings.storage_backend", "snapshot"),
+        patch("api.dependencies.settings.snapshot_path", str(path)),
+    ):
+        first = await phonebook_service_provider(AsyncMock())
+        second = await phonebook_service_provider(AsyncMock())
+
+    assert isinstance(first.storage, SnapshotBackend)
+    assert first.storage is second.storage is first.read_storage
+    cache.set("+12025550123", {})
+    write_snapshot(path, [])
+    assert first.storage.reload()
+    assert cache.get("+12025550123") is None
+
+
+@pytest.mark.asyncio
+async def test_provider_uses_sqlite_backend_until_closed(tmp_path):
+    """Test that requests share this worker's SQLite store and that shutdown closes it."""
+    with (
+        patch("api.dependencies.sqlite_backend", None),
+        patch("api.dependencies.settings.storage_backend", "sqlite"),
+        patch("api.dependencies.settings.sqlite_path", str(tmp_path / "phonebook.db")),
+    ):
+        first = await phonebook_service_provider(AsyncMock())
+        second = await phonebook_service_provider(AsyncMock())
+        assert isinstance(first.storage, SQLiteBackend)
+        assert first.storage is second.storage is first.read_storage
+
+        await dependencies.close_storage_backend()
+        assert dependencies.sqlite_backend is None
+
+
+@pytest.mark.asyncio
+async def test_provider_shares_write_behind_flushed_at_stop():
+    """Test that requests share this worker's write-behind buffer and stopping it stores what is buffered."""
+    with (
+        patch("api.dependencies.memory_backend", None),
+        patch("api.dependencies.write_behind", None),
+        patch("api.dependencies.settings.storage_backend", "memory"),
+        patch("api.dependencies.settings.write_behind_enabled", True),
+    ):
+        first = await phonebook_service_provider(AsyncMock())
+        second = await phonebook_service_provider(AsyncMock())
+        assert first.write_behind is second.write_behind is not None
+        assert first.write_behind.storage is first.storage
+
+        await first.create_address("+12025550123", {"street": "Old St"})
+        await first.update_address("+12025550123", {"street": "New St"})
+        await dependencies.stop_write_behind()
+
+        assert dependencies.write_behind is None
+        assert await first.storage.get("+12025550123") == b'{"street": "New St"}'
+
+
+def _write_request(query_string: bytes = b"", headers: list | None = None) -> Request:
+    return Request({"type": "http", "method": "PUT", "query_string": query_string, "headers": headers or []})
+
+
+async def _writer_service(request: Request) -> PhoneBookService:
+    return await writer_service_provider(await phonebook_service_provider(AsyncMock(), request), request)
+
+
+@pytest.mark.asyncio
+async def test_writer_provider_applies_requested_durability():
+    """Test that a write's durability comes from the query parameter, else the header, with configured defaults."""
+    with patch("api.dependencies.settings.durability_replicas", 2):
+        service = await _writer_service(_write_request(b"durability=replicated"))
+        assert isinstance(service.storage, WaitingRedisBackend)
+        assert service.durability == Durability(DurabilityLevel.REPLICATED, 2, 1000)
+
+        service = await _writer_service(_write_request(headers=[(b"durability", b"persisted:1")]))
+        assert service.durability == Durability(DurabilityLevel.PERSISTED, 1, 1000)
+
+    service = await _writer_service(_write_request())
+    assert service.durability == Durability()
+
+
+@pytest.mark.asyncio
+async def test_writer_provider_rejects_unsupported_durability():
+    """Test that an unknown durability is a 422 and waiting for replicas of the memory backend a 501."""
+    with pytest.raises(HTTPException) as exc_info:
+        await _writer_service(_write_request(b"durability=eventually"))
+    assert exc_info.value.status_code == 422
+
+    with (
+        patch("api.dependencies.memory_backend", None),
+        patch("api.dependencies.settings.storage_backend", "memory"),
+        pytest.raises(HTTPException) as exc_info,
+    ):
+        await _writer_service(_write_request(b"durability=replicated"))
+    assert exc_info.value.status_code == 501
+
+
+@pytest.mark.asyncio
+async def test_writer_provider_refuses_persisted_without_append_only():
+    """Test that persisted writes are a 501 once startup found appendonly disabled, before anything is written."""
+    client = AsyncMock()
+    client.config_get.return_value = {"appendonly": "no"}
+    with patch("api.dependencies.append_only_disabled", False):
+        await dependencies.check_append_only(client)
+        assert dependencies.append_only_disabled
+
+        with pytest.raises(HTTPException) as exc_info:
+            await _writer_service(_write_request(b"durability=persisted"))
+        assert exc_info.value.status_code == 501
+
+        service = await _writer_service(_write_request(b"durability=replicated"))
+        assert service.durability.level is DurabilityLevel.REPLICATED
+
+
+@pytest.mark.asyncio
+async def test_read_provider_ignores_durability():
+    """Test that read routes, including POST lookups, never parse the durability a client sends."""
+    request = Request({"type": "http", "method": "POST", "query_string": b"durability=replicated", "headers": []})
+    with (
+        patch("api.dependencies.memory_backend", None),
+        patch("api.dependencies.settings.storage_backend", "memory"),
+    ):
+        service = await phonebook_service_provider(AsyncMock(), request)
+    assert service.durability == Durability()
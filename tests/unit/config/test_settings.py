@@ -1,3 +1,5 @@
+import pytest
+
 from config.settings import Settings
 
 
@@ -8,8 +10,55 @@ def test_settings_default_values():
     assert settings.redis_host == "localhost"
     assert settings.redis_port == 6379
     assert settings.redis_db == 0
+    assert settings.redis_cluster_enabled is False
+    assert settings.redis_cluster_nodes == ""
+    assert settings.redis_shards == ""
+    assert settings.redis_shard_virtual_nodes == 160
     assert settings.log_level == "INFO"
     assert settings.api_version == "v1"
+    assert settings.batch_max_size == 1000
+    assert settings.batch_chunk_size == 500
+    assert settings.batch_concurrency == 4
+    assert settings.import_chunk_size == 1000
+    assert settings.import_max_line_length == 65536
+    assert settings.export_batch_size == 1000
+    assert settings.address_cache_size == 0
+    assert settings.address_cache_ttl == 60.0
+    assert settings.cache_invalidation == "tracking"
+    assert settings.cache_invalidation_health_interval == 5.0
+    assert settings.negative_filter_capacity == 0
+    assert settings.negative_filter_error_rate == 0.01
+    assert settings.negative_filter_rebuild_interval == 3600.0
+    assert settings.single_flight_enabled is True
+    assert settings.read_batching_enabled is False
+    assert settings.read_batch_window_us == 0
+    assert settings.storage_format == "json"
+    assert settings.storage_compression == "none"
+    assert settings.storage_zstd_level == 3
+    assert settings.storage_zstd_dictionary == ""
+    assert settings.storage_layout == "string"
+
+
+def test_settings_reject_unsupported_topologies():
+    """Test that the content layout needs a single server and that cluster and sharding exclude each other."""
+    with pytest.raises(ValueError, match="not supported"):
+        Settings(redis_cluster_enabled=True, storage_layout="content")
+    with pytest.raises(ValueError, match="not supported"):
+        Settings(redis_shards="a:6379,b:6379", storage_layout="content")
+    with pytest.raises(ValueError, match="cannot be combined"):
+        Settings(redis_cluster_enabled=True, redis_shards="a:6379,b:6379")
+    with pytest.raises(ValueError, match="cannot be combined"):
+        Settings(redis_replicas="r:6379", redis_sentinels="s:26379")
+    with pytest.raises(ValueError, match="single Redis primary"):
+        Settings(redis_replicas="r:6379", redis_cluster_enabled=True)
+    with pytest.raises(ValueError, match="not supported"):
+        Settings(storage_backend="memory", storage_format="interned")
+    with pytest.raises(ValueError, match="not supported with STORAGE_BACKEND=sqlite"):
+        Settings(storage_backend="sqlite", storage_format="interned")
+    with pytest.raises(ValueError, match="needs SNAPSHOT_PATH"):
+        Settings(storage_backend="snapshot")
+    with pytest.raises(ValueError, match="WRITE_BEHIND_ENABLED is not supported"):
+        Settings(storage_backend="snapshot", snapshot_path="phonebook.snapshot", write_behind_enabled=True)
 
 
 def test_settings_custom_values():
@@ -0,0 +1,73 @@
+from services.address_cache import AddressCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_hit_and_miss_counters():
+    """Test that lookups are counted as hits or misses."""
+    cache = AddressCache(max_size=10, ttl=60)
+    assert cache.get('+1234567890') is None
+
+    cache.set('+1234567890', {'street': '123 Main St'})
+    assert cache.get('+1234567890') == {'street': '123 Main St'}
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted beyond max_size."""
+    cache = AddressCache(max_size=2, ttl=60)
+    cache.set('+1000000001', {'street': 'A St'})
+    cache.set('+1000000002', {'street': 'B St'})
+    cache.get('+1000000001')  # +1000000002 is now least recently used
+    cache.set('+1000000003', {'street': 'C St'})
+
+    assert cache.get('+1000000002') is None
+    assert cache.get('+1000000001') == {'street': 'A St'}
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_cache_entries_expire():
+    """Test that entries are not served after their TTL."""
+    clock = FakeClock()
+    cache = AddressCache(max_size=10, ttl=5, clock=clock)
+    cache.set('+1234567890', {'street': '123 Main St'})
+
+    clock.now = 4.9
+    assert cache.get('+1234567890') is not None
+    clock.now = 5.0
+    assert cache.get('+1234567890') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_cache_invalidate():
+    """Test that invalidation drops the entry and is counted."""
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set('+1234567890', {'street': '123 Main St'})
+    cache.invalidate('+1234567890')
+
+    assert cache.get('+1234567890') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cache_skips_set_after_racing_invalidation():
+    """Test that a value read before a concurrent write is not cached."""
+    cache = AddressCache(max_size=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate('+1234567890')  # A write lands while the read is in flight
+
+    cache.set('+1234567890', {'street': 'Old St'}, generation)
+    assert cache.get('+1234567890') is None
+
+    cache.set('+1234567890', {'street': 'New St'}, cache.generation)
+    assert cache.get('+1234567890') == {'street': 'New St'}
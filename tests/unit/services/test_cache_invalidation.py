@@ -0,0 +1,181 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ResponseError
+
+from services.address_cache import AddressCache
+from services.cache_invalidation import TRACKING_CHANNEL, CacheInvalidationListener
+from services.key_layout import HashKeyLayout
+from services.negative_lookup_filter import NegativeLookupFilter
+
+
+def _connection(responses):
+    connection = MagicMock()
+    connection.send_command = AsyncMock()
+    connection.read_response = AsyncMock(side_effect=responses)
+    return connection
+
+
+def _listener(mode='tracking', key_filter=None):
+    redis_client = MagicMock()
+    redis_client.connection_pool.connection_kwargs = {'db': 0}
+    cache = AddressCache(max_size=10, ttl=60)
+    return CacheInvalidationListener(redis_client, cache, mode=mode, key_filter=key_filter), cache
+
+
+async def _ready_filter(phone_numbers):
+    async def scan():
+        yield phone_numbers
+
+    key_filter = NegativeLookupFilter(capacity=100)
+    await key_filter.build(scan())
+    return key_filter
+
+
+def test_handle_message_invalidates_tracked_keys():
+    """Test that a tracking message evicts every listed key."""
+    listener, cache = _listener()
+    cache.set('+1000000001', {'street': 'A St'})
+    cache.set('+1000000002', {'street': 'B St'})
+
+    listener.handle_message(['message', TRACKING_CHANNEL, ['+1000000001', '+1000000002']])
+
+    assert cache.get('+1000000001') is None
+    assert cache.get('+1000000002') is None
+    assert listener.stats()['invalidations_received'] == 2
+
+
+def test_handle_message_invalidates_keyevent_key():
+    """Test that a keyevent message evicts its single key."""
+    listener, cache = _listener(mode='keyspace')
+    cache.set('+1000000001', {'street': 'A St'})
+
+    listener.handle_message(['message', '__keyevent@0__:set', '+1000000001'])
+
+    assert cache.get('+1000000001') is None
+
+
+def test_handle_message_null_keys_clears_cache():
+    """Test that a flush notification clears the whole cache."""
+    listener, cache = _listener()
+    cache.set('+1000000001', {'street': 'A St'})
+
+    listener.handle_message(['message', TRACKING_CHANNEL, None])
+
+    assert cache.stats()['size'] == 0
+
+
+def test_handle_message_ignores_subscribe_confirmations():
+    """Test that non-message replies leave the cache untouched."""
+    listener, cache = _listener()
+    cache.set('+1000000001', {'street': 'A St'})
+
+    listener.handle_message(['subscribe', TRACKING_CHANNEL, 1])
+
+    assert cache.get('+1000000001') == {'street': 'A St'}
+
+
+@pytest.mark.asyncio
+async def test_handle_message_adds_written_keys_to_filter():
+    """Test that keys reported by tracking are added to the negative-lookup filter."""
+    key_filter = await _ready_filter([])
+    listener, _ = _listener(key_filter=key_filter)
+
+    listener.handle_message(['message', TRACKING_CHANNEL, ['+1000000001']])
+
+    assert key_filter.might_contain('+1000000001')
+
+
+@pytest.mark.asyncio
+async def test_handle_message_removes_deleted_keys_from_filter():
+    """Test that keyevent deletions remove keys from the negative-lookup filter."""
+    key_filter = await _ready_filter(['+1000000001'])
+    listener, _ = _listener(mode='keyspace', key_filter=key_filter)
+
+    listener.handle_message(['message', '__keyevent@0__:del', '+1000000001'])
+
+    assert not key_filter.might_contain('+1000000001')
+
+
+@pytest.mark.asyncio
+async def test_bucket_message_adds_only_stored_numbers_to_filter():
+    """Test that a hash bucket write invalidates all its numbers but adds only the stored ones to the filter."""
+    key_filter = await _ready_filter([])
+    layout = HashKeyLayout()
+    bucket, _ = layout.locate('+1000000001')
+    redis_client = MagicMock()
+    listener = CacheInvalidationListener(
+        redis_client, AddressCache(max_size=10, ttl=60), key_filter=key_filter, layout=layout
+    )
+    listener.cache.set('+1000000099', {'street': 'A St'})
+    layout.stored_phone_numbers = AsyncMock(return_value=['+1000000001'])
+
+    listener.handle_message(['message', TRACKING_CHANNEL, [bucket]])
+    assert listener.cache.get('+1000000099') is None
+    assert not key_filter.might_contain('+1000000001')
+
+    task = asyncio.create_task(listener._add_written_members())
+    await asyncio.sleep(0)
+    task.cancel()
+
+    layout.stored_phone_numbers.assert_awaited_once_with(redis_client, [bucket])
+    assert key_filter.might_contain('+1000000001')
+    assert not key_filter.might_contain('+1000000099')
+
+
+@pytest.mark.asyncio
+async def test_subscribe_enables_broadcast_tracking():
+    """Test that tracking is redirected to the subscriber for phone key prefixes."""
+    listener, _ = _listener()
+    subscriber = _connection([42, ['subscribe', TRACKING_CHANNEL, 1]])
+    tracker = _connection(['OK'])
+
+    await listener._subscribe(subscriber, tracker)
+
+    subscriber.send_command.assert_any_await('SUBSCRIBE', TRACKING_CHANNEL)
+    tracker.send_command.assert_awaited_once_with(
+        'CLIENT', 'TRACKING', 'ON', 'REDIRECT', 42, 'BCAST', 'PREFIX', '+', 'PREFIX', '8'
+    )
+    assert listener.mode == 'tracking'
+
+
+@pytest.mark.asyncio
+async def test_subscribe_falls_back_to_keyspace_notifications():
+    """Test that keyevent channels are used when the server rejects tracking."""
+    listener, _ = _listener()
+    subscriber = _connection(
+        [
+            42,
+            ['subscribe', TRACKING_CHANNEL, 1],
+            ['unsubscribe', TRACKING_CHANNEL, 0],
+            *[['subscribe', 'channel', n] for n in range(1, 7)],
+        ]
+    )
+    tracker = _connection([ResponseError('unknown subcommand'), ['notify-keyspace-events', ''], 'OK'])
+
+    await listener._subscribe(subscriber, tracker)
+
+    assert listener.mode == 'keyspace'
+    tracker.send_command.assert_any_await('CONFIG', 'SET', 'notify-keyspace-events', '$Eeghx')
+    subscriber.send_command.assert_awaited_with(
+        'SUBSCRIBE',
+        '__keyevent@0__:set',
+        '__keyevent@0__:hset',
+        '__keyevent@0__:hdel',
+        '__keyevent@0__:del',
+        '__keyevent@0__:expired',
+        '__keyevent@0__:evicted',
+    )
+
+
+@pytest.mark.asyncio
+async def test_keyspace_mode_keeps_existing_server_flags():
+    """Test that CONFIG SET is skipped when all keyevent notifications are already on."""
+    listener, _ = _listener(mode='keyspace')
+    subscriber = _connection([['subscribe', 'channel', n] for n in range(1, 7)])
+    tracker = _connection([['notify-keyspace-events', 'AE']])
+
+    await listener._subscribe(subscriber, tracker)
+
+    tracker.send_command.assert_awaited_once_with('CONFIG', 'GET', 'notify-keyspace-events')
@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.exceptions import NoScriptError
+
+from services.component_dictionary import (
+    COMPONENT_STRINGS_KEY,
+    INTERN_SCRIPT,
+    ComponentDictionary,
+)
+
+
+@pytest.mark.asyncio
+async def test_intern_resolves_only_uncached_strings_in_batches():
+    """Test that interning sends each new string once, in batches, and caches both directions."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = [[1, 2], [3]]
+    components = ComponentDictionary(batch_size=2)
+
+    await components.intern(mock_redis, ['Anytown', 'NY', 'Anytown', 'US'])
+    await components.intern(mock_redis, ['NY', 'US'])
+
+    assert mock_redis.evalsha.call_count == 2
+    assert mock_redis.evalsha.call_args_list[0].args[-2:] == ('Anytown', 'NY')
+    assert mock_redis.evalsha.call_args_list[1].args[-1:] == ('US',)
+    assert components.id_for('US') == 3
+    assert components.string_for(1) == 'Anytown'
+    assert components.stats() == {'cached': 3, 'interned': 3, 'loaded': 0}
+
+
+@pytest.mark.asyncio
+async def test_intern_falls_back_to_eval_without_cached_script():
+    """Test that interning loads the script with EVAL when the server does not have it."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = NoScriptError('NOSCRIPT')
+    mock_redis.eval.return_value = [7]
+    components = ComponentDictionary()
+
+    await components.intern(mock_redis, ['Anytown'])
+
+    assert mock_redis.eval.call_args.args[0] == INTERN_SCRIPT
+    assert components.id_for('Anytown') == 7
+
+
+@pytest.mark.asyncio
+async def test_load_fetches_missing_ids_and_skips_unknown_ones():
+    """Test that loading fetches uncached IDs with one HMGET and leaves unknown IDs unresolved."""
+    mock_redis = AsyncMock()
+    mock_redis.hmget.return_value = ['Anytown', None]
+    components = ComponentDictionary()
+
+    await components.load(mock_redis, [1, 99, 1])
+
+    mock_redis.hmget.assert_awaited_once_with(COMPONENT_STRINGS_KEY, [1, 99])
+    assert components.string_for(1) == 'Anytown'
+    assert components.id_for('Anytown') == 1
+    assert components.string_for(99) is None
+
+    await components.load(mock_redis, [1])
+    mock_redis.hmget.assert_awaited_once()
@@ -0,0 +1,25 @@
+import pytest
+
+from services.durability import Durability, DurabilityLevel, ReplicationTimeoutError, parse_durability
+
+
+def test_parse_durability_levels():
+    """Test that waiting levels take an optional replica count and the configured timeout."""
+    assert parse_durability('primary', 1, 500) == Durability(DurabilityLevel.PRIMARY)
+    assert parse_durability('Fire-And-Forget', 1, 500) == Durability(DurabilityLevel.FIRE_AND_FORGET)
+    assert parse_durability('replicated', 1, 500) == Durability(DurabilityLevel.REPLICATED, 1, 500)
+    assert parse_durability('persisted:3', 1, 500) == Durability(DurabilityLevel.PERSISTED, 3, 500)
+    assert parse_durability('replicated:0', 1, 500).waits
+
+
+@pytest.mark.parametrize('value', ['', 'eventually', 'primary:2', 'replicated:-1', 'replicated:two'])
+def test_parse_durability_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_durability(value, 1, 500)
+
+
+def test_replication_timeout_error_reports_acknowledgements():
+    error = ReplicationTimeoutError(1, Durability(DurabilityLevel.REPLICATED, 2, 500))
+
+    assert str(error) == 'Stored on the primary, but 1 of 2 replicas acknowledged it as replicated within 500 ms'
+    assert error.acknowledged == 1
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from services.hedged_reads import MIN_SAMPLES, HedgedReader
+
+
+async def _answer(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _fail():
+    raise ConnectionError('replica down')
+
+
+async def _warm_up(reader):
+    for _ in range(MIN_SAMPLES):
+        await reader.read(lambda: _answer('fast'), lambda: _answer('unused'))
+
+
+@pytest.mark.asyncio
+async def test_no_hedging_until_enough_samples():
+    """Test that reads are not hedged before the delay can be estimated."""
+    reader = HedgedReader(min_delay=0.01)
+    assert await reader.read(lambda: _answer('first', 0.03), lambda: _answer('second')) == 'first'
+    assert reader.delay is None
+    assert reader.stats()['hedges'] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_read_hedged_and_loser_cancelled():
+    """Test that a read slower than the delay is sent again and the first answer wins."""
+    reader = HedgedReader(min_delay=0.01, max_ratio=1.0)
+    await _warm_up(reader)
+    assert reader.delay == 0.01
+
+    slow = asyncio.Event()
+
+    async def slow_read():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            slow.set()
+            raise
+
+    assert await reader.read(slow_read, lambda: _answer('second')) == 'second'
+    await asyncio.sleep(0)
+    assert slow.is_set()
+    stats = reader.stats()
+    assert (stats['hedges'], stats['hedge_wins']) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_delay_sampled_from_completed_first_attempts():
+    """Test that only first attempts that complete are sampled, with their own latency."""
+    reader = HedgedReader(min_delay=0.01, max_ratio=1.0)
+    await _warm_up(reader)
+    samples = list(reader._samples)
+
+    # The hedge wins and the first attempt is cancelled: nothing is sampled
+    assert await reader.read(lambda: _answer('first', 1), lambda: _answer('second')) == 'second'
+    assert list(reader._samples) == samples
+
+    # The first attempt wins after a failed hedge: its own latency is sampled
+    assert await reader.read(lambda: _answer('first', 0.03), _fail) == 'first'
+    assert len(reader._samples) == len(samples) + 1
+    assert reader._samples[-1] >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_failed_attempt_does_not_win():
+    """Test that an error from one attempt waits for the other, and is raised if both fail."""
+    reader = HedgedReader(min_delay=0.01, max_ratio=1.0)
+    await _warm_up(reader)
+
+    assert await reader.read(lambda: _answer('first', 0.03), _fail) == 'first'
+
+    async def slow_fail():
+        await asyncio.sleep(0.02)
+        raise ConnectionError('replica down')
+
+    with pytest.raises(ConnectionError):
+        await reader.read(slow_fail, _fail)
+
+
+@pytest.mark.asyncio
+async def test_hedge_rate_capped():
+    """Test that hedges stay within the configured share of reads when every read is slow."""
+    reader = HedgedReader(min_delay=0.001, max_ratio=0.05)
+    await _warm_up(reader)
+
+    for _ in range(20):
+        await reader.read(lambda: _answer('first', 0.003), lambda: _answer('second', 0.003))
+
+    stats = reader.stats()
+    # 120 reads earn at most six hedges
+    assert 5 <= stats['hedges'] <= 6
+    assert stats['hedges'] + stats['hedges_denied'] == 20
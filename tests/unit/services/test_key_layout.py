@@ -0,0 +1,157 @@
+import hashlib
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from services.key_layout import (
+    CONTENT_ADDRESS_PREFIX,
+    CONTENT_WRITE_SCRIPT,
+    HASH_BUCKET_PREFIX,
+    ContentKeyLayout,
+    HashKeyLayout,
+    StringKeyLayout,
+    _script_sha,
+)
+
+
+def _mock_pipeline_redis(results):
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results)
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=pipe)
+    context.__aexit__ = AsyncMock(return_value=False)
+    mock_redis = MagicMock()
+    mock_redis.pipeline.return_value = context
+    return mock_redis, pipe
+
+
+@pytest.mark.parametrize('phone_number', ['+12025550100', '+79123456789', '89123456705', '+12'])
+def test_hash_layout_locate_round_trip(phone_number):
+    """Test that every phone number maps to a one-character field and back."""
+    bucket, field = HashKeyLayout.locate(phone_number)
+
+    assert bucket.startswith(HASH_BUCKET_PREFIX)
+    assert len(field) == 1
+    assert HashKeyLayout.phone_number(bucket, field) == phone_number
+
+
+def test_hash_layout_groups_up_to_100_numbers_per_bucket():
+    """Test that numbers differing only in their last two digits share a bucket."""
+    buckets = {HashKeyLayout.locate(f'+120255501{n:02d}')[0] for n in range(100)}
+    assert buckets == {f'{HASH_BUCKET_PREFIX}+120255501'}
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_mget_uses_one_hmget_per_bucket():
+    """Test that a batch read sends one HMGET per bucket and keeps the request order."""
+    mock_redis, pipe = _mock_pipeline_redis([['A St', None], ['B St']])
+    layout = HashKeyLayout()
+
+    values = await layout.mget(mock_redis, ['+12025550100', '+79123456789', '+12025550101'])
+
+    assert values == ['A St', 'B St', None]
+    assert pipe.hmget.call_count == 2
+    pipe.hmget.assert_any_call(f'{HASH_BUCKET_PREFIX}+120255501', ['\x00', '\x01'])
+
+
+def test_hash_layout_write_commands():
+    """Test the hash commands each write is mapped to."""
+    client = MagicMock()
+    layout = HashKeyLayout()
+    bucket = f'{HASH_BUCKET_PREFIX}+120255501'
+
+    layout.create(client, '+12025550142', 'value')
+    layout.upsert(client, '+12025550142', 'value')
+    layout.delete(client, '+12025550142')
+
+    client.hsetnx.assert_called_once_with(bucket, '*', 'value')
+    client.hset.assert_called_once_with(bucket, '*', 'value')
+    client.hdel.assert_called_once_with(bucket, '*')
+    assert layout.upsert_created(1) and not layout.upsert_created(0)
+    assert layout.cas_target('+12025550142') == ([bucket], ['*'])
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_scan_expands_bucket_fields():
+    """Test that a SCAN step returns the records of every bucket found."""
+    mock_redis, pipe = _mock_pipeline_redis([{'\x00': 'A St', '\x07': 'B St'}])
+    mock_redis.scan = AsyncMock(return_value=(0, [f'{HASH_BUCKET_PREFIX}+120255501']))
+
+    cursor, records = await HashKeyLayout().scan(mock_redis, 0, 100)
+
+    assert cursor == 0
+    assert records == [('+12025550100', 'A St'), ('+12025550107', 'B St')]
+    assert mock_redis.scan.call_args.kwargs == {'match': f'{HASH_BUCKET_PREFIX}*', 'count': 100}
+
+
+def test_phone_numbers_for_key():
+    """Test which phone numbers a changed key may concern in each layout."""
+    assert StringKeyLayout().phone_numbers_for_key('+12025550100') == ['+12025550100']
+    assert StringKeyLayout().phone_numbers_for_key(f'{CONTENT_ADDRESS_PREFIX}abc') == []
+
+    candidates = HashKeyLayout().phone_numbers_for_key(f'{HASH_BUCKET_PREFIX}+120255501')
+    assert len(candidates) == 100
+    assert candidates[0] == '+12025550100'
+    assert candidates[-1] == '+12025550199'
+    assert HashKeyLayout().phone_numbers_for_key('+12025550100') == []
+
+
+@pytest.mark.asyncio
+async def test_string_layout_scan_skips_non_phone_keys():
+    """Test that only phone number keys are returned by the string layout SCAN."""
+    mock_redis = AsyncMock()
+    mock_redis.scan.return_value = (0, ['+12025550100', 'addrex:meta'])
+
+    batches = [batch async for batch in StringKeyLayout().scan_phone_numbers(mock_redis)]
+
+    assert batches == [['+12025550100']]
+
+
+def test_content_layout_writes_pass_the_content_hash():
+    """Test that content layout writes run the write script keyed by the SHA1 of the value."""
+    mock_redis = MagicMock()
+    layout = ContentKeyLayout()
+
+    layout.upsert(mock_redis, '+12025550100', b'\x02value')
+
+    mock_redis.evalsha.assert_called_once_with(
+        _script_sha(CONTENT_WRITE_SCRIPT),
+        1,
+        '+12025550100',
+        'upsert',
+        hashlib.sha1(b'\x02value').hexdigest(),
+        b'\x02value',
+    )
+
+
+def test_content_layout_writes_binary_values_read_back_as_str():
+    """Test that a binary value read through decode_responses is stored, and hashed, as its original bytes."""
+    mock_redis = MagicMock()
+    value = b'\x02\x82\x01value'
+
+    ContentKeyLayout().update(mock_redis, '+12025550100', value.decode('utf-8', 'surrogateescape'))
+
+    assert mock_redis.evalsha.call_args.args[-2:] == (hashlib.sha1(value).hexdigest(), value)
+
+
+@pytest.mark.asyncio
+async def test_content_layout_mget_fetches_each_shared_value_once():
+    """Test that a batch read resolves content hashes and fetches each distinct value once."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = [['h1', None, 'h1', 'h2'], ['A St', 'B St']]
+
+    values = await ContentKeyLayout().mget(mock_redis, ['+1', '+2', '+3', '+4'])
+
+    assert values == ['A St', None, 'A St', 'B St']
+    assert mock_redis.mget.call_args.args[0] == [f'{CONTENT_ADDRESS_PREFIX}h1', f'{CONTENT_ADDRESS_PREFIX}h2']
+
+
+@pytest.mark.asyncio
+async def test_shared_phone_numbers_needs_content_layout():
+    """Test that reverse lookups are sorted in the content layout and unsupported elsewhere."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = ['+12025550102', '+12025550100']
+
+    assert await ContentKeyLayout().shared_phone_numbers(mock_redis, '+12025550100') == ['+12025550100', '+12025550102']
+    with pytest.raises(NotImplementedError):
+        await StringKeyLayout().shared_phone_numbers(mock_redis, '+12025550100')
@@ -0,0 +1,85 @@
+import pytest
+
+from services.negative_lookup_filter import CountingBloomFilter, NegativeLookupFilter
+
+
+async def _batches(*batches):
+    """Yield phone number batches as a key layout's SCAN would."""
+    for batch in batches:
+        yield batch
+
+
+def test_counting_bloom_filter_add_and_remove():
+    """Test that removed members are no longer reported while others remain."""
+    bloom = CountingBloomFilter(capacity=100, error_rate=0.01)
+    bloom.add('+1000000001')
+    bloom.add('+1000000002')
+
+    bloom.remove('+1000000001')
+
+    assert '+1000000001' not in bloom
+    assert '+1000000002' in bloom
+
+
+def test_counting_bloom_filter_false_positive_rate_within_target():
+    """Test that a filter filled to capacity stays close to its target error rate."""
+    bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+    for number in range(1000):
+        bloom.add(f'+1{number:010d}')
+
+    false_positives = sum(f'+2{number:010d}' in bloom for number in range(10000))
+
+    assert false_positives / 10000 < 0.02
+    assert bloom.false_positive_rate() < 0.02
+
+
+def test_filter_reports_maybe_until_built():
+    """Test that every number may be present before the first build."""
+    key_filter = NegativeLookupFilter(capacity=100)
+
+    assert key_filter.might_contain('+1000000001')
+    assert key_filter.stats()['ready'] is False
+
+
+@pytest.mark.asyncio
+async def test_build_adds_scanned_phone_numbers():
+    """Test that a build adds every phone number from the SCAN."""
+    key_filter = NegativeLookupFilter(capacity=100)
+
+    added = await key_filter.build(_batches(['+1000000001'], ['+1000000002']))
+
+    assert added == 2
+    assert key_filter.might_contain('+1000000001')
+    assert key_filter.might_contain('+1000000002')
+    assert not key_filter.might_contain('+1000000003')
+    stats = key_filter.stats()
+    assert stats['ready'] is True
+    assert stats['definite_misses'] == 1
+    assert stats['memory_bytes'] == 959
+
+
+@pytest.mark.asyncio
+async def test_writes_during_build_survive_the_swap():
+    """Test that numbers added while the SCAN runs are in the rebuilt filter."""
+    key_filter = NegativeLookupFilter(capacity=100)
+
+    async def scan():
+        key_filter.add('+1000000009')
+        yield ['+1000000001']
+
+    await key_filter.build(scan())
+
+    assert key_filter.might_contain('+1000000009')
+
+
+@pytest.mark.asyncio
+async def test_remove_ignored_while_suspended():
+    """Test that removals are skipped until the filter has been rebuilt."""
+    key_filter = NegativeLookupFilter(capacity=100)
+    await key_filter.build(_batches(['+1000000001']))
+    key_filter.suspend()
+
+    key_filter.remove('+1000000001')
+    await key_filter.build(_batches(['+1000000001']))
+
+    assert key_filter.might_contain('+1000000001')
@@ -1,8 +1,23 @@
-from unittest.mock import AsyncMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
-
-from services.phonebook_service import PhoneBookService
+from redis.exceptions import NoScriptError
+
+from services.address_cache import AddressCache
+from services.hedged_reads import MIN_SAMPLES, HedgedReader
+from services.key_layout import CAS_UPDATE_SCRIPT, HASH_UPDATE_SCRIPT, HashKeyLayout
+from services.negative_lookup_filter import NegativeLookupFilter
+from services.phonebook_service import (
+    PhoneBookService,
+    WriteOp,
+    WriteOperation,
+    WriteStatus,
+    address_version,
+)
+from services.read_batcher import ReadBatcher
+from services.single_flight import SingleFlight
+from services.storage_codec import StorageCodec
 
 
 @pytest.mark.asyncio
@@ -10,8 +25,7 @@ async def test_create_address_success():
     """Test creating a new address successfully when phone number doesn't exist."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = None  # Phone doesn't exist
-    mock_redis.set.return_value = True
+    mock_redis.set.return_value = True  # SET NX wrote the key
 
     service = PhoneBookService(mock_redis)
     result = await service.create_address(
@@ -26,9 +40,10 @@ async def test_create_address_success():
         }
     )
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+1234567890")
+    assert result is WriteStatus.CREATED
+    mock_redis.get.assert_not_called()
     mock_redis.set.assert_called_once()
+    assert mock_redis.set.call_args.kwargs == {"nx": True}
 
 
 @pytest.mark.asyncio
@@ -36,7 +51,7 @@ async def test_create_address_conflict():
     """Test creating an address when the phone number already exists."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = '{"street": "Old St", "city": "Oldtown", "state_province": "OLD", "postal_code": "OLD00", "country": "US", "formatted_address": "Old St, Oldtown, OLD OLD00, US"}'  # Phone already exists
+    mock_redis.set.return_value = None  # SET NX skipped the write, phone already exists
 
     service = PhoneBookService(mock_redis)
     result = await service.create_address(
@@ -51,10 +66,10 @@ async def test_create_address_conflict():
         }
     )
 
-    assert result is False  # Should return False when phone already exists
-    mock_redis.get.assert_called_once_with("+1234567890")
-    # set should not have been called since phone already exists
-    mock_redis.set.assert_not_called()
+    assert result is WriteStatus.CONFLICT
+    # The existence check is part of the single SET NX round trip
+    mock_redis.get.assert_not_called()
+    mock_redis.set.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -62,8 +77,7 @@ async def test_create_address_with_russian_format():
     """Test creating an address with Russian phone format."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = None  # Phone doesn't exist
-    mock_redis.set.return_value = True
+    mock_redis.set.return_value = True  # SET NX wrote the key
 
     service = PhoneBookService(mock_redis)
     result = await service.create_address(
@@ -78,9 +92,8 @@ async def test_create_address_with_russian_format():
         }
     )
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+79123456789")
-    mock_redis.set.assert_called_once()
+    assert result is WriteStatus.CREATED
+    assert mock_redis.set.call_args.args[0] == "+79123456789"
 
 
 @pytest.mark.asyncio
@@ -88,8 +101,7 @@ async def test_update_address_success():
     """Test updating an existing address successfully."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = '{"street": "Old St", "city": "Oldtown", "state_province": "OLD", "postal_code": "OLD00", "country": "US", "formatted_address": "Old St, Oldtown, OLD OLD00, US"}'  # Phone exists
-    mock_redis.set.return_value = True
+    mock_redis.set.return_value = True  # SET XX wrote the existing key
 
     service = PhoneBookService(mock_redis)
     result = await service.update_address(
@@ -104,9 +116,10 @@ async def test_update_address_success():
         }
     )
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+1234567890")
+    assert result is WriteStatus.UPDATED
+    mock_redis.get.assert_not_called()
     mock_redis.set.assert_called_once()
+    assert mock_redis.set.call_args.kwargs == {"xx": True}
 
 
 @pytest.mark.asyncio
@@ -114,7 +127,7 @@ async def test_update_address_not_found():
     """Test updating an address when the phone number doesn't exist."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = None  # Phone doesn't exist
+    mock_redis.set.return_value = None  # SET XX skipped the write, phone doesn't exist
 
     service = PhoneBookService(mock_redis)
     result = await service.update_address(
@@ -129,10 +142,9 @@ async def test_update_address_not_found():
         }
     )
 
-    assert result is False  # Should return False when phone doesn't exist
-    mock_redis.get.assert_called_once_with("+1234567890")
-    # set should not have been called since phone doesn't exist
-    mock_redis.set.assert_not_called()
+    assert result is WriteStatus.NOT_FOUND
+    mock_redis.get.assert_not_called()
+    mock_redis.set.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -140,7 +152,6 @@ async def test_update_address_with_russian_format():
     """Test updating an address with Russian phone format."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = '{"street": "Старая улица, 1", "city": "СтарыйГород", "state_province": "СтараяОбл", "postal_code": "OLD01", "country": "RU", "formatted_address": "Старая улица, 1, СтарыйГород, СтараяОбл OLD01, RU"}'  # Phone exists with Russian address
     mock_redis.set.return_value = True
 
     service = PhoneBookService(mock_redis)
@@ -156,9 +167,8 @@ async def test_update_address_with_russian_format():
         }
     )
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+79123456789")
-    mock_redis.set.assert_called_once()
+    assert result is WriteStatus.UPDATED
+    assert mock_redis.set.call_args.args[0] == "+79123456789"
 
 
 @pytest.mark.asyncio
@@ -166,14 +176,13 @@ async def test_delete_address_success():
     """Test deleting an existing address successfully."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = '{"street": "Old St", "city": "Oldtown", "state_province": "OLD", "postal_code": "OLD00", "country": "US", "formatted_address": "Old St, Oldtown, OLD OLD00, US"}'  # Phone exists
     mock_redis.delete.return_value = 1  # Simulate successful deletion
 
     service = PhoneBookService(mock_redis)
     result = await service.delete_address("+1234567890")
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+1234567890")
+    assert result is WriteStatus.DELETED
+    mock_redis.get.assert_not_called()
     mock_redis.delete.assert_called_once_with("+1234567890")
 
 
@@ -182,15 +191,14 @@ async def test_delete_address_not_found():
     """Test deleting an address when the phone number doesn't exist."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = None  # Phone doesn't exist
+    mock_redis.delete.return_value = 0  # No key removed, phone doesn't exist
 
     service = PhoneBookService(mock_redis)
     result = await service.delete_address("+1234567890")
 
-    assert result is False  # Should return False when phone doesn't exist
-    mock_redis.get.assert_called_once_with("+1234567890")
-    # delete should not have been called since phone doesn't exist
-    mock_redis.delete.assert_not_called()
+    assert result is WriteStatus.NOT_FOUND
+    mock_redis.get.assert_not_called()
+    mock_redis.delete.assert_called_once_with("+1234567890")
 
 
 @pytest.mark.asyncio
@@ -198,12 +206,569 @@ async def test_delete_address_with_russian_format():
     """Test deleting an address with Russian phone format."""
     # Mock the Redis client
     mock_redis = AsyncMock()
-    mock_redis.get.return_value = '{"street": "Старая улица, 1", "city": "СтарыйГород", "state_province": "СтараяОбл", "postal_code": "OLD01", "country": "RU", "formatted_address": "Старая улица, 1, СтарыйГород, СтараяОбл OLD01, RU"}'  # Phone exists with Russian address
     mock_redis.delete.return_value = 1  # Simulate successful deletion
 
     service = PhoneBookService(mock_redis)
     result = await service.delete_address("+79123456789")
 
-    assert result is True
-    mock_redis.get.assert_called_once_with("+79123456789")
+    assert result is WriteStatus.DELETED
     mock_redis.delete.assert_called_once_with("+79123456789")
+
+
+@pytest.mark.asyncio
+async def test_get_versioned_address():
+    """Test that the version tag is the SHA1 of the stored value."""
+    stored = '{"street": "Old St", "city": "Oldtown", "state_province": "OLD", "postal_code": "OLD00", "country": "US", "formatted_address": "Old St, Oldtown, OLD OLD00, US"}'
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = stored
+
+    service = PhoneBookService(mock_redis)
+    address, version = await service.get_versioned_address("+1234567890")
+
+    assert address["street"] == "Old St"
+    assert version == address_version(stored)
+    assert version == address_version(stored.encode())
+
+
+@pytest.mark.asyncio
+async def test_get_tagged_address_caches_version():
+    """Test that a tagged lookup caches the version, and refetches an entry cached without one."""
+    stored = '{"street": "Old St"}'
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = stored
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set("+1234567890", {"street": "Old St"})
+
+    service = PhoneBookService(mock_redis, cache=cache)
+    assert await service.get_tagged_address("+1234567890") == ({"street": "Old St"}, address_version(stored))
+    assert await service.get_tagged_address("+1234567890") == ({"street": "Old St"}, address_version(stored))
+
+    mock_redis.get.assert_called_once_with("+1234567890")
+
+
+@pytest.mark.asyncio
+async def test_update_address_compare_and_set():
+    """Test that a versioned update runs the CAS script in one round trip."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = 1
+
+    service = PhoneBookService(mock_redis)
+    result = await service.update_address("+1234567890", {"street": "123 Main St"}, expected_version="abc")
+
+    assert result is WriteStatus.UPDATED
+    mock_redis.get.assert_not_called()
+    mock_redis.set.assert_not_called()
+    args = mock_redis.evalsha.call_args.args
+    assert args[1:4] == (1, "+1234567890", "abc")
+
+
+@pytest.mark.asyncio
+async def test_update_address_compare_and_set_statuses():
+    """Test mapping of CAS script results to write statuses."""
+    mock_redis = AsyncMock()
+    service = PhoneBookService(mock_redis)
+
+    mock_redis.evalsha.return_value = 0
+    assert await service.update_address("+1234567890", {}, expected_version="abc") is WriteStatus.NOT_FOUND
+
+    mock_redis.evalsha.return_value = -1
+    assert await service.update_address("+1234567890", {}, expected_version="abc") is WriteStatus.VERSION_MISMATCH
+
+
+@pytest.mark.asyncio
+async def test_compare_and_set_loads_missing_script():
+    """Test that the CAS script falls back to EVAL when the server has not cached it."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = NoScriptError("NOSCRIPT")
+    mock_redis.eval.return_value = 1
+
+    service = PhoneBookService(mock_redis)
+    result = await service.update_address("+1234567890", {}, expected_version="abc")
+
+    assert result is WriteStatus.UPDATED
+    assert mock_redis.eval.call_args.args[0] == CAS_UPDATE_SCRIPT
+
+
+@pytest.mark.asyncio
+async def test_delete_address_compare_and_set():
+    """Test versioned deletes report version mismatches."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.return_value = -1
+
+    service = PhoneBookService(mock_redis)
+    result = await service.delete_address("+1234567890", expected_version="abc")
+
+    assert result is WriteStatus.VERSION_MISMATCH
+    mock_redis.delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_single_mget():
+    """Test that a batch lookup uses one MGET and deduplicates phone numbers."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = ['{"street": "123 Main St"}', None]
+
+    service = PhoneBookService(mock_redis)
+    result = await service.get_addresses(["+1234567890", "+79123456789", "+1234567890"])
+
+    assert result == {"+1234567890": {"street": "123 Main St"}, "+79123456789": None}
+    mock_redis.mget.assert_called_once_with(["+1234567890", "+79123456789"])
+    mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_chunks_mget():
+    """Test that large batches are split into one MGET per chunk."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = lambda keys: [None] * len(keys)
+
+    service = PhoneBookService(mock_redis)
+    phones = [f"+1555000{i:04d}" for i in range(5)]
+    result = await service.get_addresses(phones, chunk_size=2)
+
+    assert list(result) == phones
+    assert [call.args[0] for call in mock_redis.mget.call_args_list] == [phones[0:2], phones[2:4], phones[4:5]]
+
+
+def _mock_pipeline_redis(results_per_pipeline: list[list]):
+    """Return a Redis mock whose pipelines return the given results, one list per pipeline."""
+    mock_redis = MagicMock()
+    pipes = []
+    for results in results_per_pipeline:
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=results)
+        pipes.append(pipe)
+    contexts = []
+    for pipe in pipes:
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=pipe)
+        context.__aexit__ = AsyncMock(return_value=False)
+        contexts.append(context)
+    mock_redis.pipeline.side_effect = contexts
+    return mock_redis, pipes
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_statuses():
+    """Test that bulk writes map pipeline replies to per-operation statuses."""
+    mock_redis, (pipe,) = _mock_pipeline_redis([[True, None, True, None, 1, 0]])
+    operations = [
+        WriteOperation(WriteOp.CREATE, "+1234567890", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.CREATE, "+1234567891", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.UPDATE, "+1234567892", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.UPDATE, "+1234567893", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.DELETE, "+1234567894"),
+        WriteOperation(WriteOp.DELETE, "+1234567895"),
+    ]
+
+    service = PhoneBookService(mock_redis)
+    result = await service.bulk_write(operations)
+
+    assert result == [
+        WriteStatus.CREATED,
+        WriteStatus.CONFLICT,
+        WriteStatus.UPDATED,
+        WriteStatus.NOT_FOUND,
+        WriteStatus.DELETED,
+        WriteStatus.NOT_FOUND,
+    ]
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.set.call_args_list[0].kwargs == {"nx": True}
+    assert pipe.set.call_args_list[2].kwargs == {"xx": True}
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_keeps_same_phone_in_one_chunk():
+    """Test that chunking never splits operations on one phone number across pipelines."""
+    mock_redis, (first, second) = _mock_pipeline_redis([[True, True, 1], [True]])
+    operations = [
+        WriteOperation(WriteOp.CREATE, "+1234567890", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.CREATE, "+1234567891", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.CREATE, "+1234567892", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.DELETE, "+1234567890"),
+    ]
+
+    service = PhoneBookService(mock_redis)
+    result = await service.bulk_write(operations, chunk_size=2)
+
+    assert result == [WriteStatus.CREATED, WriteStatus.CREATED, WriteStatus.CREATED, WriteStatus.DELETED]
+    # The delete of +1234567890 joins the first chunk, behind its create
+    first.delete.assert_called_once_with("+1234567890")
+    second.delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_upsert_statuses():
+    """Test that upserts report created or updated from the previous value returned by SET GET."""
+    mock_redis, (pipe,) = _mock_pipeline_redis([[None, '{"street": "Old St"}']])
+    operations = [
+        WriteOperation(WriteOp.UPSERT, "+1234567890", {"street": "123 Main St"}),
+        WriteOperation(WriteOp.UPSERT, "+1234567891", {"street": "123 Main St"}),
+    ]
+
+    service = PhoneBookService(mock_redis)
+    result = await service.bulk_write(operations)
+
+    assert result == [WriteStatus.CREATED, WriteStatus.UPDATED]
+    assert pipe.set.call_args.kwargs == {"get": True}
+
+
+@pytest.mark.asyncio
+async def test_scan_addresses_batches():
+    """Test that SCAN batches are fetched with one MGET each and non-phone keys are skipped."""
+    mock_redis = AsyncMock()
+    mock_redis.scan.side_effect = [(17, ["+1234567890", "addrex:meta"]), (0, ["+79123456789", "+1234567891"])]
+    mock_redis.mget.side_effect = [['{"street": "A St"}'], ['{"street": "B St"}', None]]
+
+    service = PhoneBookService(mock_redis)
+    batches = [batch async for batch in service.scan_addresses(batch_size=2)]
+
+    assert batches == [
+        (17, [("+1234567890", {"street": "A St"})]),
+        (0, [("+79123456789", {"street": "B St"})]),
+    ]
+    assert [call.args for call in mock_redis.scan.call_args_list] == [(0,), (17,)]
+    assert mock_redis.scan.call_args.kwargs == {"count": 2}
+    assert mock_redis.mget.call_args_list[0].args[0] == ["+1234567890"]
+
+
+@pytest.mark.asyncio
+async def test_get_address_read_through_cache():
+    """Test that a cached address is served without a Redis round trip."""
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = '{"street": "123 Main St"}'
+    cache = AddressCache(max_size=10, ttl=60)
+
+    service = PhoneBookService(mock_redis, cache=cache)
+    first = await service.get_address("+1234567890")
+    second = await service.get_address("+1234567890")
+
+    assert first == second == {"street": "123 Main St"}
+    mock_redis.get.assert_called_once_with("+1234567890")
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cache():
+    """Test that create, update, delete and bulk writes invalidate cached entries."""
+    mock_redis = AsyncMock()
+    mock_redis.set.return_value = True
+    mock_redis.delete.return_value = 1
+    cache = AddressCache(max_size=10, ttl=60)
+    service = PhoneBookService(mock_redis, cache=cache)
+
+    for write in (
+        service.create_address("+1234567890", {"street": "New St"}),
+        service.update_address("+1234567890", {"street": "New St"}),
+        service.delete_address("+1234567890"),
+    ):
+        cache.set("+1234567890", {"street": "Old St"})
+        await write
+        assert cache.get("+1234567890") is None
+
+    mock_pipe_redis, _ = _mock_pipeline_redis([[True]])
+    service = PhoneBookService(mock_pipe_redis, cache=cache)
+    cache.set("+1234567890", {"street": "Old St"})
+    await service.bulk_write([WriteOperation(WriteOp.UPDATE, "+1234567890", {"street": "New St"})])
+    assert cache.get("+1234567890") is None
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_uses_cache():
+    """Test that batch lookups only MGET the numbers missing from the cache."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = ['{"street": "B St"}']
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set("+1234567890", {"street": "A St"})
+
+    service = PhoneBookService(mock_redis, cache=cache)
+    result = await service.get_addresses(["+1234567890", "+1234567891"])
+
+    assert result == {"+1234567890": {"street": "A St"}, "+1234567891": {"street": "B St"}}
+    mock_redis.mget.assert_called_once_with(["+1234567891"])
+    assert cache.get("+1234567891") == {"street": "B St"}
+
+
+async def _built_filter(phone_numbers):
+    async def scan():
+        yield phone_numbers
+
+    key_filter = NegativeLookupFilter(capacity=100)
+    await key_filter.build(scan())
+    return key_filter
+
+
+@pytest.mark.asyncio
+async def test_get_address_definite_miss_skips_redis():
+    """Test that numbers absent from the negative-lookup filter never reach Redis."""
+    mock_redis = AsyncMock()
+    service = PhoneBookService(mock_redis, key_filter=await _built_filter(["+1234567890"]))
+
+    assert await service.get_address("+1234567891") is None
+    mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_addresses_skips_definite_misses():
+    """Test that batch lookups only MGET numbers the filter may contain."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = ['{"street": "A St"}']
+    service = PhoneBookService(mock_redis, key_filter=await _built_filter(["+1234567890"]))
+
+    result = await service.get_addresses(["+1234567890", "+1234567891"])
+
+    assert result == {"+1234567890": {"street": "A St"}, "+1234567891": None}
+    mock_redis.mget.assert_called_once_with(["+1234567890"])
+
+
+@pytest.mark.asyncio
+async def test_created_numbers_added_to_filter():
+    """Test that numbers created through the service are immediately readable."""
+    mock_redis = AsyncMock()
+    mock_redis.set.return_value = True
+    key_filter = await _built_filter([])
+    service = PhoneBookService(mock_redis, key_filter=key_filter)
+
+    await service.create_address("+1234567890", {"street": "New St"})
+
+    assert key_filter.might_contain("+1234567890")
+
+    mock_pipe_redis, _ = _mock_pipeline_redis([[None]])
+    service = PhoneBookService(mock_pipe_redis, key_filter=key_filter)
+    await service.bulk_write([WriteOperation(WriteOp.UPSERT, "+1234567891", {"street": "New St"})])
+
+    assert key_filter.might_contain("+1234567891")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_address_coalesced():
+    """Test that concurrent lookups of one number issue a single GET."""
+    release = asyncio.Event()
+
+    async def slow_get(key):
+        await release.wait()
+        return '{"street": "123 Main St"}'
+
+    mock_redis = AsyncMock()
+    mock_redis.get.side_effect = slow_get
+    service = PhoneBookService(mock_redis, single_flight=SingleFlight())
+
+    lookups = [asyncio.create_task(service.get_address("+1234567890")) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*lookups)
+
+    assert results == [{"street": "123 Main St"}] * 10
+    mock_redis.get.assert_called_once_with("+1234567890")
+
+
+@pytest.mark.asyncio
+async def test_write_detaches_in_flight_lookup():
+    """Test that a lookup after a write does not reuse a GET issued before it."""
+    release = asyncio.Event()
+    values = iter(['{"street": "Old St"}', '{"street": "New St"}'])
+
+    async def slow_get(key):
+        value = next(values)
+        await release.wait()
+        return value
+
+    mock_redis = AsyncMock()
+    mock_redis.get.side_effect = slow_get
+    mock_redis.set.return_value = True
+    service = PhoneBookService(mock_redis, single_flight=SingleFlight())
+
+    before = asyncio.create_task(service.get_address("+1234567890"))
+    await asyncio.sleep(0)
+    await service.update_address("+1234567890", {"street": "New St"})
+    after = asyncio.create_task(service.get_address("+1234567890"))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await before == {"street": "Old St"}
+    assert await after == {"street": "New St"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_address_batched():
+    """Test that lookups of different numbers from concurrent requests share one MGET."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = ['{"street": "A St"}', None]
+    service = PhoneBookService(mock_redis, read_batcher=ReadBatcher())
+
+    results = await asyncio.gather(service.get_address("+1234567890"), service.get_address("+1234567891"))
+
+    assert results == [{"street": "A St"}, None]
+    mock_redis.mget.assert_called_once_with(["+1234567890", "+1234567891"])
+    mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_binary_codec_write_and_read():
+    """Test that the configured codec encodes writes and decodes reads."""
+    mock_redis = AsyncMock()
+    mock_redis.set.return_value = True
+    service = PhoneBookService(mock_redis, codec=StorageCodec(storage_format="binary"))
+    address = {
+        "street": "123 Main St",
+        "city": "Anytown",
+        "state_province": "NY",
+        "postal_code": "12345",
+        "country": "US",
+        "formatted_address": "123 Main St, Anytown, NY 12345, US",
+    }
+
+    await service.create_address("+1234567890", address)
+    stored = mock_redis.set.call_args.args[1]
+    assert isinstance(stored, bytes)
+
+    # A decode_responses client with surrogateescape returns binary values as str
+    mock_redis.get.return_value = stored.decode("utf-8", "surrogateescape")
+    assert await service.get_address("+1234567890") == address
+    _, version = await service.get_versioned_address("+1234567890")
+    assert version == address_version(stored)
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_update_loads_script_once_missing():
+    """Test that a hash layout update loads its script when the server does not have it."""
+    mock_redis = AsyncMock()
+    mock_redis.evalsha.side_effect = [NoScriptError("No matching script"), 1]
+    service = PhoneBookService(mock_redis, layout=HashKeyLayout())
+
+    result = await service.update_address("+12025550100", {"street": "New St"})
+
+    assert result is WriteStatus.UPDATED
+    mock_redis.script_load.assert_awaited_once_with(HASH_UPDATE_SCRIPT)
+    assert mock_redis.evalsha.call_args.args[2:4] == ("addrex:h:+120255501", "\x00")
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_bulk_upsert_statuses():
+    """Test that HSET results map to created and updated statuses."""
+    mock_redis, pipes = _mock_pipeline_redis([[1, 0]])
+    mock_redis.script_load = AsyncMock()
+    service = PhoneBookService(mock_redis, layout=HashKeyLayout())
+
+    statuses = await service.bulk_write(
+        [
+            WriteOperation(WriteOp.UPSERT, "+12025550100", {"street": "A St"}),
+            WriteOperation(WriteOp.UPSERT, "+12025550101", {"street": "B St"}),
+        ]
+    )
+
+    assert statuses == [WriteStatus.CREATED, WriteStatus.UPDATED]
+    mock_redis.script_load.assert_awaited_once_with(HASH_UPDATE_SCRIPT)
+    assert pipes[0].hset.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_interned_codec_resolves_components_once_per_worker():
+    """Test that writes intern components first and reads in another worker load them in one batch."""
+    address = {
+        "street": "123 Main St",
+        "city": "Anytown",
+        "state_province": "NY",
+        "postal_code": "12345",
+        "country": "US",
+        "formatted_address": "123 Main St, Anytown, NY 12345, US",
+    }
+    writer_redis = AsyncMock()
+    writer_redis.evalsha.return_value = [1, 2, 3]
+    writer_redis.set.return_value = True
+    writer = PhoneBookService(writer_redis, codec=StorageCodec(storage_format="interned"))
+
+    await writer.create_address("+1234567890", address)
+    await writer.create_address("+1234567891", address)
+    writer_redis.evalsha.assert_awaited_once()
+    stored = writer_redis.set.call_args.args[1]
+    assert b"Anytown" not in stored
+
+    reader_redis = AsyncMock()
+    reader_redis.mget.return_value = [stored.decode("utf-8", "surrogateescape")] * 2
+    reader_redis.hmget.return_value = ["Anytown", "NY", "US"]
+    reader = PhoneBookService(reader_redis, codec=StorageCodec())
+
+    addresses = await reader.get_addresses(["+1234567890", "+1234567891"])
+
+    assert addresses == {"+1234567890": address, "+1234567891": address}
+    reader_redis.hmget.assert_awaited_once()
+    assert reader_redis.hmget.call_args.args[1] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_reads_use_read_client_and_writes_primary():
+    """Test that lookups go to the read client and writes to the primary, which reports them."""
+    primary = AsyncMock()
+    primary.set.return_value = True
+    replica = AsyncMock()
+    replica.get.return_value = '{"street": "A St"}'
+    replica.mget.return_value = ['{"street": "A St"}']
+    writes = []
+
+    service = PhoneBookService(primary, read_client=replica, on_write=lambda: writes.append(True))
+    assert await service.get_address("+1234567890") == {"street": "A St"}
+    assert await service.get_addresses(["+1234567890"]) == {"+1234567890": {"street": "A St"}}
+    assert await service.create_address("+1234567891", {"street": "B St"}) is WriteStatus.CREATED
+    primary.set.return_value = None
+    assert await service.create_address("+1234567891", {"street": "B St"}) is WriteStatus.CONFLICT
+
+    primary.get.assert_not_called()
+    primary.mget.assert_not_called()
+    replica.set.assert_not_called()
+    assert writes == [True]
+
+
+@pytest.mark.asyncio
+async def test_lagging_replica_reads_not_cached():
+    """Test that a replica returning an older value after an invalidation does not refill the cache."""
+    primary = AsyncMock()
+    primary.set.return_value = 1
+    replica = AsyncMock()
+    replica.get.return_value = '{"street": "Old St"}'
+    replica.mget.return_value = ['{"street": "Old St"}']
+    cache = AddressCache(max_size=10, ttl=60)
+
+    service = PhoneBookService(primary, cache=cache, read_client=replica)
+    assert await service.update_address("+1234567890", {"street": "New St"}) is WriteStatus.UPDATED
+    assert await service.get_address("+1234567890") == {"street": "Old St"}
+    assert await service.get_addresses(["+1234567890"]) == {"+1234567890": {"street": "Old St"}}
+    assert cache.get("+1234567890") is None
+
+    replica.get.return_value = '{"street": "New St"}'
+    assert await service.get_address("+1234567890") == {"street": "New St"}
+
+
+@pytest.mark.asyncio
+async def test_fresh_reads_bypass_cache():
+    """Test that a client pinned to the primary neither reads nor fills the cache."""
+    mock_redis = AsyncMock()
+    mock_redis.get.return_value = '{"street": "New St"}'
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set("+1234567890", {"street": "Old St"})
+
+    service = PhoneBookService(mock_redis, cache=cache, single_flight=SingleFlight(), fresh_reads=True)
+
+    assert await service.get_address("+1234567890") == {"street": "New St"}
+    assert cache.get("+1234567890") == {"street": "Old St"}
+
+
+@pytest.mark.asyncio
+async def test_get_address_hedged_to_second_replica():
+    """Test that a lookup slower than the hedge delay is answered by the hedge replica."""
+    slow_replica = AsyncMock()
+
+    async def slow_get(key):
+        await asyncio.sleep(1)
+
+    slow_replica.get.side_effect = slow_get
+    fast_replica = AsyncMock()
+    fast_replica.get.return_value = '{"street": "A St"}'
+    reader = HedgedReader(min_delay=0.01, max_ratio=1.0)
+    for _ in range(MIN_SAMPLES):
+        await reader.read(AsyncMock(), AsyncMock())
+
+    service = PhoneBookService(AsyncMock(), read_client=slow_replica, hedged_reader=reader, hedge_client=fast_replica)
+
+    assert await service.get_address("+1234567890") == {"street": "A St"}
+    assert reader.stats()["hedge_wins"] == 1
@@ -0,0 +1,73 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.read_batcher import ReadBatcher
+
+
+@pytest.mark.asyncio
+async def test_reads_in_one_tick_share_one_mget():
+    """Test that keys requested together are fetched with a single MGET."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = ['A St', None, 'C St']
+    batcher = ReadBatcher()
+
+    results = await asyncio.gather(
+        batcher.load(mock_redis, '+1000000001'),
+        batcher.load(mock_redis, '+1000000002'),
+        batcher.load(mock_redis, '+1000000003'),
+        batcher.load(mock_redis, '+1000000001'),
+    )
+
+    assert results == ['A St', None, 'C St', 'A St']
+    mock_redis.mget.assert_called_once_with(['+1000000001', '+1000000002', '+1000000003'])
+    stats = batcher.stats()
+    assert stats['batches'] == 1
+    assert stats['keys'] == 3
+    assert stats['batch_size_histogram']['4'] == 1
+
+
+@pytest.mark.asyncio
+async def test_batches_split_at_max_size():
+    """Test that a large batch is sent as several MGETs of at most max_batch_size keys."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = lambda keys: keys
+    batcher = ReadBatcher(max_batch_size=2)
+
+    results = await asyncio.gather(*(batcher.load(mock_redis, f'+100000000{n}') for n in range(5)))
+
+    assert results == [f'+100000000{n}' for n in range(5)]
+    assert [len(call.args[0]) for call in mock_redis.mget.call_args_list] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_window_collects_reads_across_ticks():
+    """Test that a positive window batches reads that arrive a few ticks apart."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = lambda keys: keys
+    batcher = ReadBatcher(window=0.01)
+
+    async def delayed_load(key):
+        await asyncio.sleep(0)
+        return await batcher.load(mock_redis, key)
+
+    await asyncio.gather(batcher.load(mock_redis, '+1000000001'), delayed_load('+1000000002'))
+
+    mock_redis.mget.assert_called_once_with(['+1000000001', '+1000000002'])
+
+
+@pytest.mark.asyncio
+async def test_mget_error_reaches_every_caller():
+    """Test that a failed MGET raises in every waiting caller."""
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = ConnectionError('Redis unavailable')
+    batcher = ReadBatcher()
+
+    results = await asyncio.gather(
+        batcher.load(mock_redis, '+1000000001'),
+        batcher.load(mock_redis, '+1000000002'),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ConnectionError) for result in results)
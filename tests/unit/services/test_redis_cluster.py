@@ -0,0 +1,57 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.asyncio.cluster import RedisCluster
+
+from services import redis_cluster
+from services.redis_cluster import NODE_CURSOR_BITS
+
+
+def _mock_cluster(*node_names):
+    client = MagicMock(spec=RedisCluster)
+    nodes = []
+    for name in node_names:
+        node = MagicMock()
+        node.name = name
+        nodes.append(node)
+    client.get_primaries.return_value = nodes
+    client.scan = AsyncMock()
+    client.mget_nonatomic = AsyncMock()
+    return client, nodes
+
+
+@pytest.mark.asyncio
+async def test_mget_groups_keys_by_slot_on_cluster():
+    """Test that a cluster MGET goes through the slot-grouping client call."""
+    client, _ = _mock_cluster('a:7000')
+    client.mget_nonatomic.return_value = ['A St', None]
+
+    assert await redis_cluster.mget(client, ['+1', '+2']) == ['A St', None]
+    client.mget_nonatomic.assert_awaited_once_with(['+1', '+2'])
+
+    single_node = AsyncMock()
+    await redis_cluster.mget(single_node, ['+1'])
+    single_node.mget.assert_awaited_once_with(['+1'])
+
+
+@pytest.mark.asyncio
+async def test_scan_keys_walks_each_primary_in_turn():
+    """Test that the packed cursor moves from one primary to the next and ends at 0."""
+    client, nodes = _mock_cluster('b:7001', 'a:7000')
+    client.scan.side_effect = [
+        ({'a:7000': 5}, ['+1']),
+        ({'a:7000': 0}, ['+2']),
+        ({'b:7001': 0}, ['+3']),
+    ]
+
+    cursor, keys = await redis_cluster.scan_keys(client, 0, 10)
+    assert (cursor, keys) == (5, ['+1'])
+    cursor, keys = await redis_cluster.scan_keys(client, cursor, 10)
+    assert (cursor, keys) == (1 << NODE_CURSOR_BITS, ['+2'])
+    cursor, keys = await redis_cluster.scan_keys(client, cursor, 10, match='addrex:h:*')
+    assert (cursor, keys) == (0, ['+3'])
+
+    targets = [call.kwargs['target_nodes'].name for call in client.scan.call_args_list]
+    assert targets == ['a:7000', 'a:7000', 'b:7001']
+    assert client.scan.call_args.args == (0,)
+    assert client.scan.call_args.kwargs['match'] == 'addrex:h:*'
@@ -0,0 +1,50 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from services.redis_pool import open_connections, pool_stats
+from services.sharding import ShardedRedis
+
+
+def test_pool_stats_reports_saturation():
+    """Test that connection usage is reported against the pool's limit."""
+    client = Redis.from_pool(BlockingConnectionPool(host='a', port=6379, max_connections=4))
+    pool = client.connection_pool
+    pool._in_use_connections.update({object(), object(), object()})
+    pool._available_connections.append(object())
+
+    assert pool_stats(client) == {'a:6379': {'in_use': 3, 'idle': 1, 'max_connections': 4, 'saturation': 0.75}}
+
+
+def test_pool_stats_without_connection_lists():
+    """Test that a redis-py pool without the expected connection lists reports no counts instead of failing."""
+    client = Redis.from_pool(BlockingConnectionPool(host='a', port=6379, max_connections=4))
+    del client.connection_pool._in_use_connections
+
+    assert pool_stats(client) == {'a:6379': {'in_use': None, 'idle': None, 'max_connections': 4, 'saturation': None}}
+
+
+def test_pool_stats_per_shard():
+    """Test that a sharded client reports one pool per shard."""
+    client = ShardedRedis(
+        {
+            'a:6379': Redis.from_pool(BlockingConnectionPool(host='a', port=6379, max_connections=10)),
+            'b:6380': Redis.from_pool(BlockingConnectionPool(host='b', port=6380, max_connections=10)),
+        }
+    )
+
+    stats = pool_stats(client)
+
+    assert list(stats) == ['a:6379', 'b:6380']
+    assert stats['b:6380']['saturation'] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_open_connections_sends_concurrent_pings():
+    """Test that warming a pool sends one concurrent PING per connection to open."""
+    client = AsyncMock()
+
+    await open_connections(client, 3)
+
+    assert client.ping.await_count == 3
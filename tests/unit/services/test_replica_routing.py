@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock
+
+from services.replica_routing import ReplicaRouter
+
+
+def test_reads_round_robin_over_replicas():
+    """Test that reads cycle through the replicas unless pinned to the primary."""
+    primary, first, second = AsyncMock(), AsyncMock(), AsyncMock()
+    router = ReplicaRouter(primary, [first, second])
+
+    assert [router.read_client() for _ in range(3)] == [first, second, first]
+    assert router.read_client(pinned=True) is primary
+    # Only reads actually sent are counted
+    assert router.stats() == {'replicas': 2, 'replica_reads': 0, 'primary_reads': 0}
+    router.record_read(first)
+    router.record_read(primary)
+    assert router.stats() == {'replicas': 2, 'replica_reads': 1, 'primary_reads': 1}
+
+
+def test_reads_use_primary_without_replicas():
+    """Test that without replicas every read goes to the primary."""
+    primary = AsyncMock()
+    router = ReplicaRouter(primary, [])
+
+    assert router.read_client() is primary
+
+
+def test_pin_window():
+    """Test that a pin holds for the window and rejects disabled, expired, garbled or far-future values."""
+    router = ReplicaRouter(AsyncMock(), [AsyncMock()], read_your_writes_window=2.0)
+    cookie = str(router.pin_deadline(now=100.0))
+
+    assert router.is_pinned(cookie, now=101.0)
+    assert not router.is_pinned(cookie, now=102.5)
+    assert not router.is_pinned(None, now=101.0)
+    assert not router.is_pinned('soon', now=101.0)
+    assert not router.is_pinned('1000000', now=101.0)
+    assert not ReplicaRouter(AsyncMock(), []).is_pinned(cookie, now=101.0)
+
+
+def test_hedge_client_is_next_replica():
+    """Test that hedged reads go to the replica after the one read from, if there is another."""
+    primary, first, second = AsyncMock(), AsyncMock(), AsyncMock()
+    router = ReplicaRouter(primary, [first, second])
+
+    assert router.hedge_client(first) is second
+    assert router.hedge_client(second) is first
+    assert router.hedge_client(primary) is None
+    assert ReplicaRouter(primary, [first]).hedge_client(first) is None
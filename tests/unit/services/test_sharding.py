@@ -0,0 +1,112 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from services.sharding import SHARD_CURSOR_BITS, HashRing, ShardedRedis, hash_key, parse_endpoints
+
+
+def _mock_shard(pipeline_results=None):
+    shard = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=pipeline_results)
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=pipe)
+    context.__aexit__ = AsyncMock(return_value=False)
+    shard.pipeline = MagicMock(return_value=context)
+    return shard, pipe
+
+
+def test_parse_endpoints():
+    """Test that comma-separated host:port lists are parsed, ignoring blanks."""
+    assert parse_endpoints('a:6379, b:6380,') == [('a', 6379), ('b', 6380)]
+    assert parse_endpoints('') == []
+
+
+def test_hash_tag_keys_share_a_shard():
+    """Test that keys with the same hash tag are always placed together."""
+    assert hash_key('addrex:{dict}:ids') == 'dict'
+    assert hash_key('+12025550100') == '+12025550100'
+    assert hash_key('odd{}key') == 'odd{}key'
+
+    ring = HashRing(['a:6379', 'b:6379', 'c:6379'])
+    assert ring.shard_for('addrex:{dict}:ids') == ring.shard_for('addrex:{dict}:strings')
+
+
+def test_adding_a_shard_only_moves_keys_to_it():
+    """Test that growing the ring from three to four shards moves about a quarter of the keys, all to the new one."""
+    keys = [f'+1202555{i:04d}' for i in range(10000)]
+    before = HashRing(['a:6379', 'b:6379', 'c:6379'])
+    after = HashRing(['a:6379', 'b:6379', 'c:6379', 'd:6379'])
+
+    moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+
+    assert {after.shard_for(key) for key in moved} == {'d:6379'}
+    assert 0.15 < len(moved) / len(keys) < 0.35
+
+
+@pytest.mark.asyncio
+async def test_mget_fans_out_per_shard_and_keeps_order():
+    """Test that a batch read sends one MGET per shard and reassembles values in request order."""
+    shards = {'a': _mock_shard()[0], 'b': _mock_shard()[0]}
+    client = ShardedRedis(shards)
+    keys = [f'+1202555{i:04d}' for i in range(20)]
+    for shard in shards.values():
+        shard.mget.side_effect = lambda shard_keys: [f'value of {key}' for key in shard_keys]
+
+    values = await client.mget(keys)
+
+    assert values == [f'value of {key}' for key in keys]
+    assert shards['a'].mget.await_count == 1
+    assert shards['b'].mget.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_single_key_commands_and_scripts_go_to_the_owning_shard():
+    """Test routing of key commands by key and of scripts by their first key."""
+    shards = {'a': _mock_shard()[0], 'b': _mock_shard()[0]}
+    client = ShardedRedis(shards)
+    key = '+12025550100'
+    owner = shards[client.ring.shard_for(key)]
+
+    await client.get(key)
+    await client.evalsha('sha', 1, key, 'arg')
+
+    owner.get.assert_awaited_once_with(key)
+    owner.evalsha.assert_awaited_once_with('sha', 1, key, 'arg')
+    with pytest.raises(AttributeError):
+        client.flushall()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_one_pipeline_per_shard():
+    """Test that queued commands are split by shard and results come back in queue order."""
+    ring = HashRing(['a', 'b'])
+    keys = [f'+1202555{i:04d}' for i in range(10)]
+    results = {name: [f'{name}:{key}' for key in keys if ring.shard_for(key) == name] for name in ('a', 'b')}
+    shard_a, pipe_a = _mock_shard(results['a'])
+    shard_b, pipe_b = _mock_shard(results['b'])
+    client = ShardedRedis({'a': shard_a, 'b': shard_b})
+
+    async with client.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.set(key, 'value', nx=True)
+        values = await pipe.execute()
+
+    assert values == [f'{ring.shard_for(key)}:{key}' for key in keys]
+    assert pipe_a.set.call_count + pipe_b.set.call_count == len(keys)
+    assert pipe_a.set.call_args.kwargs == {'nx': True}
+
+
+@pytest.mark.asyncio
+async def test_scan_walks_shards_in_turn():
+    """Test that the packed cursor moves from one shard to the next and ends at 0."""
+    shard_a, _ = _mock_shard()
+    shard_b, _ = _mock_shard()
+    shard_a.scan.side_effect = [(9, ['+1']), (0, ['+2'])]
+    shard_b.scan.return_value = (0, ['+3'])
+    client = ShardedRedis({'b': shard_b, 'a': shard_a})
+
+    assert await client.scan(0, count=10) == (9, ['+1'])
+    assert await client.scan(9, count=10) == (1 << SHARD_CURSOR_BITS, ['+2'])
+    assert await client.scan(1 << SHARD_CURSOR_BITS, count=10) == (0, ['+3'])
+    shard_b.scan.assert_awaited_once_with(0, match=None, count=10)
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_call():
+    """Test that callers for the same key share the result of a single call."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {'street': '123 Main St'}
+
+    waiters = [asyncio.create_task(single_flight.do('+1234567890', fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert results == [{'street': '123 Main St'}] * 5
+    stats = single_flight.stats()
+    assert stats['leaders'] == 1
+    assert stats['shared'] == 4
+    assert stats['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_and_not_cached():
+    """Test that every waiter sees the error and the next call starts afresh."""
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ConnectionError('Redis unavailable')
+
+    waiters = [asyncio.create_task(single_flight.do('+1234567890', fail)) for _ in range(2)]
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    async def succeed():
+        return None
+
+    assert await single_flight.do('+1234567890', succeed) is None
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    """Test that cancelling one request leaves the call running for the others."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return 'value'
+
+    first = asyncio.create_task(single_flight.do('key', fetch))
+    second = asyncio.create_task(single_flight.do('key', fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == 'value'
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_new_call():
+    """Test that callers after forget() do not join the earlier call."""
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        call_number = calls
+        await release.wait()
+        return call_number
+
+    first = asyncio.create_task(single_flight.do('key', fetch))
+    await asyncio.sleep(0)
+    single_flight.forget('key')
+    second = asyncio.create_task(single_flight.do('key', fetch))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await first == 1
+    assert await second == 2
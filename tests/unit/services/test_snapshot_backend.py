@@ -0,0 +1,183 @@
+import os
+
+import pytest
+
+from services.phonebook_service import PhoneBookService
+from services.snapshot_backend import (
+    Snapshot,
+    SnapshotBackend,
+    SnapshotWriter,
+    pack_phone_number,
+    unpack_phone_number,
+    write_snapshot,
+)
+from services.storage_backend import ReadOnlyStorageError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / 'phonebook.snapshot'
+    write_snapshot(path, [('+79123456789', b'\x01c'), ('+12025550123', b'a'), ('89123456789', '{"b": 1}')])
+    return path
+
+
+def test_pack_phone_number_round_trips_accepted_formats():
+    """Test that phone numbers with and without '+' pack to distinct keys and unpack unchanged."""
+    for phone_number in ('+12025550123', '+79123456789', '89123456789', '+1'):
+        assert unpack_phone_number(pack_phone_number(phone_number)) == phone_number
+    assert pack_phone_number('+89123456789') != pack_phone_number('89123456789')
+
+
+def test_pack_phone_number_rejects_lossy_formats():
+    """Test that numbers whose digits would not survive packing have no key."""
+    for phone_number in ('+0123', '', '+', '+1-202', '+1234567890123456789', '+١٢٣'):
+        assert pack_phone_number(phone_number) is None
+
+
+def test_write_snapshot_sorts_index_and_keeps_last_duplicate(tmp_path):
+    """Test that the index is sorted by packed key and a repeated number keeps its last value."""
+    path = tmp_path / 'phonebook.snapshot'
+    count = write_snapshot(path, [('+3', b'x'), ('+1', b'y'), ('+3', b'z')])
+    snapshot = Snapshot(path)
+
+    assert count == snapshot.count == 2
+    assert list(snapshot.index) == [pack_phone_number('+1'), pack_phone_number('+3')]
+    assert snapshot.get('+3') == b'z'
+    assert os.listdir(tmp_path) == ['phonebook.snapshot']
+
+
+def test_snapshot_writer_spools_values_until_finished(tmp_path):
+    """Test that added values wait in a spool file beside the snapshot, which is removed once it is written."""
+    path = tmp_path / 'phonebook.snapshot'
+    with SnapshotWriter(path) as writer:
+        writer.add('+3', b'x' * 100)
+        writer.add('+1', 'y')
+        assert len(os.listdir(tmp_path)) == 1
+        assert writer.finish() == 2
+
+    snapshot = Snapshot(path)
+    assert (snapshot.get('+1'), snapshot.get('+3')) == (b'y', b'x' * 100)
+    assert os.listdir(tmp_path) == ['phonebook.snapshot']
+
+
+def test_snapshot_writer_merges_sorted_runs(tmp_path):
+    """Test that records sorted in several spilled runs merge into one index, keeping the last duplicate."""
+    path = tmp_path / "phonebook.snapshot"
+    records = [("+5", b"a"), ("+3", b"b"), ("+9", b"c"), ("+3", b"d"), ("+1", b"e"), ("+5", b"f"), ("+7", b"g")]
+    with SnapshotWriter(path, run_records=2) as writer:
+        for phone_number, value in records:
+            writer.add(phone_number, value)
+        assert writer.finish() == 5
+
+    snapshot = Snapshot(path)
+    assert list(snapshot.index) == [pack_phone_number(f"+{digit}") for digit in (1, 3, 5, 7, 9)]
+    assert [snapshot.value_at(position) for position in range(snapshot.count)] == [b"e", b"d", b"f", b"g", b"c"]
+    assert os.listdir(tmp_path) == ["phonebook.snapshot"]
+
+
+def test_snapshot_writer_abandoned_leaves_no_files(tmp_path):
+    with pytest.raises(ValueError, match='cannot be stored'), SnapshotWriter(tmp_path / 'phonebook.snapshot') as writer:
+        writer.add('+1', b'x')
+        writer.add('+0123', b'y')
+    assert os.listdir(tmp_path) == []
+
+
+def test_write_snapshot_rejects_unindexable_numbers(tmp_path):
+    with pytest.raises(ValueError, match='cannot be stored'):
+        write_snapshot(tmp_path / 'phonebook.snapshot', [('+0123', b'x')])
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / 'other'
+    path.write_bytes(b'not a snapshot at all')
+    with pytest.raises(ValueError, match='Not a phone book snapshot'):
+        Snapshot(path)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_backend_looks_up_records(snapshot_path):
+    """Test that lookups binary-search the mapped index and misses return None."""
+    backend = SnapshotBackend(snapshot_path)
+
+    assert await backend.get('+12025550123') == b'a'
+    assert await backend.get('89123456789') == b'{"b": 1}'
+    assert await backend.get('+12025550124') is None
+    assert await backend.get('not a number') is None
+    assert await backend.mget(['+79123456789', '+1']) == [b'\x01c', None]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_backend_scans_in_key_order(snapshot_path):
+    """Test that SCAN walks the index in order with cursors naming the next phone number."""
+    backend = SnapshotBackend(snapshot_path)
+
+    cursor, first = await backend.scan(0, 2)
+    assert first == [('89123456789', b'{"b": 1}'), ('+12025550123', b'a')]
+    assert cursor == pack_phone_number('+79123456789')
+    assert await backend.scan(cursor, 2) == (0, [('+79123456789', b'\x01c')])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_backend_rejects_writes(snapshot_path):
+    """Test that every write raises ReadOnlyStorageError."""
+    backend = SnapshotBackend(snapshot_path)
+
+    assert backend.read_only
+    with pytest.raises(ReadOnlyStorageError):
+        await backend.set('+12025550123', b'x')
+    with pytest.raises(ReadOnlyStorageError):
+        await backend.compare_and_set('+12025550123', 'version', None)
+    with pytest.raises(ReadOnlyStorageError):
+        await backend.write_many([])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_backend_swaps_to_renamed_file(snapshot_path):
+    """Test that a snapshot renamed over the path is picked up at the next check and on_swap called."""
+    clock = FakeClock()
+    swaps = []
+    backend = SnapshotBackend(snapshot_path, check_interval=5.0, on_swap=lambda: swaps.append(1), clock=clock)
+    old_snapshot = backend.snapshot
+    write_snapshot(snapshot_path, [('+12025550123', b'new')])
+
+    assert await backend.get('+12025550123') == b'a'
+    clock.now = 5.0
+    assert await backend.get('+12025550123') == b'new'
+    assert await backend.get('+79123456789') is None
+    assert swaps == [1]
+    assert backend.stats() == {'records': 1, 'file_bytes': backend.snapshot.size, 'swaps': 1, 'swap_errors': 0}
+    # The replaced mapping stays readable for lookups still holding it
+    assert old_snapshot.get('+79123456789') == b'\x01c'
+
+
+@pytest.mark.asyncio
+async def test_snapshot_backend_keeps_snapshot_when_new_file_is_invalid(snapshot_path):
+    """Test that a file that cannot be mapped leaves the current snapshot in use."""
+    backend = SnapshotBackend(snapshot_path)
+    replacement = snapshot_path.with_name('broken')
+    replacement.write_bytes(b'broken')
+    os.replace(replacement, snapshot_path)
+
+    assert backend.reload() is False
+    assert await backend.get('+12025550123') == b'a'
+    assert backend.stats()['swap_errors'] == 1
+
+
+@pytest.mark.asyncio
+async def test_service_reads_snapshot_and_reports_read_only(snapshot_path):
+    """Test that the service decodes snapshot records and that writes surface ReadOnlyStorageError."""
+    write_snapshot(snapshot_path, [('+12025550123', '{"street": "1 Main St"}')])
+    service = PhoneBookService(None, storage=SnapshotBackend(snapshot_path))
+
+    assert await service.get_address('+12025550123') == {'street': '1 Main St'}
+    assert await service.get_address('+12025550124') is None
+    with pytest.raises(ReadOnlyStorageError):
+        await service.delete_address('+12025550123')
@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+from services.sqlite_backend import SQLiteBackend
+from services.storage_backend import StoredWrite
+
+
+@pytest.fixture
+async def backend(tmp_path):
+    backend = SQLiteBackend(tmp_path / 'phonebook.db', read_threads=2)
+    yield backend
+    await backend.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_uses_wal_and_persists(tmp_path, backend):
+    """Test that the database is in WAL mode and records survive reopening it."""
+    await backend.set('+12025550123', '{}')
+    await backend.aclose()
+
+    reopened = SQLiteBackend(tmp_path / 'phonebook.db')
+    try:
+        assert await reopened.get('+12025550123') == b'{}'
+    finally:
+        await reopened.aclose()
+    with sqlite3.connect(tmp_path / 'phonebook.db') as connection:
+        assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_write_many_is_one_transaction(backend):
+    """Test that a failing write rolls back the writes before it in the same batch."""
+    await backend.set('+1000', 'old')
+
+    with pytest.raises(sqlite3.Error):
+        await backend.write_many([StoredWrite('+1000', 'new'), StoredWrite('+1001', object())])
+
+    assert await backend.mget(['+1000', '+1001']) == [b'old', None]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_scan_cursor_survives_updates(backend):
+    """Test that updating a record during a walk neither repeats nor skips it."""
+    for phone_number in ('+1000', '+1001', '+1002'):
+        await backend.set(phone_number, '{}')
+
+    cursor, first = await backend.scan(0, 2)
+    await backend.set('+1000', 'changed')
+    assert await backend.scan(cursor, 2) == (0, [('+1002', b'{}')])
+    assert [phone_number for phone_number, _ in first] == ['+1000', '+1001']
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_serializes_concurrent_writes(backend):
+    """Test that concurrent upserts through the writer thread all apply and count creations once."""
+    service = PhoneBookService(None, storage=backend)
+    address = {'street': '1 Main St'}
+
+    statuses = await asyncio.gather(
+        *(service.bulk_write([WriteOperation(WriteOp.UPSERT, f'+1{i % 10:03d}', address)]) for i in range(50))
+    )
+
+    assert sum(status == [WriteStatus.CREATED] for status in statuses) == 10
+    assert backend.stats() == {'read_threads': 2, 'pending_reads': 0, 'pending_writes': 0}
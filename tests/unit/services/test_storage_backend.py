@@ -0,0 +1,152 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ResponseError
+
+from services.address_cache import AddressCache
+from services.durability import AppendOnlyDisabledError, Durability, DurabilityLevel, ReplicationTimeoutError
+from services.key_layout import HashKeyLayout, StringKeyLayout
+from services.phonebook_service import PhoneBookService, WriteOp, WriteOperation, WriteStatus
+from services.storage_backend import MemoryBackend, RedisBackend, SetCondition, StoredWrite
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_reuses_deleted_slots():
+    """Test that a new record takes a deleted record's slot and the others keep theirs."""
+    backend = MemoryBackend()
+    for phone_number in ('+1000', '+1001', '+1002'):
+        await backend.set(phone_number, '{}')
+    await backend.delete('+1001')
+    await backend.set('+1003', '{"a": 1}')
+
+    assert await backend.scan(0, 10) == (0, [('+1000', b'{}'), ('+1003', b'{"a": 1}'), ('+1002', b'{}')])
+    assert backend.stats() == {'records': 3, 'value_bytes': 12, 'free_slots': 0}
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_scan_cursor_counts_slots():
+    """Test that each SCAN step examines ``count`` slots and the cursor is the next slot."""
+    backend = MemoryBackend()
+    for phone_number in ('+1000', '+1001', '+1002'):
+        await backend.set(phone_number, '{}')
+    await backend.delete('+1000')
+
+    assert await backend.scan(0, 2) == (2, [('+1001', b'{}')])
+    assert await backend.scan(2, 2) == (0, [('+1002', b'{}')])
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_write_many_pipelines_layout_writes():
+    """Test that batched writes are queued through the layout on one pipeline and their replies normalized."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[1, 0, 1, 1])
+    client = MagicMock()
+    client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    client.pipeline.return_value.__aexit__ = AsyncMock(return_value=None)
+    backend = RedisBackend(client, HashKeyLayout())
+
+    results = await backend.write_many(
+        [
+            StoredWrite('+1234567890', '{}', SetCondition.IF_MISSING),
+            StoredWrite('+1234567891', '{}', SetCondition.IF_MISSING),
+            StoredWrite('+1234567892', '{}'),
+            StoredWrite('+1234567893', None),
+        ]
+    )
+
+    assert results == [True, False, True, True]
+    client.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.hsetnx.call_count == 2
+    pipe.hset.assert_called_once()
+    pipe.hdel.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_service_on_memory_backend():
+    """Test that the phone book service runs on the in-process backend without Redis."""
+    service = PhoneBookService(None, storage=MemoryBackend())
+
+    assert await service.create_address('+1234567890', {'street': 'A St'}) is WriteStatus.CREATED
+    assert await service.create_address('+1234567890', {'street': 'A St'}) is WriteStatus.CONFLICT
+    _, version = await service.get_versioned_address('+1234567890')
+    assert await service.update_address('+1234567890', {'street': 'B St'}, version) is WriteStatus.UPDATED
+    assert await service.get_address('+1234567890') == {'street': 'B St'}
+
+    statuses = await service.bulk_write(
+        [
+            WriteOperation(WriteOp.UPSERT, '+1234567891', {'street': 'C St'}),
+            WriteOperation(WriteOp.DELETE, '+1234567890'),
+        ]
+    )
+    assert statuses == [WriteStatus.CREATED, WriteStatus.DELETED]
+    assert [batch async for batch in service.scan_addresses()] == [(0, [('+1234567891', {'street': 'C St'})])]
+    with pytest.raises(NotImplementedError):
+        await service.get_phones_sharing_address('+1234567891')
+
+
+def _pipelined_client(replies: list) -> tuple[MagicMock, MagicMock]:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=replies)
+    client = MagicMock()
+    client.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    client.pipeline.return_value.__aexit__ = AsyncMock(return_value=None)
+    return client, pipe
+
+
+@pytest.mark.asyncio
+async def test_waiting_backend_sends_wait_with_the_write():
+    """Test that a replicated write and its WAIT share one pipeline, and WAITAOF is used for persisted."""
+    client, pipe = _pipelined_client([1, 2])
+    backend = RedisBackend(client, StringKeyLayout()).with_durability(Durability(DurabilityLevel.REPLICATED, 2, 100))
+
+    assert await backend.set('+1000', '{}', SetCondition.IF_MISSING) is True
+    client.pipeline.assert_called_once_with(transaction=False)
+    pipe.set.assert_called_once()
+    pipe.wait.assert_called_once_with(2, 100)
+
+    client, pipe = _pipelined_client([None, 1, [1, 1]])
+    backend = RedisBackend(client, StringKeyLayout()).with_durability(Durability(DurabilityLevel.PERSISTED, 1, 100))
+    assert await backend.write_many([StoredWrite('+1000', '{}'), StoredWrite('+1001', None)]) == [True, True]
+    pipe.waitaof.assert_called_once_with(1, 1, 100)
+
+
+@pytest.mark.asyncio
+async def test_service_records_write_that_missed_its_replicas():
+    """Test that a write applied on the primary but not replicated in time still invalidates the cache."""
+    client, _ = _pipelined_client([1, 0])
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set('+1000', {'street': 'Old St'})
+    service = PhoneBookService(client, cache=cache, durability=Durability(DurabilityLevel.REPLICATED, 1, 100))
+
+    with pytest.raises(ReplicationTimeoutError) as exc_info:
+        await service.update_address('+1000', {'street': 'New St'})
+
+    assert exc_info.value.acknowledged == 0
+    assert cache.get('+1000') is None
+
+
+@pytest.mark.asyncio
+async def test_persisted_write_without_append_only():
+    """Test that WAITAOF refusing to run without appendonly is reported as applied, and still invalidates the cache."""
+    refusal = ResponseError('WAITAOF cannot be used when numlocal is set but appendonly is disabled.')
+    client, _ = _pipelined_client([1, refusal])
+    cache = AddressCache(max_size=10, ttl=60)
+    cache.set('+1000', {'street': 'Old St'})
+    service = PhoneBookService(client, cache=cache, durability=Durability(DurabilityLevel.PERSISTED, 0, 100))
+
+    with pytest.raises(AppendOnlyDisabledError, match='Stored on the primary'):
+        await service.update_address('+1000', {'street': 'New St'})
+    assert cache.get('+1000') is None
+
+    client, _ = _pipelined_client([None, refusal])
+    backend = RedisBackend(client, StringKeyLayout()).with_durability(Durability(DurabilityLevel.PERSISTED, 0, 100))
+    with pytest.raises(AppendOnlyDisabledError):
+        await backend.write_many([StoredWrite('+1000', '{}')])
+
+
+def test_local_backends_cannot_wait_for_replicas():
+    backend = MemoryBackend()
+
+    assert backend.with_durability(Durability(DurabilityLevel.FIRE_AND_FORGET)) is backend
+    with pytest.raises(NotImplementedError):
+        backend.with_durability(Durability(DurabilityLevel.REPLICATED, 1, 100))
@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from services.component_dictionary import ComponentDictionary
+from services.storage_codec import ENCODING_ERRORS, StorageCodec, StorageFormat, UnknownComponentError
+
+ADDRESS = {
+    'street': '123 Main St',
+    'city': 'Anytown',
+    'state_province': 'NY',
+    'postal_code': '12345',
+    'country': 'US',
+    'formatted_address': '123 Main St, Anytown, NY 12345, US',
+}
+
+
+def _as_read(value: bytes) -> str:
+    """Return a stored value as a decode_responses client with surrogateescape reads it."""
+    return value.decode('utf-8', ENCODING_ERRORS)
+
+
+def test_json_codec_writes_plain_json():
+    """Test that the default codec stores exactly what was stored before codecs existed."""
+    codec = StorageCodec()
+    assert codec.encode(ADDRESS) == json.dumps(ADDRESS)
+    assert codec.decode(json.dumps(ADDRESS)) == ADDRESS
+
+
+def test_binary_codec_round_trip():
+    """Test that binary values carry their header byte and omit formatted_address."""
+    codec = StorageCodec(storage_format='binary')
+    value = codec.encode(ADDRESS)
+
+    assert value[0] == StorageFormat.BINARY
+    assert b'Anytown, NY' not in value
+    assert len(value) < len(json.dumps(ADDRESS)) / 2
+    assert codec.decode(value) == ADDRESS
+    assert codec.decode(_as_read(value)) == ADDRESS
+
+
+def test_binary_codec_handles_long_and_non_ascii_fields():
+    """Test multi-byte length prefixes and UTF-8 field values."""
+    address = {**ADDRESS, 'street': 'Улица ' * 30, 'city': 'Zürich'}
+    address['formatted_address'] = (
+        f'{address["street"]}, {address["city"]}, {address["state_province"]} {address["postal_code"]}, {address["country"]}'
+    )
+    codec = StorageCodec(storage_format='binary')
+
+    assert codec.decode(_as_read(codec.encode(address))) == address
+
+
+def test_binary_codec_falls_back_to_json_outside_schema():
+    """Test that records the binary schema cannot represent are stored as JSON."""
+    codec = StorageCodec(storage_format='binary')
+    custom = {**ADDRESS, 'formatted_address': 'Custom'}
+
+    assert codec.encode(custom) == json.dumps(custom)
+    assert codec.decode(codec.encode(custom)) == custom
+
+
+def _interned_codec() -> StorageCodec:
+    components = ComponentDictionary()
+    for component_id, value in enumerate(('Anytown', 'NY', 'US'), start=1):
+        components._cache(value, component_id)
+    return StorageCodec(storage_format='interned', components=components)
+
+
+def test_interned_codec_round_trip():
+    """Test that interned values store component IDs instead of the repeated strings."""
+    codec = _interned_codec()
+    value = codec.encode(ADDRESS)
+
+    assert value[0] == StorageFormat.INTERNED
+    assert b'Anytown' not in value
+    assert len(value) < len(StorageCodec(storage_format='binary').encode(ADDRESS))
+    assert codec.interned_components([ADDRESS]) == ['Anytown', 'NY', 'US']
+    assert codec.decode(_as_read(value)) == ADDRESS
+
+
+def test_interned_codec_falls_back_to_binary_until_components_are_interned():
+    """Test that a record with a component lacking an ID is written in the binary format."""
+    codec = _interned_codec()
+    address = {**ADDRESS, 'city': 'Elsewhere', 'formatted_address': '123 Main St, Elsewhere, NY 12345, US'}
+
+    value = codec.encode(address)
+
+    assert value[0] == StorageFormat.BINARY
+    assert codec.decode(value) == address
+
+
+def test_interned_decode_reports_unknown_component_ids():
+    """Test that decoding with IDs this worker has not loaded names them."""
+    value = _interned_codec().encode(ADDRESS)
+
+    with pytest.raises(UnknownComponentError) as error:
+        StorageCodec().decode(value)
+
+    assert error.value.component_ids == [1, 2, 3]
+
+
+def test_any_codec_reads_mixed_keyspace():
+    """Test that the format used for writing does not limit what can be read."""
+    binary_value = StorageCodec(storage_format='binary').encode(ADDRESS)
+
+    assert StorageCodec().decode(_as_read(binary_value)) == ADDRESS
+
+
+@pytest.mark.parametrize('value', [b'\x7fdata', b'', b'\x02\x05abc', b'\x02' + b'\x00' * 6])
+def test_decode_rejects_unknown_or_corrupt_values(value):
+    """Test that unreadable values raise ValueError."""
+    with pytest.raises(ValueError):
+        StorageCodec().decode(value)
+
+
+def test_zstd_codec_round_trip_with_dictionary():
+    """Test compressed values with a trained dictionary."""
+    zstd = pytest.importorskip('compression.zstd')
+    samples = [
+        json.dumps({**ADDRESS, 'street': f'{number} Main St'}, separators=(',', ':')).encode() for number in range(1000)
+    ]
+    dictionary = zstd.train_dict(samples, 4096).dict_content
+    codec = StorageCodec(compression='zstd', dictionary=dictionary)
+
+    value = codec.encode(ADDRESS)
+
+    assert value[0] == StorageFormat.JSON | 0x80
+    assert len(value) < len(json.dumps(ADDRESS))
+    assert codec.decode(_as_read(value)) == ADDRESS
+    assert StorageCodec(dictionary=dictionary).decode(value) == ADDRESS
@@ -0,0 +1,181 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from services.phonebook_service import PhoneBookService, WriteStatus
+from services.storage_backend import MemoryBackend
+from services.write_behind import WriteBehindBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _memory_backend(*phone_numbers: str) -> MemoryBackend:
+    backend = MemoryBackend()
+    for phone_number in phone_numbers:
+        await backend.set(phone_number, 'old')
+    return backend
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_updates_last_write_wins():
+    """Test that repeated updates of a number are stored once, with the last value."""
+    backend = await _memory_backend('+1000')
+    backend.write_many = AsyncMock(wraps=backend.write_many)
+    clock = FakeClock()
+    buffer = WriteBehindBuffer(backend, flush_interval=60, clock=clock)
+
+    await buffer.put('+1000', 'a')
+    clock.now = 2.0
+    await buffer.put('+1000', 'b')
+    assert buffer.pending_value('+1000') == 'b'
+    assert await backend.get('+1000') == b'old'
+
+    clock.now = 3.0
+    await buffer.flush()
+    await buffer.aclose()
+
+    assert await backend.get('+1000') == b'b'
+    backend.write_many.assert_awaited_once()
+    stats = buffer.stats()
+    assert (stats['updates'], stats['coalesced'], stats['flushed'], stats['pending']) == (2, 1, 1, 0)
+    # The flush started three seconds after the first update was acknowledged
+    assert stats['last_flush_lag_ms'] == 3000.0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_on_size_and_interval():
+    """Test that a full batch is flushed right away and a partial one after the interval."""
+    backend = await _memory_backend('+1000', '+1001', '+1002')
+    buffer = WriteBehindBuffer(backend, flush_size=2, flush_interval=0.05)
+
+    await buffer.put('+1000', 'a')
+    await buffer.put('+1001', 'b')
+    await asyncio.sleep(0.01)
+    assert await backend.mget(['+1000', '+1001']) == [b'a', b'b']
+
+    await buffer.put('+1002', 'c')
+    await asyncio.sleep(0.01)
+    assert await backend.get('+1002') == b'old'
+    await asyncio.sleep(0.1)
+    assert await backend.get('+1002') == b'c'
+    await buffer.aclose()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_full_buffer_flushes_before_new_number():
+    """Test that with max_pending numbers waiting, a new number is only buffered after a flush."""
+    backend = await _memory_backend('+1000', '+1001')
+    buffer = WriteBehindBuffer(backend, flush_interval=60, max_pending=1)
+
+    await buffer.put('+1000', 'a')
+    await buffer.put('+1000', 'b')
+    assert await backend.get('+1000') == b'old'
+    await buffer.put('+1001', 'c')
+
+    assert await backend.get('+1000') == b'b'
+    assert buffer.stats()['pending'] == 1
+    await buffer.aclose()
+
+
+@pytest.mark.asyncio
+async def test_write_behind_keeps_updates_when_flush_fails():
+    """Test that a failed flush keeps its updates for the next one without overwriting newer values."""
+    backend = await _memory_backend('+1000', '+1001')
+    buffer = WriteBehindBuffer(backend, flush_interval=60)
+    await buffer.put('+1000', 'a')
+    await buffer.put('+1001', 'b')
+    write_many = backend.write_many
+
+    async def failing_write_many(writes):
+        await buffer.put('+1001', 'newer')
+        raise ConnectionError('storage down')
+
+    backend.write_many = failing_write_many
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    backend.write_many = write_many
+    await buffer.aclose()
+
+    assert await backend.mget(['+1000', '+1001']) == [b'a', b'newer']
+    assert buffer.stats()['flush_errors'] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_behind_counts_number_updated_during_flush_once():
+    """Test that a number updated again while its batch is flushing is one pending number."""
+    backend = await _memory_backend('+1000')
+    buffer = WriteBehindBuffer(backend, flush_interval=60)
+    write_many = backend.write_many
+    release = asyncio.Event()
+
+    async def slow_write_many(writes):
+        await release.wait()
+        return await write_many(writes)
+
+    backend.write_many = slow_write_many
+    await buffer.put('+1000', 'a')
+    flush = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0)
+    await buffer.put('+1000', 'b')
+    assert buffer.stats()['pending'] == 1
+
+    release.set()
+    await flush
+    await buffer.aclose()
+    assert await backend.get('+1000') == b'b'
+
+
+@pytest.mark.asyncio
+async def test_write_behind_drops_update_of_deleted_record():
+    """Test that an update whose record is gone by its flush does not recreate it."""
+    backend = await _memory_backend('+1000')
+    buffer = WriteBehindBuffer(backend, flush_interval=60)
+    await buffer.put('+1000', 'a')
+    await backend.delete('+1000')
+
+    await buffer.aclose()
+
+    assert await backend.get('+1000') is None
+    assert buffer.stats()['dropped'] == 1
+
+
+@pytest.mark.asyncio
+async def test_service_reads_see_buffered_updates():
+    """Test that lookups return a buffered update before it is stored, and missing records stay 404."""
+    backend = await _memory_backend()
+    buffer = WriteBehindBuffer(backend, flush_interval=60)
+    service = PhoneBookService(None, storage=backend, write_behind=buffer)
+    await service.create_address('+1000', {'street': 'Old St'})
+
+    assert await service.update_address('+1000', {'street': 'New St'}) is WriteStatus.ACCEPTED
+    assert await service.update_address('+1001', {'street': 'New St'}) is WriteStatus.NOT_FOUND
+    assert await service.get_address('+1000') == {'street': 'New St'}
+    assert await service.get_addresses(['+1000', '+1001']) == {'+1000': {'street': 'New St'}, '+1001': None}
+    assert buffer.stats()['pending'] == 1
+    await buffer.aclose()
+
+
+@pytest.mark.asyncio
+async def test_service_settles_buffered_update_before_other_writes():
+    """Test that a delete or version check of a number with a buffered update comes after it."""
+    backend = await _memory_backend()
+    buffer = WriteBehindBuffer(backend, flush_interval=60)
+    service = PhoneBookService(None, storage=backend, write_behind=buffer)
+    await service.create_address('+1000', {'street': 'Old St'})
+    await service.update_address('+1000', {'street': 'New St'})
+
+    address, _ = await service.get_versioned_address('+1000')
+    assert address == {'street': 'New St'}
+    await service.update_address('+1000', {'street': 'Newer St'})
+    assert await service.delete_address('+1000') is WriteStatus.DELETED
+    await buffer.aclose()
+
+    assert await backend.get('+1000') is None
+    assert buffer.stats()['dropped'] == 0
@@ -0,0 +1,40 @@
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services.sharding import ShardedRedis
+from services.snapshot_backend import Snapshot
+from services.storage_codec import StorageCodec
+from tools.compile_snapshot import main
+
+
+def _shard(keys, records):
+    shard = AsyncMock()
+    shard.scan.return_value = (0, keys)
+    shard.mget.side_effect = lambda keys: [records[key] for key in keys]
+    return shard
+
+
+@pytest.mark.asyncio
+async def test_compile_snapshot_reads_every_shard(tmp_path):
+    """Test that the snapshot holds the records of every shard when REDIS_SHARDS is set."""
+    codec = StorageCodec()
+    records = {'+12025550101': codec.encode({'city': 'A'}), '+12025550102': codec.encode({'city': 'B'})}
+    # Each shard scans its own key; lookups follow the ring, so either shard may be asked for either
+    shard_a = _shard(['+12025550101'], records)
+    shard_b = _shard(['+12025550102'], records)
+    client = ShardedRedis({'a': shard_a, 'b': shard_b})
+    output = tmp_path / 'phonebook.snapshot'
+
+    with (
+        patch('tools.compile_snapshot.create_redis_client', return_value=client),
+        patch.object(sys, 'argv', ['compile_snapshot', str(output), '--format', 'json']),
+    ):
+        await main()
+
+    snapshot = Snapshot(output)
+    assert codec.decode(snapshot.get('+12025550101')) == {'city': 'A'}
+    assert codec.decode(snapshot.get('+12025550102')) == {'city': 'B'}
+    shard_a.aclose.assert_awaited_once()
+    shard_b.aclose.assert_awaited_once()
@@ -0,0 +1,53 @@
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+from redis.exceptions import ResponseError
+
+from services.sharding import HashRing
+from tools.rebalance_shards import MIGRATE_TIMEOUT_MS, migrate_keys, rebalance_shard
+
+BUSY = ResponseError("BUSYKEY Target key name already exists.")
+
+
+@pytest.mark.asyncio
+async def test_migrate_keeps_keys_written_to_the_target_meanwhile():
+    """Test that a key the target rewrote during the rebalance keeps the target's copy and leaves the source."""
+    client = AsyncMock()
+    # The batch fails on "+2" after moving "+1"; one at a time, "+1" is gone and "+2" is still busy
+    client.migrate.side_effect = [BUSY, "NOKEY", BUSY, "OK"]
+
+    superseded = await migrate_keys(client, "b:6380", ["+1", "+2", "+3"])
+
+    assert superseded == 1
+    assert client.migrate.call_args_list == [
+        call("b", 6380, ["+1", "+2", "+3"], 0, MIGRATE_TIMEOUT_MS),
+        call("b", 6380, "+1", 0, MIGRATE_TIMEOUT_MS),
+        call("b", 6380, "+2", 0, MIGRATE_TIMEOUT_MS),
+        call("b", 6380, "+3", 0, MIGRATE_TIMEOUT_MS),
+    ]
+    client.delete.assert_awaited_once_with("+2")
+
+
+@pytest.mark.asyncio
+async def test_migrate_raises_other_errors():
+    client = AsyncMock()
+    client.migrate.side_effect = ResponseError("IOERR error or timeout writing to target instance")
+
+    with pytest.raises(ResponseError, match="IOERR"):
+        await migrate_keys(client, "b:6380", ["+1"])
+
+
+@pytest.mark.asyncio
+async def test_rebalance_shard_moves_keys_owned_elsewhere():
+    """Test that only keys the new ring assigns to another shard are migrated, without REPLACE."""
+    ring = MagicMock(spec=HashRing)
+    ring.shard_for.side_effect = lambda key: "b:6380" if key == "+2" else "a:6379"
+    client = AsyncMock()
+    client.scan.return_value = (0, ["+1", "+2"])
+    client.migrate.return_value = "OK"
+
+    with patch("tools.rebalance_shards.Redis", return_value=client):
+        moved, superseded = await rebalance_shard("a:6379", ring, 100, dry_run=False)
+
+    assert (moved, superseded) == ({"b:6380": 1}, 0)
+    client.migrate.assert_awaited_once_with("b", 6380, ["+2"], 0, MIGRATE_TIMEOUT_MS)
@@ -0,0 +1,26 @@
+import pytest
+
+from utils.etags import format_etag, if_match_versions, none_match
+
+
+def test_none_match_compares_weakly():
+    """Test that If-None-Match matches weak and strong tags of the version, and any version for *."""
+    assert not none_match('"abc"', 'abc')
+    assert not none_match('"old", W/"abc"', 'abc')
+    assert not none_match('*', 'abc')
+    assert none_match('"old"', 'abc')
+
+
+def test_if_match_versions():
+    """Test that If-Match gives every quoted version, or None for any version."""
+    assert if_match_versions(format_etag('abc')) == ['abc']
+    assert if_match_versions('"abc", "def"') == ['abc', 'def']
+    assert if_match_versions(' * ') is None
+    # A weak tag is kept as is, so it never equals a version
+    assert if_match_versions('W/"abc"') == ['W/"abc"']
+
+
+def test_if_match_versions_needs_a_tag():
+    """Test that If-Match naming no tag is rejected."""
+    with pytest.raises(ValueError):
+        if_match_versions(' , ')
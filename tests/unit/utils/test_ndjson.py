@@ -0,0 +1,39 @@
+from utils.ndjson import iter_ndjson_lines, ndjson_line
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(chunks, max_line_length: int = 100) -> list:
+    return [line async for line in iter_ndjson_lines(chunks, max_line_length)]
+
+
+async def test_iter_ndjson_lines_across_chunks():
+    """Test that lines split across chunk boundaries are reassembled."""
+    lines = await _collect(_chunks(b'{"a": 1}\n{"b"', b': 2}\r\n', b'{"c": 3}'))
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+async def test_iter_ndjson_lines_keeps_blank_lines():
+    """Test that blank lines are yielded so callers can count line numbers."""
+    lines = await _collect(_chunks(b'{"a": 1}\n\n{"b": 2}\n'))
+    assert lines == [b'{"a": 1}', b'', b'{"b": 2}']
+
+
+async def test_iter_ndjson_lines_discards_overlong_lines():
+    """Test that a line over the limit is replaced by None without being buffered."""
+    lines = await _collect(_chunks(b'{"a": 1}\n', b'x' * 8, b'x' * 8, b'x\n{"b": 2}\n'), max_line_length=10)
+    assert lines == [b'{"a": 1}', None, b'{"b": 2}']
+
+
+async def test_iter_ndjson_lines_overlong_last_line():
+    """Test that an overlong final line without a terminator is reported."""
+    lines = await _collect(_chunks(b'{"a": 1}\n', b'x' * 20), max_line_length=10)
+    assert lines == [b'{"a": 1}', None]
+
+
+def test_ndjson_line():
+    """Test that objects are serialized as a single terminated line."""
+    assert ndjson_line({'a': 1}) == b'{"a": 1}\n'